@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import time
+import tkinter as tk
+
+
+def linear(t):
+    """Равномерное движение"""
+    return t
+
+
+def ease_out_cubic(t):
+    """Быстрый старт и плавное замедление"""
+    return 1 - (1 - t) ** 3
+
+
+def ease_in_out_quad(t):
+    """Плавный старт и плавное замедление"""
+    return 2 * t * t if t < 0.5 else 1 - (-2 * t + 2) ** 2 / 2
+
+
+class _Animation:
+    """Одна анимация значения от start до end"""
+
+    def __init__(self, start, end, duration, apply, easing, on_done):
+        self.start = start
+        self.end = end
+        self.duration = duration
+        self.apply = apply
+        self.easing = easing
+        self.on_done = on_done
+        self.started = time.perf_counter()
+
+
+class Animator:
+    """Анимации по кадрам главного цикла Tk
+
+    Все анимации обслуживает одна цепочка ``root.after`` с заданной
+    частотой кадров, поэтому Tk вызывается только из главного потока.
+    Прогресс считается по прошедшему времени: если цикл занят, лишние
+    кадры пропускаются, а не накапливаются в очереди.
+    """
+
+    def __init__(self, root, fps=60):
+        self.root = root
+        self.frame_ms = max(1, int(1000 / fps))
+        self._animations = {}
+        self._job = None
+
+    def animate(self, name, start, end, duration, apply, easing=ease_out_cubic, on_done=None):
+        """Запуск анимации (анимация с тем же именем заменяется)"""
+        self._animations[name] = _Animation(start, end, duration, apply, easing, on_done)
+        if self._job is None:
+            self._job = self.root.after(0, self._tick)
+
+    def cancel(self, name):
+        """Остановка анимации без вызова on_done"""
+        self._animations.pop(name, None)
+
+    def is_running(self, name):
+        """Идет ли анимация с таким именем"""
+        return name in self._animations
+
+    def _tick(self):
+        """Один кадр: применение текущих значений всех анимаций"""
+        self._job = None
+        now = time.perf_counter()
+        for name, animation in list(self._animations.items()):
+            if animation.duration > 0:
+                progress = min(1.0, (now - animation.started) / animation.duration)
+            else:
+                progress = 1.0
+            value = animation.start + (animation.end - animation.start) * animation.easing(progress)
+            try:
+                animation.apply(value)
+            except tk.TclError:
+                # Элемент уже уничтожен (например, окно закрыто)
+                progress = 1.0
+            if progress >= 1.0:
+                if self._animations.get(name) is animation:
+                    del self._animations[name]
+                if animation.on_done is not None:
+                    animation.on_done()
+        if self._animations:
+            self._job = self.root.after(self.frame_ms, self._tick)
@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""Архив старых заметок.
+
+Старые заметки переносятся из основного хранилища в неизменяемые сегменты,
+сжатые zlib (JSON Lines внутри). Рядом лежит небольшой ``index.json``: для
+каждого сегмента - файл, диапазон ID, число заметок и контрольная сумма, а
+также список удаленных из архива ID (сами сегменты не переписываются).
+Сегменты распаковываются только когда их заметки понадобились; ID
+заметок распакованного сегмента запоминаются, поэтому проверка "лежит ли
+заметка в архиве" обычно не читает с диска ничего, кроме stat индекса.
+"""
+import json
+import os
+import threading
+import zlib
+
+from file_watch import FileLock
+from note_record import Note, current_timestamp
+
+INDEX_FILE = "index.json"
+
+
+def select_cold(notes, max_age_days, max_hot):
+    """Заметки для архива: старше max_age_days или дальше max_hot новых
+
+    ``notes`` - заметки от старых к новым; возвращается список от старых
+    к новым. Заметки с нераспознанным временем по возрасту не отбираются.
+    """
+    notes = list(notes)
+    cutoff = current_timestamp() - max_age_days * 86400
+    overflow = max(0, len(notes) - max_hot)
+    return [
+        note for index, note in enumerate(notes)
+        if index < overflow or (not isinstance(note.created, str) and note.created < cutoff)
+    ]
+
+
+class NoteArchive:
+    """Сжатые сегменты архива и их индекс"""
+
+    def __init__(self, directory, segment_size=1000, compress_level=6):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.compress_level = compress_level
+        self._index_path = os.path.join(directory, INDEX_FILE)
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(self._index_path)
+        self._index = None
+        self._index_stat = None
+        # (файл, crc32) сегмента -> ID его заметок (сегменты не меняются)
+        self._segment_ids = {}
+
+    def _stat_index(self):
+        """Размер и время изменения индекса (None, если его нет)"""
+        try:
+            stat = os.stat(self._index_path)
+        except OSError:
+            return None
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def _read_index(self):
+        """Чтение индекса (пустой, если архива еще нет)"""
+        self._index_stat = self._stat_index()
+        try:
+            with open(self._index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            index = {"segments": [], "deleted": []}
+        index["deleted"] = set(index["deleted"])
+        self._index = index
+        return index
+
+    def _write_index(self, index):
+        """Атомарная запись индекса"""
+        data = dict(index, deleted=sorted(index["deleted"]))
+        tmp_path = self._index_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._index_path)
+        self._index = index
+        self._index_stat = self._stat_index()
+
+    def _get_index(self):
+        """Индекс из памяти или с диска"""
+        return self._index if self._index is not None else self._read_index()
+
+    def _fresh_index(self):
+        """Индекс из памяти, если файл с тех пор не менялся (другим окном)"""
+        if self._index is None or self._stat_index() != self._index_stat:
+            return self._read_index()
+        return self._index
+
+    def segments(self):
+        """Описания сегментов, новые первыми"""
+        return sorted(self._get_index()["segments"], key=lambda s: s["last_id"], reverse=True)
+
+    def count(self):
+        """Количество заметок в архиве"""
+        index = self._get_index()
+        return sum(segment["count"] for segment in index["segments"]) - len(index["deleted"])
+
+    def max_id(self):
+        """Наибольший ID в архиве (0, если архив пуст)"""
+        return max((segment["last_id"] for segment in self._get_index()["segments"]), default=0)
+
+    def find(self, note_ids):
+        """ID из note_ids, которые лежат в архиве (и не удалены из него)
+
+        Индекс перечитывается, если его изменило другое окно.
+        """
+        if not note_ids:
+            return set()
+        index = self._fresh_index()
+        return self._archived_ids(index, note_ids) - index["deleted"]
+
+    def _archived_ids(self, index, note_ids):
+        """Какие из ID лежат в сегментах архива
+
+        Диапазона ID сегмента недостаточно: часть заметок из того же
+        диапазона (например, с напоминанием) остается в хранилище. Поэтому
+        смотрятся ID сегментов, чей диапазон пересекается с ID; сегмент
+        распаковывается только при первой проверке. Обычно проверяемые
+        заметки новее архива и сегменты не нужны вовсе.
+        """
+        ids = set(note_ids)
+        if not ids:
+            return set()
+        low, high = min(ids), max(ids)
+        present = set()
+        for segment in index["segments"]:
+            if segment["first_id"] <= high and low <= segment["last_id"]:
+                present |= ids & self._note_ids(segment)
+        return present
+
+    def _note_ids(self, segment):
+        """ID заметок сегмента (запоминаются при первой распаковке)"""
+        ids = self._segment_ids.get((segment["file"], segment["crc32"]))
+        if ids is None:
+            ids = frozenset(note.id for note in self._read_notes(segment))
+        return ids
+
+    def add(self, notes, keep=None):
+        """Запись заметок в новые сегменты
+
+        Возвращает ID записанных заметок: после вызова они точно есть в
+        архиве (уже заархивированные, например другим экземпляром или до
+        сбоя, повторно не пишутся) и их можно удалять из хранилища.
+        ``keep(note)`` проверяется под блокировкой прямо перед записью:
+        заметки, для которых он ложен (например, удаленные, пока их
+        отбирали), в архив не попадают.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        notes = sorted(notes, key=lambda note: note.id)
+        with self._lock, self._file_lock:
+            if keep is not None:
+                notes = [note for note in notes if keep(note)]
+            index = self._read_index()
+            present = self._archived_ids(index, [note.id for note in notes])
+            new_notes = [note for note in notes if note.id not in present]
+            number = max((s["number"] for s in index["segments"]), default=0)
+            for start in range(0, len(new_notes), self.segment_size):
+                chunk = new_notes[start:start + self.segment_size]
+                number += 1
+                index["segments"].append(self._write_segment(number, chunk))
+            if new_notes:
+                self._write_index(index)
+        return [note.id for note in notes]
+
+    def _write_segment(self, number, notes):
+        """Сжатие и запись одного сегмента"""
+        lines = "".join(
+            json.dumps(note.to_dict(), ensure_ascii=False) + "\n" for note in notes
+        )
+        data = zlib.compress(lines.encode('utf-8'), self.compress_level)
+        name = f"segment-{number:06d}.z"
+        path = os.path.join(self.directory, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        crc32 = zlib.crc32(data)
+        self._segment_ids[(name, crc32)] = frozenset(note.id for note in notes)
+        return {
+            "number": number,
+            "file": name,
+            "first_id": notes[0].id,
+            "last_id": notes[-1].id,
+            "count": len(notes),
+            "crc32": crc32,
+        }
+
+    def _read_notes(self, segment):
+        """Распаковка сегмента с проверкой контрольной суммы"""
+        with open(os.path.join(self.directory, segment["file"]), 'rb') as f:
+            data = f.read()
+        if zlib.crc32(data) != segment["crc32"]:
+            raise ValueError(f"Поврежден сегмент архива: {segment['file']}")
+        notes = [
+            Note.from_dict(json.loads(line))
+            for line in zlib.decompress(data).decode('utf-8').splitlines()
+        ]
+        self._segment_ids[(segment["file"], segment["crc32"])] = frozenset(
+            note.id for note in notes
+        )
+        return notes
+
+    def read_segment(self, segment):
+        """Заметки сегмента новые первыми, без удаленных"""
+        deleted = self._get_index()["deleted"]
+        return [note for note in reversed(self._read_notes(segment)) if note.id not in deleted]
+
+    def iter_newest(self):
+        """Сегменты по одному (распаковываются по мере перебора), новые первыми"""
+        for segment in self.segments():
+            yield self.read_segment(segment)
+
+    def delete(self, note_id):
+        """Удаление заметки из архива (отметка в индексе)"""
+        # Проверка без блокировки: обычно заметки в архиве нет и на диск
+        # смотреть не нужно
+        index = self._fresh_index()
+        if note_id in index["deleted"] or not self._archived_ids(index, [note_id]):
+            return False
+        with self._lock, self._file_lock:
+            index = self._read_index()
+            if note_id in index["deleted"]:
+                return False
+            index["deleted"].add(note_id)
+            self._write_index(index)
+        return True
+
+    def undelete(self, note_id):
+        """Возврат удаленной заметки архива (отмена delete())"""
+        if not os.path.exists(self._index_path):
+            return False
+        with self._lock, self._file_lock:
+            index = self._read_index()
+            if note_id not in index["deleted"]:
+                return False
+            index["deleted"].discard(note_id)
+            self._write_index(index)
+        return True
+
+    def restore(self, note_ids):
+        """Архив в состоянии резервной копии с заметками note_ids
+
+        Заметки архива из копии снова видны (если их удалили после нее),
+        остальные отмечаются удаленными. Возвращает ID из note_ids, которые
+        лежат в архиве: в хранилище их возвращать не нужно.
+        """
+        if not os.path.exists(self._index_path):
+            return set()
+        note_ids = set(note_ids)
+        with self._lock, self._file_lock:
+            index = self._read_index()
+            archived = set().union(*[self._note_ids(segment) for segment in index["segments"]])
+            deleted = archived - note_ids
+            if deleted != index["deleted"]:
+                index["deleted"] = deleted
+                self._write_index(index)
+        return archived & note_ids
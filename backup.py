@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""Резервные копии заметок с дедупликацией.
+
+Заметки делятся на куски по диапазонам ID (``chunk_ids`` подряд идущих ID
+в куске). Кусок хранится один раз под именем SHA-256 своего содержимого
+(``objects/ab/abcd….z``, сжат zlib), а копия - это небольшой манифест со
+списком кусков (``manifests/20250301-120000.json``). Старые заметки почти
+не меняются, поэтому новая копия добавляет на диск только куски с
+изменившимися заметками.
+
+Копии прореживаются по расписанию ``ROTATION``: последние копии каждого
+часа, дня и недели; куски, на которые больше не ссылается ни одна копия,
+удаляются. При чтении каждый кусок проверяется по хэшу, а манифест - по
+своей контрольной сумме.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+
+from file_watch import FileLock
+from note_record import Note, current_timestamp, format_timestamp, parse_timestamp
+
+# Сколько последних часов, дней и недель хранится по одной копии
+ROTATION = {"hourly": 24, "daily": 7, "weekly": 4}
+PERIODS = {"hourly": 3600, "daily": 86400, "weekly": 7 * 86400}
+
+MANIFEST_TIME_FORMAT = "%Y%m%d-%H%M%S"
+
+
+def chunk_data(notes):
+    """Содержимое куска: JSON Lines в каноническом виде (ключи по алфавиту)"""
+    return "".join(
+        json.dumps(note.to_dict(), ensure_ascii=False, sort_keys=True) + "\n"
+        for note in sorted(notes, key=lambda note: note.id)
+    ).encode('utf-8')
+
+
+def chunks_checksum(chunks):
+    """Контрольная сумма списка кусков манифеста"""
+    return hashlib.sha256(json.dumps(chunks, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def select_kept(times, rotation, now):
+    """Какие копии оставить: самую новую в каждом из последних периодов"""
+    kept = set()
+    if not times:
+        return kept
+    kept.add(max(times))
+    for tier, count in rotation.items():
+        period = PERIODS[tier]
+        newest = {}
+        for created in times:
+            if created <= now:
+                slot = created // period
+                if created > newest.get(slot, -1):
+                    newest[slot] = created
+        for slot in sorted(newest, reverse=True)[:count]:
+            kept.add(newest[slot])
+    return kept
+
+
+class BackupStore:
+    """Хранилище резервных копий: куски по хэшу и манифесты копий"""
+
+    def __init__(self, directory, rotation=None, chunk_ids=256, compress_level=6):
+        self.directory = directory
+        self.rotation = ROTATION if rotation is None else rotation
+        self.chunk_ids = chunk_ids
+        self.compress_level = compress_level
+        self._objects = os.path.join(directory, "objects")
+        self._manifests = os.path.join(directory, "manifests")
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(os.path.join(directory, "backup"))
+
+    def _object_path(self, digest):
+        """Путь к куску по его хэшу"""
+        return os.path.join(self._objects, digest[:2], digest + ".z")
+
+    def _write_object(self, data):
+        """Запись куска (если такого еще нет); возвращает его хэш"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(zlib.compress(data, self.compress_level))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        return digest
+
+    def _read_object(self, digest):
+        """Чтение куска с проверкой хэша"""
+        with open(self._object_path(digest), 'rb') as f:
+            data = zlib.decompress(f.read())
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"Поврежден кусок резервной копии: {digest}")
+        return data
+
+    def _manifest_names(self):
+        """Имена манифестов, новые первыми"""
+        try:
+            names = os.listdir(self._manifests)
+        except FileNotFoundError:
+            return []
+        return sorted((name[:-5] for name in names if name.endswith(".json")), reverse=True)
+
+    def _read_manifest(self, name):
+        """Манифест копии с проверкой контрольной суммы"""
+        with open(os.path.join(self._manifests, name + ".json"), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if chunks_checksum(manifest["chunks"]) != manifest["checksum"]:
+            raise ValueError(f"Поврежден манифест резервной копии: {name}")
+        return manifest
+
+    def snapshots(self):
+        """Копии (имя, время, число заметок), новые первыми"""
+        result = []
+        for name in self._manifest_names():
+            try:
+                manifest = self._read_manifest(name)
+            except (OSError, ValueError, KeyError):
+                continue
+            result.append({"name": name, "created": manifest["created"], "notes": manifest["notes"]})
+        return result
+
+    def create(self, notes, now=None):
+        """Новая копия заметок; None, если с прошлой копии ничего не изменилось
+
+        Пишутся только куски, которых еще нет в хранилище.
+        """
+        if now is None:
+            now = current_timestamp()
+        buckets = {}
+        count = 0
+        for note in notes:
+            buckets.setdefault(note.id // self.chunk_ids, []).append(note)
+            count += 1
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock, self._file_lock:
+            chunks = {
+                str(bucket): self._write_object(chunk_data(bucket_notes))
+                for bucket, bucket_notes in sorted(buckets.items())
+            }
+            names = self._manifest_names()
+            if names:
+                latest = self._read_manifest(names[0])
+                if latest["chunks"] == chunks:
+                    return None
+            name = time.strftime(MANIFEST_TIME_FORMAT, time.gmtime(now))
+            # Две копии в одну секунду получают суффикс
+            suffix = 1
+            while os.path.exists(os.path.join(self._manifests, name + ".json")):
+                suffix += 1
+                name = time.strftime(MANIFEST_TIME_FORMAT, time.gmtime(now)) + f"-{suffix}"
+            manifest = {
+                "created": format_timestamp(now),
+                "notes": count,
+                "chunk_ids": self.chunk_ids,
+                "chunks": chunks,
+                "checksum": chunks_checksum(chunks),
+            }
+            os.makedirs(self._manifests, exist_ok=True)
+            path = os.path.join(self._manifests, name + ".json")
+            with open(path + ".tmp", 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=1)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + ".tmp", path)
+        return dict(manifest, name=name)
+
+    def read(self, name):
+        """Заметки копии (куски проверяются по хэшу)"""
+        manifest = self._read_manifest(name)
+        notes = []
+        for bucket in sorted(manifest["chunks"], key=int):
+            for line in self._read_object(manifest["chunks"][bucket]).decode('utf-8').splitlines():
+                notes.append(Note.from_dict(json.loads(line)))
+        return notes
+
+    def find(self, at):
+        """Имя последней копии, сделанной не позже времени at (строка или секунды)"""
+        if isinstance(at, str):
+            at = parse_timestamp(at)
+            if at is None:
+                raise ValueError("Время в формате 'YYYY-MM-DD HH:MM:SS'")
+        for snapshot in self.snapshots():
+            if parse_timestamp(snapshot["created"]) <= at:
+                return snapshot["name"]
+        return None
+
+    def verify(self, name=None):
+        """Проверка копии (или всех копий); возвращает список ошибок"""
+        errors = []
+        checked = set()
+        for manifest_name in [name] if name else self._manifest_names():
+            try:
+                manifest = self._read_manifest(manifest_name)
+            except (OSError, ValueError, KeyError) as e:
+                errors.append(f"{manifest_name}: {e}")
+                continue
+            for digest in manifest["chunks"].values():
+                if digest in checked:
+                    continue
+                checked.add(digest)
+                try:
+                    self._read_object(digest)
+                except (OSError, ValueError, zlib.error) as e:
+                    errors.append(f"{manifest_name}: {e}")
+        return errors
+
+    def prune(self, now=None):
+        """Прореживание копий по расписанию и удаление ненужных кусков"""
+        if now is None:
+            now = current_timestamp()
+        if not os.path.isdir(self._manifests):
+            return []
+        with self._lock, self._file_lock:
+            manifests = {}
+            for name in self._manifest_names():
+                try:
+                    manifests[name] = self._read_manifest(name)
+                except (OSError, ValueError, KeyError):
+                    # Поврежденный манифест не удаляем: его покажет verify()
+                    continue
+            times = {name: parse_timestamp(manifest["created"]) for name, manifest in manifests.items()}
+            kept = select_kept(set(times.values()), self.rotation, now)
+            removed = [name for name, created in times.items() if created not in kept]
+            for name in removed:
+                os.remove(os.path.join(self._manifests, name + ".json"))
+            if removed:
+                self._collect_garbage([
+                    manifest for name, manifest in manifests.items() if name not in removed
+                ])
+        return removed
+
+    def _collect_garbage(self, manifests):
+        """Удаление кусков, на которые не ссылается ни одна копия"""
+        used = {digest for manifest in manifests for digest in manifest["chunks"].values()}
+        for prefix in os.listdir(self._objects):
+            directory = os.path.join(self._objects, prefix)
+            for file_name in os.listdir(directory):
+                if file_name.endswith(".z") and file_name[:-2] not in used:
+                    os.remove(os.path.join(directory, file_name))
+
+    def disk_usage(self):
+        """Размер всех кусков и манифестов на диске в байтах"""
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            for file_name in files:
+                total += os.path.getsize(os.path.join(root, file_name))
+        return total
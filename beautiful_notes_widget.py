@@ -1,20 +1,26 @@
 # -*- coding: utf-8 -*-
-import customtkinter as ctk
-import json
-import os
-from datetime import datetime
-from PIL import Image, ImageTk
-import threading
 import time
+_IMPORT_STARTED = time.perf_counter()  # Начало импорта (для --profile-startup)
+
+import customtkinter as ctk
+from notes_controller import NotesController, main
+from styles import registry as styles
+from virtual_list import NoteRow, VirtualNotesList
 
-class BeautifulNotesWidget:
-    def __init__(self):
-        # Настройка темы и внешнего вида
-        ctk.set_appearance_mode("dark")  # Темная тема
-        ctk.set_default_color_theme("blue")  # Синяя цветовая схема
-        
-        # Создание главного окна
-        self.root = ctk.CTk()
+class BeautifulNotesWidget(NotesController):
+    # Оформление: стиль уведомлений, прилипание к краям, символов в строке превью
+    toast_style = "toast"
+    snap_distance = 15
+    chars_per_line = 42
+        
+    def __init__(self, profiler=None, metrics=None, sync_url=None, engine="journal"):
+        super().__init__(profiler=profiler, metrics=metrics, sync_url=sync_url, engine=engine)
+        
+        # Анимация появления
+        self.animate_appearance()
+        
+    def setup_window(self):
+        """Заголовок, размер и свойства главного окна"""
         self.root.title("Заметки")
         self.root.geometry("350x700")  # Увеличили высоту на 300 пикселей
         
@@ -23,24 +29,6 @@ class BeautifulNotesWidget:
         self.root.attributes('-alpha', 0.95)  # Легкая прозрачность
         self.root.overrideredirect(True)  # Убираем стандартную рамку
         
-        # Переменные для перетаскивания
-        self.drag_x = 0
-        self.drag_y = 0
-        self.is_dragging = False
-        
-        # Создание интерфейса
-        self.create_widgets()
-        
-        # Загрузка заметок
-        self.notes_file = "notes.json"
-        self.load_notes()
-        
-        # Привязка событий
-        self.bind_events()
-        
-        # Анимация появления
-        self.animate_appearance()
-        
     def create_widgets(self):
         """Создание всех элементов интерфейса"""
         
@@ -56,7 +44,7 @@ class BeautifulNotesWidget:
         self.title_label = ctk.CTkLabel(
             self.title_frame, 
             text="📝 Мои Заметки", 
-            font=ctk.CTkFont(size=18, weight="bold"),
+            font=styles.font(18, "bold"),
             text_color=("white", "white")
         )
         self.title_label.pack(side="left", padx=15, pady=10)
@@ -74,7 +62,7 @@ class BeautifulNotesWidget:
             command=self.toggle_minimize,
             fg_color="transparent",
             hover_color=("gray70", "gray30"),
-            font=ctk.CTkFont(size=16, weight="bold")
+            font=styles.font(16, "bold")
         )
         self.minimize_btn.pack(side="left", padx=2)
         
@@ -84,16 +72,30 @@ class BeautifulNotesWidget:
             text="×",
             width=30,
             height=25,
-            command=self.root.quit,
+            command=self.close,
             fg_color="transparent",
             hover_color=("red", "darkred"),
-            font=ctk.CTkFont(size=16, weight="bold")
+            font=styles.font(16, "bold")
         )
         self.close_btn.pack(side="left", padx=2)
         
-        # Контейнер для заметок
-        self.notes_container = ctk.CTkScrollableFrame(
+        # Поле поиска
+        self.search_entry = ctk.CTkEntry(
             self.main_frame,
+            placeholder_text="🔍 Поиск по заметкам и #тегам...",
+            height=30,
+            corner_radius=8
+        )
+        self.search_entry.pack(fill="x", padx=10, pady=5)
+        self.search_entry.bind("<KeyRelease>", self.on_search_changed)
+        
+        # Контейнер для заметок (виртуализированный список)
+        self.notes_container = VirtualNotesList(
+            self.main_frame,
+            create_row=self.create_note_widget,
+            bind_row=self.bind_note_widget,
+            row_height=self.note_row_height,
+            on_end_reached=self.load_more,
             corner_radius=10,
             height=200
         )
@@ -107,7 +109,7 @@ class BeautifulNotesWidget:
         self.input_label = ctk.CTkLabel(
             self.input_frame,
             text="✏️ Новая заметка:",
-            font=ctk.CTkFont(size=14, weight="bold")
+            font=styles.font(14, "bold")
         )
         self.input_label.pack(anchor="w", padx=15, pady=(10, 5))
         
@@ -116,7 +118,7 @@ class BeautifulNotesWidget:
             self.input_frame,
             height=80,
             corner_radius=8,
-            font=ctk.CTkFont(size=12),
+            font=styles.font(12),
             wrap="word"  # Перенос слов
         )
         self.note_entry.pack(fill="x", padx=15, pady=(0, 10))
@@ -134,7 +136,7 @@ class BeautifulNotesWidget:
             command=self.save_note,
             height=35,
             corner_radius=8,
-            font=ctk.CTkFont(size=14, weight="bold"),
+            font=styles.font(14, "bold"),
             fg_color=("blue", "darkblue"),
             hover_color=("darkblue", "blue")
         )
@@ -144,7 +146,7 @@ class BeautifulNotesWidget:
         self.stats_label = ctk.CTkLabel(
             self.main_frame,
             text="📊 Всего заметок: 0",
-            font=ctk.CTkFont(size=12),
+            font=styles.font(12),
             text_color=("gray60", "gray40")
         )
         self.stats_label.pack(pady=(0, 10))
@@ -160,29 +162,24 @@ class BeautifulNotesWidget:
         self.title_label.bind("<B1-Motion>", self.on_drag)
         self.title_label.bind("<ButtonRelease-1>", self.stop_drag)
         
-    def start_drag(self, event):
-        """Начало перетаскивания"""
-        self.is_dragging = True
-        self.drag_x = event.x
-        self.drag_y = event.y
-        
-    def on_drag(self, event):
-        """Перетаскивание окна"""
-        if self.is_dragging:
-            x = self.root.winfo_x() + (event.x - self.drag_x)
-            y = self.root.winfo_y() + (event.y - self.drag_y)
-            self.root.geometry(f"+{x}+{y}")
-            
-    def stop_drag(self, event):
-        """Окончание перетаскивания"""
-        self.is_dragging = False
+        # Отмена и повтор (в том числе в русской раскладке)
+        for sequence in ("<Control-z>", "<Control-Z>", "<Control-Cyrillic_ya>", "<Control-Cyrillic_YA>"):
+            self.root.bind(sequence, self.undo)
+        for sequence in ("<Control-y>", "<Control-Y>", "<Control-Cyrillic_en>", "<Control-Cyrillic_EN>"):
+            self.root.bind(sequence, self.redo)
+        
+        # Сохранение метрик по горячей клавише
+        if self.metrics is not None:
+            self.root.bind("<F12>", self.dump_metrics)
         
     def toggle_minimize(self):
         """Сворачивание/разворачивание окна"""
-        if self.root.winfo_height() > 100:
+        if not self.minimized:
             # Сворачиваем
-            self.root.geometry(f"{self.root.winfo_width()}x80")
+            self.minimized = True
+            self.animate_height(self.root.winfo_width(), 80)
             # Скрываем элементы
+            self.search_entry.pack_forget()
             self.notes_container.pack_forget()
             self.input_frame.pack_forget()
             self.stats_label.pack_forget()
@@ -190,182 +187,108 @@ class BeautifulNotesWidget:
             self.minimize_btn.configure(text="□")
         else:
             # Разворачиваем
-            self.root.geometry("350x700")  # Увеличили высоту на 300 пикселей
+            self.minimized = False
+            self.animate_height(350, 700)  # Увеличили высоту на 300 пикселей
             # Показываем элементы
+            self.search_entry.pack(fill="x", padx=10, pady=5)
             self.notes_container.pack(fill="both", expand=True, padx=10, pady=5)
             self.input_frame.pack(fill="x", padx=10, pady=5)
             self.stats_label.pack(pady=(0, 10))
             # Обновляем кнопку
             self.minimize_btn.configure(text="−")
-            
-    def save_note(self):
-        """Сохранение новой заметки"""
-        try:
-            note_text = self.note_entry.get("1.0", "end-1c").strip()
-            if note_text:
-                # Создаем новую заметку с правильным ID
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                # Находим максимальный ID и добавляем 1
-                max_id = max([note.get('id', 0) for note in self.notes]) if self.notes else 0
-                new_note = {
-                    "text": note_text,
-                    "timestamp": timestamp,
-                    "id": max_id + 1
-                }
-                
-                self.notes.append(new_note)
-                self.save_to_file()
-                
-                # Очищаем поле ввода
-                self.note_entry.delete("1.0", "end")
-                
-                # Обновляем интерфейс
-                self.update_notes_display()
-                
-                # Показываем уведомление
-                self.show_notification("✅ Заметка сохранена!")
-                
-                # Возвращаем фокус на поле ввода
-                self.note_entry.focus_set()
-        except Exception as e:
-            self.show_notification(f"❌ Ошибка: {str(e)}")
-            
-    def update_notes_display(self):
-        """Обновление отображения заметок"""
-        # Очищаем контейнер
-        for widget in self.notes_container.winfo_children():
-            widget.destroy()
-            
-        # Обновляем статистику
-        self.stats_label.configure(text=f"📊 Всего заметок: {len(self.notes)}")
-        
-        # Отображаем заметки в обратном порядке (новые сверху)
-        for note in reversed(self.notes):
-            self.create_note_widget(note)
-            
-    def create_note_widget(self, note):
-        """Создание виджета для одной заметки"""
+        
+    def create_note_widget(self, parent):
+        """Создание переиспользуемого виджета строки заметки"""
         # Фрейм для заметки
         note_frame = ctk.CTkFrame(
-            self.notes_container,
+            parent,
             corner_radius=10,
-            fg_color=("gray90", "gray20")
+            **styles.style("note_card")
         )
-        note_frame.pack(fill="x", padx=5, pady=3)
         
         # Заголовок с датой
         header_frame = ctk.CTkFrame(note_frame, fg_color="transparent")
         header_frame.pack(fill="x", padx=10, pady=(10, 5))
         
         # Номер заметки
-        note_id = note.get('id', '?')
         note_id_label = ctk.CTkLabel(
             header_frame,
-            text=f"#{note_id}",
-            font=ctk.CTkFont(size=12, weight="bold"),
-            text_color=("blue", "lightblue")
+            text="",
+            font=styles.font(12, "bold", role="note_id"),
+            **styles.style("note_id")
         )
         note_id_label.pack(side="left")
         
         # Дата
         date_label = ctk.CTkLabel(
             header_frame,
-            text=note['timestamp'],
-            font=ctk.CTkFont(size=10),
-            text_color=("gray50", "gray60")
+            text="",
+            font=styles.font(10, role="note_date"),
+            **styles.style("note_date")
         )
         date_label.pack(side="right")
         
         # Текст заметки
         text_label = ctk.CTkLabel(
             note_frame,
-            text=note['text'],
-            font=ctk.CTkFont(size=12),
+            text="",
+            font=styles.font(12, role="note_text"),
             wraplength=300,
             justify="left"
         )
         text_label.pack(fill="x", padx=10, pady=(0, 10))
         
+        # Нижняя строка: "показать еще" слева, удаление справа
+        footer_frame = ctk.CTkFrame(note_frame, fg_color="transparent")
+        footer_frame.pack(fill="x", padx=10, pady=(0, 10))
+        
+        more_btn = ctk.CTkButton(
+            footer_frame,
+            text="",
+            width=30,
+            height=25,
+            font=styles.font(10, role="more"),
+            **styles.style("more_button")
+        )
+        
+        # Весь текст - в отдельном окне (когда не влезает и в развернутое превью)
+        full_btn = ctk.CTkButton(
+            footer_frame,
+            text="📄 Весь текст",
+            width=30,
+            height=25,
+            font=styles.font(10, role="more"),
+            **styles.style("more_button")
+        )
+        
         # Кнопка удаления
-        note_id = note.get('id', '?')
         delete_btn = ctk.CTkButton(
-            note_frame,
+            footer_frame,
             text="🗑️",
             width=30,
             height=25,
-            command=lambda: self.delete_note(note_id),
-            fg_color="transparent",
-            hover_color=("red", "darkred"),
-            font=ctk.CTkFont(size=12)
-        )
-        delete_btn.pack(anchor="e", padx=10, pady=(0, 10))
-        
-    def delete_note(self, note_id):
-        """Удаление заметки"""
-        self.notes = [note for note in self.notes if note['id'] != note_id]
-        self.save_to_file()
-        self.update_notes_display()
-        self.show_notification("🗑️ Заметка удалена!")
-        
-    def show_notification(self, message):
-        """Показ уведомления"""
-        # Создаем временное уведомление
-        notification = ctk.CTkLabel(
-            self.root,
-            text=message,
-            font=ctk.CTkFont(size=12, weight="bold"),
-            fg_color=("green", "darkgreen"),
-            text_color="white",
-            corner_radius=8
+            font=styles.font(12, role="delete"),
+            **styles.style("delete_icon")
         )
-        notification.place(relx=0.5, rely=0.1, anchor="center")
-        
-        # Удаляем через 2 секунды
-        self.root.after(2000, notification.destroy)
-        
-    def load_notes(self):
-        """Загрузка заметок из файла"""
-        if os.path.exists(self.notes_file):
-            try:
-                with open(self.notes_file, 'r', encoding='utf-8') as f:
-                    self.notes = json.load(f)
-                # Добавляем ID для старых заметок, если их нет
-                for i, note in enumerate(self.notes):
-                    if 'id' not in note:
-                        note['id'] = i + 1
-            except:
-                self.notes = []
-        else:
-            self.notes = []
-            
-    def save_to_file(self):
-        """Сохранение заметок в файл"""
-        with open(self.notes_file, 'w', encoding='utf-8') as f:
-            json.dump(self.notes, f, ensure_ascii=False, indent=2)
-            
+        delete_btn.pack(side="right")
+        
+        row = NoteRow(note_frame, note_id_label, date_label, text_label, delete_btn, more_btn, full_btn)
+        delete_btn.configure(command=lambda: self.delete_note(row.note_id))
+        more_btn.configure(command=lambda: self.toggle_note_expanded(row.note_id))
+        full_btn.configure(command=lambda: self.show_full_note(row.note_id))
+        return row
+        
     def animate_appearance(self):
-        """Анимация появления окна"""
+        """Анимация появления окна (кадры в главном цикле, без потоков)"""
         # Устанавливаем начальную прозрачность
         self.root.attributes('-alpha', 0.0)
-        
-        def fade_in():
-            alpha = 0.0
-            while alpha < 0.95:
-                alpha += 0.05
-                try:
-                    self.root.attributes('-alpha', alpha)
-                    time.sleep(0.02)
-                except:
-                    break  # Если окно закрыто, прерываем анимацию
-                
-        # Запускаем анимацию в отдельном потоке
-        threading.Thread(target=fade_in, daemon=True).start()
-        
-    def run(self):
-        """Запуск приложения"""
-        self.update_notes_display()  # Первоначальное отображение заметок
-        self.root.mainloop()
+        self.animator.animate(
+            "fade_in",
+            0.0,
+            0.95,
+            0.4,
+            lambda alpha: self.root.attributes('-alpha', alpha)
+        )
 
 if __name__ == "__main__":
-    widget = BeautifulNotesWidget()
-    widget.run() 
\ No newline at end of file
+    main(BeautifulNotesWidget, _IMPORT_STARTED)
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""Память на одну заметку: словари из JSON против записей Note.
+
+Два набора: короткие тексты с повторами, как в обычном списке дел, и
+уникальные короткие тексты (все тексты разные - объединять нечего).
+Для каждого проверяется, что экономия не меньше MIN_SAVING; при
+меньшей скрипт завершается с ошибкой.
+
+Цель - в 3 раза меньше памяти при 1 млн заметок - достигается только
+для повторов (3.0x: 386 -> 128 байт). Для уникальных текстов она
+недостижима, пока каждая заметка - отдельный объект: сам Note (56 байт),
+ID (28), время (32) и место в списке (8) уже дают 124 байта, а на текст
+при 3x осталось бы меньше 20 - меньше заголовка любой строки или bytes.
+Хранение текста в UTF-8 не помогает: кириллица и там занимает 2 байта
+на символ. Объединение одинаковых времен дало бы выигрыш только на
+синтетических данных этого замера. Поэтому для уникальных текстов
+порог - 1.5x (замер: 1.6x), это защита от регрессий, а не цель.
+
+Запуск из корня проекта:
+    python benchmarks/bench_note_memory.py [количество заметок]
+"""
+import json
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from note_record import notes_from_json  # noqa: E402
+
+TEXTS = ["купить молоко", "позвонить маме", "встреча в 15:00", "оплатить счет", "спорт"]
+WORDS = "купить молоко позвонить маме встреча оплатить счет спорт отчет проект билеты врач подарок".split()
+
+# Наименьшая допустимая экономия памяти для набора (см. описание модуля)
+MIN_SAVING = {"повторы": 3.0, "уникальные": 1.5}
+
+
+def repeated_text(rng, index):
+    """Один из нескольких частых текстов"""
+    return TEXTS[index % len(TEXTS)]
+
+
+def unique_text(rng, index):
+    """Уникальный текст из 2-6 слов с номером (15-50 символов)"""
+    return " ".join(rng.choices(WORDS, k=rng.randint(2, 6))) + f" {index}"
+
+
+def make_json(count, make_text):
+    """JSON с заметками в формате notes.json"""
+    rng = random.Random(0)
+    notes = [
+        {
+            "text": make_text(rng, i),
+            "timestamp": f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d} {i % 24:02d}:{i % 60:02d}:{i % 60:02d}",
+            "id": i + 1,
+        }
+        for i in range(count)
+    ]
+    return json.dumps(notes, ensure_ascii=False)
+
+
+def measure(build):
+    """Память, занятая результатом build(), в байтах"""
+    tracemalloc.start()
+    result = build()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return used, result
+
+
+def bench(count, make_text):
+    """Байт на заметку: словари и Note"""
+    data = make_json(count, make_text)
+    dict_bytes, dicts = measure(lambda: json.loads(data))
+    del dicts
+    note_bytes, notes = measure(lambda: notes_from_json(json.loads(data)))
+    assert notes[-1].to_dict()["id"] == count
+    del notes
+    return dict_bytes / count, note_bytes / count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"заметок: {count}")
+    print(f"{'набор':<11} {'словари, байт':>14} {'Note, байт':>11} {'экономия':>9}")
+    failed = []
+    for name, make_text in (("повторы", repeated_text), ("уникальные", unique_text)):
+        dict_size, note_size = bench(count, make_text)
+        saving = dict_size / note_size
+        print(f"{name:<11} {dict_size:>14.1f} {note_size:>11.1f} {saving:>8.2f}x")
+        if saving < MIN_SAVING[name]:
+            failed.append(f"{name}: {saving:.2f}x < {MIN_SAVING[name]}x")
+    if failed:
+        sys.exit("Экономия памяти ниже порога: " + "; ".join(failed))
+
+
+if __name__ == "__main__":
+    main()
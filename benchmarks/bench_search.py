@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Построение поискового индекса пачками и время запросов.
+
+Пачки - по ``ADD_BATCH_SIZE`` заметок, как их добавляет главный поток
+виджета при загрузке. Слова заметок берутся из словаря в 60 тыс. слов
+(кириллица и латиница) с частотами по закону Ципфа.
+
+Запуск из корня проекта:
+    python benchmarks/bench_search.py [количество заметок]
+"""
+import os
+import random
+import sys
+import time
+from itertools import accumulate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from note_record import Note  # noqa: E402
+from search_index import NoteSearchIndex  # noqa: E402
+
+ADD_BATCH_SIZE = 100
+LETTERS = "абвгдеёжзийклмнопрстуфхцчшщыэюяabcdefghijklmnopqrstuvwxyz"
+QUERIES = ["а", "к", "z", "ко", "ab", "молоко", "abc"]
+REPEAT = 10
+
+
+def make_notes(count):
+    """Заметки от 3 до 20 слов"""
+    rng = random.Random(0)
+    words = ["".join(rng.choice(LETTERS) for _ in range(rng.randint(3, 10))) for _ in range(60_000)]
+    weights = list(accumulate(1 / (rank + 1) ** 0.8 for rank in range(len(words))))
+    return [
+        Note(note_id, " ".join(rng.choices(words, cum_weights=weights, k=rng.randint(3, 20))), 0)
+        for note_id in range(1, count + 1)
+    ]
+
+
+def percentile(values, fraction):
+    """Значение на заданной доле отсортированного списка"""
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    notes = make_notes(count)
+    index = NoteSearchIndex()
+    batches = []
+    for start in range(0, count, ADD_BATCH_SIZE):
+        begin = time.perf_counter()
+        for note in notes[start:start + ADD_BATCH_SIZE]:
+            index.add(note)
+        batches.append((time.perf_counter() - begin) * 1000)
+    print(f"{count} заметок, слов в словаре: {len(index._words)}")
+    batches.sort()
+    print(f"пачка по {ADD_BATCH_SIZE}: p50 {percentile(batches, 0.5):.2f} мс, "
+          f"p95 {percentile(batches, 0.95):.2f} мс, всего {sum(batches):.0f} мс")
+    # Первый запрос сразу после загрузки
+    begin = time.perf_counter()
+    index.search_ids(QUERIES[0])
+    print(f"первый запрос: {(time.perf_counter() - begin) * 1000:.1f} мс")
+    for query in QUERIES:
+        begin = time.perf_counter()
+        for _ in range(REPEAT):
+            found = index.search_ids(query)
+        print(f"  {query:<8} {(time.perf_counter() - begin) * 1000 / REPEAT:>7.2f} мс {len(found):>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""Время загрузки заметок: разбор JSON против бинарного снимка.
+
+Запуск из корня проекта:
+    python benchmarks/bench_snapshot.py [количество заметок ...]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import SNAPSHOT_SUFFIX, open_storage  # noqa: E402
+
+# Короткие заметки с повторами, как в обычном списке дел
+TEXTS = ["купить молоко", "позвонить маме", "встреча в 15:00", "оплатить счет", "спорт"]
+
+
+def write_notes(path, count):
+    """notes.json в формате виджета (с отступами)"""
+    notes = [
+        {
+            "text": f"{TEXTS[i % len(TEXTS)]} #{i}",
+            "timestamp": f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d} {i % 24:02d}:{i % 60:02d}:{i % 60:02d}",
+            "id": i + 1,
+        }
+        for i in range(count)
+    ]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(notes, f, ensure_ascii=False, indent=2)
+
+
+def timed_load(notes_file, engine):
+    """Время load() в новом экземпляре хранилища, мс"""
+    storage = open_storage(notes_file, engine=engine)
+    start = time.perf_counter()
+    notes = storage.load()
+    elapsed = (time.perf_counter() - start) * 1000
+    storage.close()
+    return elapsed, len(notes)
+
+
+def bench(directory, count):
+    """Холодная (без снимка) и теплая загрузка для JSON и журнала"""
+    notes_file = os.path.join(directory, f"notes_{count}.json")
+    write_notes(notes_file, count)
+    # Журнал создается импортом notes.json (вместе со снимком)
+    open_storage(notes_file, engine="journal").load()
+    os.remove(notes_file + "l" + SNAPSHOT_SUFFIX)
+    results = []
+    for engine in ("json", "journal"):
+        cold, loaded = timed_load(notes_file, engine)
+        warm, cached = timed_load(notes_file, engine)
+        assert loaded == cached == count
+        results.append((engine, cold, warm))
+    return results
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    print(f"{'заметок':>9} {'хранилище':>9} {'JSON, мс':>10} {'снимок, мс':>11} {'ускорение':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for count in counts:
+            for engine, cold, warm in bench(directory, count):
+                print(f"{count:>9} {engine:>9} {cold:>10.1f} {warm:>11.1f} {cold / warm:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
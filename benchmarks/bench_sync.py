@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""Объем и время синхронизации через локальный эталонный сервер.
+
+Первое устройство отправляет все заметки, второе их получает; затем
+первое меняет несколько заметок, и по сети идут только эти изменения.
+
+Запуск из корня проекта:
+    python benchmarks/bench_sync.py [количество заметок ...]
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from note_record import Note  # noqa: E402
+from sync import SyncClient, note_payload  # noqa: E402
+from sync_server import make_server  # noqa: E402
+
+TEXTS = ["купить молоко", "позвонить маме", "встреча в 15:00", "оплатить счет", "спорт"]
+EDITS = 10
+
+
+def drain(client):
+    """Чужие изменения из очереди, как их забирает виджет"""
+    count = 0
+    while not client.incoming.empty():
+        item = client.incoming.get_nowait()
+        if isinstance(item, int):
+            client.applied(item)
+        else:
+            client.resolve(item, lambda: count + 1)
+            count += 1
+    return count
+
+
+def timed_sync(client):
+    """Время одного обмена (мс) и переданные байты (отправлено, получено)"""
+    sent, received = client.bytes_sent, client.bytes_received
+    start = time.perf_counter()
+    client.sync_once()
+    elapsed = (time.perf_counter() - start) * 1000
+    return elapsed, client.bytes_sent - sent, client.bytes_received - received
+
+
+def bench(directory, count):
+    server = make_server(port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}"
+    notes = [Note(i + 1, f"{TEXTS[i % len(TEXTS)]} #{i}") for i in range(count)]
+    raw = sum(len(json.dumps(note_payload(note), ensure_ascii=False)) for note in notes)
+
+    first = SyncClient(url, os.path.join(directory, f"a_{count}.json"), local_notes=lambda: notes)
+    second = SyncClient(url, os.path.join(directory, f"b_{count}.json"))
+    first.start(background=False)
+    second.start(background=False)
+    try:
+        rows = [("отправка всех", *timed_sync(first))]
+        rows.append(("получение всех", *timed_sync(second)))
+        assert drain(second) == count
+        first.track(*[("edit", note.copy(text=note.text + " !")) for note in notes[:EDITS]])
+        rows.append((f"отправка {EDITS} правок", *timed_sync(first)))
+        rows.append((f"получение {EDITS} правок", *timed_sync(second)))
+        assert drain(second) == EDITS
+    finally:
+        first.close()
+        second.close()
+        server.shutdown()
+        server.server_close()
+    return raw, rows
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000]
+    with tempfile.TemporaryDirectory() as directory:
+        for count in counts:
+            raw, rows = bench(directory, count)
+            print(f"{count} заметок, JSON без сжатия: {raw // 1024} КБ")
+            for name, elapsed, sent, received in rows:
+                print(f"  {name:<20} {elapsed:>9.1f} мс {sent / 1024:>9.1f} КБ -> {received / 1024:>9.1f} КБ <-")
+
+
+if __name__ == "__main__":
+    main()
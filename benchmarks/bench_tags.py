@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""Время фильтра по тегам (И / ИЛИ) в зависимости от размера результата.
+
+Главная колонка - первый вызов: столько ждет пользователь, когда вводит
+новый фильтр. Он растет линейно с числом найденных заметок: до ~5 тыс.
+результатов укладывается в доли миллисекунды, а ИЛИ частых тегов (десятки
+тысяч заметок) занимает 1-2 мс. Повторный вызов (следующее нажатие
+клавиши при живом поиске) берет запомненный результат. "Поиск" - весь
+путь до списка на экране: NoteSearchIndex.search() отдает представление
+над ID фильтра (заметки берутся при показе), а список измеряет только
+видимые строки, поэтому к фильтру почти ничего не добавляется.
+Отдельно печатается, сколько фильтров не уложились в 1 мс.
+
+Теги распределены неравномерно (частый тег - у каждой четвертой заметки,
+редкие - у сотен), у заметки от 0 до 3 тегов.
+
+Запуск из корня проекта:
+    python benchmarks/bench_tags.py [количество заметок]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from note_record import Note  # noqa: E402
+from search_index import NoteSearchIndex  # noqa: E402
+
+TAGS = [f"тег{i}" for i in range(50)]
+QUERIES = [["тег0", "тег1"], ["тег3", "тег7"], ["тег10", "тег20"], ["тег30", "тег40", "тег45"]]
+REPEAT = 100
+
+
+def build(count):
+    """Индекс заметок без текста с тегами с частотами по закону Ципфа"""
+    rng = random.Random(0)
+    weights = [1 / (rank + 1) for rank in range(len(TAGS))]
+    index = NoteSearchIndex()
+    for note_id in range(1, count + 1):
+        tags = sorted(set(rng.choices(TAGS, weights, k=rng.randint(0, 3))))
+        index.add(Note(note_id, "", 0, {"tags": tags} if tags else None))
+    return index
+
+
+def timed(run, reset=None):
+    """Среднее время run() (мс) и размер результата; reset() - перед каждым"""
+    elapsed = 0.0
+    for _ in range(REPEAT):
+        if reset is not None:
+            reset()
+        start = time.perf_counter()
+        result = run()
+        elapsed += time.perf_counter() - start
+    return elapsed * 1000 / REPEAT, len(result)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    index = build(count)
+    tag_index = index.tags
+
+    def forget():
+        tag_index._last = None
+
+    print(f"{count} заметок")
+    print(f"{'теги':<20} {'фильтр':>6} {'найдено':>8} {'первый, мс':>11} "
+          f"{'поиск, мс':>10} {'повтор, мс':>11}")
+    slow = []
+    for tags in QUERIES:
+        for any_tag, name in ((False, "И"), (True, "ИЛИ")):
+            query = (" | " if any_tag else " ").join("#" + tag for tag in tags)
+            first, found = timed(lambda: tag_index.filter(tags, any_tag), forget)
+            search, _ = timed(lambda: index.search(query), forget)
+            repeat, _ = timed(lambda: tag_index.filter(tags, any_tag))
+            print(f"{' '.join(tags):<20} {name:>6} {found:>8} {first:>11.3f} "
+                  f"{search:>10.3f} {repeat:>11.4f}")
+            if first >= 1:
+                slow.append(f"{query} ({found} заметок)")
+    print(f"Первый вызов дольше 1 мс: {len(slow)} из {len(QUERIES) * 2}"
+          + (" - " + ", ".join(slow) if slow else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""Проверка: два процесса одновременно сохраняют заметку с одним ID.
+
+Процесс B выдал ID новой заметке, но еще не записал ее, а процесс A успел
+записать свою заметку с тем же ID. Хранилище B переименовывает свою
+заметку; заметки в памяти B после применения ``read_changes()`` (так же,
+как их применяет виджет) должны совпасть с хранилищем: под старым ID -
+заметка A, под новым - заметка B. Проверяются оба порядка: чужая запись
+прочитана до своей записи и после нее. При расхождении скрипт завершается
+с ошибкой.
+
+Запуск из корня проекта:
+    python benchmarks/check_renumber.py
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from note_record import Note  # noqa: E402
+from storage import ENGINES, open_storage  # noqa: E402
+
+
+def write_foreign(notes_file, engine, note_id):
+    """Процесс A: своя заметка с тем же ID"""
+    storage = open_storage(notes_file, engine=engine)
+    storage.load()
+    storage.apply([("add", Note(note_id, "from A", 0))])
+    storage.close()
+
+
+def apply_changes(memory, changes):
+    """Изменения из read_changes() - так же, как их применяет виджет"""
+    for op, payload in changes:
+        if op == "renumber":
+            old_id, new_id, note = payload
+            if note is not None:
+                memory[note.id] = note
+        elif op == "delete":
+            memory.pop(payload, None)
+        else:
+            memory[payload.id] = payload
+
+
+def run(engine, read_first):
+    """Один сценарий; возвращает описание ошибки или None"""
+    with tempfile.TemporaryDirectory() as directory:
+        notes_file = os.path.join(directory, "notes.json")
+        storage = open_storage(notes_file, engine=engine)
+        storage.save_all([Note(1, "first", 0)])
+        memory = {note.id: note for note in storage.load()}
+        # B выдает ID 2, но запись еще стоит в очереди
+        ours = Note(2, "from B", 0)
+        memory[ours.id] = ours
+        process = multiprocessing.Process(target=write_foreign, args=(notes_file, engine, 2))
+        process.start()
+        process.join()
+        if read_first:
+            apply_changes(memory, storage.read_changes())
+        storage.apply([("add", ours)])
+        apply_changes(memory, storage.read_changes())
+        storage.close()
+        stored = {note.id: note.text for note in open_storage(notes_file, engine=engine).load()}
+        shown = {note_id: note.text for note_id, note in memory.items()}
+        if shown != stored:
+            return f"в памяти {shown}, в хранилище {stored}"
+    return None
+
+
+def main():
+    failed = False
+    for engine in sorted(ENGINES):
+        for read_first in (False, True):
+            error = run(engine, read_first)
+            order = "чужая запись прочитана раньше" if read_first else "одной пачкой"
+            print(f"{engine:<8} {order:<32} {'ошибка: ' + error if error else 'ok'}")
+            failed = failed or error is not None
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+
+class WindowDragger:
+    """Перетаскивание окна за заголовок
+
+    Положение окна и указателя запоминается один раз в начале
+    перетаскивания; события движения мыши только обновляют цель, а
+    геометрия окна меняется не чаще одного раза за кадр. Прилипание к
+    краям экрана (``snap_distance`` > 0) считается в том же проходе.
+    """
+
+    def __init__(self, root, frame_ms=16, snap_distance=0):
+        self.root = root
+        self.frame_ms = frame_ms
+        self.snap_distance = snap_distance
+        self.is_dragging = False
+        self._origin = (0, 0)
+        self._pointer = (0, 0)
+        self._window_size = (0, 0)
+        self._screen_size = (0, 0)
+        self._target = None
+        self._applied = None
+        self._job = None
+
+    def start(self, event):
+        """Начало перетаскивания: запоминаем окно, указатель и экран"""
+        self.is_dragging = True
+        self._target = None
+        self._origin = (self.root.winfo_x(), self.root.winfo_y())
+        self._pointer = (event.x_root, event.y_root)
+        self._window_size = (self.root.winfo_width(), self.root.winfo_height())
+        self._screen_size = (self.root.winfo_screenwidth(), self.root.winfo_screenheight())
+        self._applied = self._origin
+
+    def move(self, event):
+        """Движение мыши: только запоминаем цель и планируем кадр"""
+        if not self.is_dragging:
+            return
+        self._target = (
+            self._origin[0] + event.x_root - self._pointer[0],
+            self._origin[1] + event.y_root - self._pointer[1]
+        )
+        if self._job is None:
+            self._job = self.root.after(self.frame_ms, self._apply)
+
+    def stop(self, event=None):
+        """Окончание перетаскивания: применяем последнюю цель сразу"""
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._apply()
+        self.is_dragging = False
+
+    def _snap(self, x, y):
+        """Прилипание к краям экрана"""
+        distance = self.snap_distance
+        width, height = self._window_size
+        screen_width, screen_height = self._screen_size
+        if abs(x) <= distance:
+            x = 0
+        elif abs(screen_width - (x + width)) <= distance:
+            x = screen_width - width
+        if abs(y) <= distance:
+            y = 0
+        elif abs(screen_height - (y + height)) <= distance:
+            y = screen_height - height
+        return x, y
+
+    def _apply(self):
+        """Один кадр: одно изменение геометрии окна"""
+        self._job = None
+        if self._target is None:
+            return
+        x, y = self._target
+        if self.snap_distance > 0:
+            x, y = self._snap(x, y)
+        if (x, y) != self._applied:
+            self.root.geometry(f"+{x}+{y}")
+            self._applied = (x, y)
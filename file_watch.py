@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""Совместная работа нескольких экземпляров виджета с одним файлом.
+
+``FileLock`` - межпроцессная блокировка (fcntl в Linux/macOS, msvcrt в
+Windows), ``FileWatcher`` - фоновое отслеживание изменений файлов через
+inotify, а где его нет - опросом размера и времени изменения.
+"""
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """Межпроцессная блокировка через файл ``<path>.lock``
+
+    Используется как контекстный менеджер; внутри одного процесса
+    блокировку дополнительно должен защищать обычный ``threading.Lock``.
+    """
+
+    def __init__(self, path):
+        self.path = path + ".lock"
+        self._fd = None
+
+    def acquire(self, blocking=True):
+        """Захват блокировки; при blocking=False - False, если она занята"""
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+                try:
+                    fcntl.flock(fd, flags)
+                except BlockingIOError:
+                    os.close(fd)
+                    return False
+            else:
+                while True:
+                    try:
+                        msvcrt.locking(fd, msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+                        break
+                    except OSError:
+                        if not blocking:
+                            os.close(fd)
+                            return False
+                        # LK_LOCK сдается после 10 попыток - пробуем снова
+                        continue
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+        return True
+
+    def release(self):
+        """Освобождение блокировки"""
+        fd, self._fd = self._fd, None
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+# Флаги inotify (linux/inotify.h)
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _Inotify:
+    """Минимальная обертка над inotify через ctypes (только Linux)"""
+
+    def __init__(self, fd):
+        self.fd = fd
+
+    @classmethod
+    def create(cls, directories):
+        """Наблюдение за каталогами; None, если inotify недоступен"""
+        if not sys.platform.startswith("linux"):
+            return None
+        # ctypes нужен только потоку наблюдателя (FileLock берут и хранилища)
+        import ctypes
+        import ctypes.util
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        if fd < 0:
+            return None
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+        for directory in directories:
+            if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+                os.close(fd)
+                return None
+        return cls(fd)
+
+    def read(self, timeout):
+        """Имена файлов из событий, пришедших за timeout секунд"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        names = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            names.append(os.fsdecode(data[offset:offset + length].rstrip(b"\0")))
+            offset += length
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FileWatcher:
+    """Фоновое отслеживание изменений файлов
+
+    ``on_change`` вызывается в потоке наблюдателя (не в потоке Tk), не
+    чаще одного раза за ``debounce`` секунд, даже если файл менялся много
+    раз подряд, и один раз сразу после запуска. Свои собственные записи
+    наблюдатель тоже видит - отличать их от чужих должен тот, кто читает
+    изменения.
+    """
+
+    def __init__(self, paths, on_change, interval=1.0, debounce=0.05):
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.on_change = on_change
+        self.interval = interval
+        self.debounce = debounce
+        self.last_error = None
+        self._names = {os.path.basename(path) for path in self.paths}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="notes-watcher")
+
+    def start(self):
+        """Запуск наблюдения"""
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Остановка наблюдения"""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def _signature(self):
+        """Размер, время изменения и inode каждого файла"""
+        signature = []
+        for path in self.paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                signature.append(None)
+                continue
+            signature.append((stat.st_size, stat.st_mtime_ns, stat.st_ino))
+        return signature
+
+    def _notify(self):
+        """Вызов обработчика; ошибки не останавливают наблюдение"""
+        try:
+            self.on_change()
+        except Exception as error:
+            self.last_error = error
+
+    def _run(self):
+        directories = {os.path.dirname(path) for path in self.paths}
+        inotify = _Inotify.create(directories)
+        if inotify is None:
+            self._poll()
+            return
+        try:
+            # Изменения, сделанные до запуска наблюдения
+            self._notify()
+            while not self._stop.is_set():
+                if not self._names.intersection(inotify.read(self.interval)):
+                    continue
+                # Серию событий одной записи сводим в один вызов
+                time.sleep(self.debounce)
+                inotify.read(0)
+                self._notify()
+        finally:
+            inotify.close()
+
+    def _poll(self):
+        """Запасной вариант: опрос размера и времени изменения"""
+        signature = self._signature()
+        self._notify()
+        while not self._stop.wait(self.interval):
+            current = self._signature()
+            if current != signature:
+                signature = current
+                self._notify()
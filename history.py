@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""История изменений для отмены и повтора.
+
+Хранятся не копии всего списка заметок, а сами изменения: операция,
+заметка до и после, ее позиция в коллекции. Память растет с глубиной
+истории, а не с числом заметок, а отмена - это применение обратного
+изменения к одной заметке.
+"""
+from collections import deque
+
+
+class Change:
+    """Одно изменение заметки
+
+    ``op`` - "add", "delete" или "edit"; ``before`` и ``after`` - заметка
+    до и после (None, если ее не было); ``position`` - место заметки в
+    коллекции (None - место по порядку ID); ``archived`` - заметка лежала
+    в архиве.
+    """
+
+    __slots__ = ("op", "before", "after", "position", "archived")
+
+    def __init__(self, op, before=None, after=None, position=None, archived=False):
+        self.op = op
+        self.before = before
+        self.after = after
+        self.position = position
+        self.archived = archived
+
+    @classmethod
+    def added(cls, note, position):
+        """Добавление заметки"""
+        return cls("add", after=note, position=position)
+
+    @classmethod
+    def deleted(cls, note, position, archived=False):
+        """Удаление заметки"""
+        return cls("delete", before=note, position=position, archived=archived)
+
+    @classmethod
+    def edited(cls, before, after):
+        """Изменение заметки"""
+        return cls("edit", before=before, after=after)
+
+    @property
+    def note_id(self):
+        """ID затронутой заметки"""
+        return (self.after or self.before).id
+
+    def inverted(self):
+        """Обратное изменение"""
+        op = {"add": "delete", "delete": "add"}.get(self.op, self.op)
+        return Change(op, self.after, self.before, self.position, self.archived)
+
+    def can_apply(self, notes):
+        """Совпадает ли коллекция с состоянием до изменения
+
+        Заметку могли изменить или удалить в другом окне - тогда изменение
+        из истории уже не применить.
+        """
+        if self.op == "add":
+            return self.after.id not in notes
+        return notes.get(self.before.id) == self.before
+
+
+class UndoHistory:
+    """Ограниченные стеки отмены и повтора"""
+
+    def __init__(self, limit=100):
+        self._undo = deque(maxlen=limit)
+        self._redo = deque(maxlen=limit)
+
+    def __len__(self):
+        return len(self._undo)
+
+    def record(self, change):
+        """Новое изменение (повтор отмененного после него невозможен)"""
+        self._undo.append(change)
+        self._redo.clear()
+
+    def undo(self):
+        """Изменение, отменяющее последнее (None, если отменять нечего)"""
+        if not self._undo:
+            return None
+        change = self._undo.pop()
+        self._redo.append(change)
+        return change.inverted()
+
+    def redo(self):
+        """Последнее отмененное изменение (None, если повторять нечего)"""
+        if not self._redo:
+            return None
+        change = self._redo.pop()
+        self._undo.append(change)
+        return change
+
+    def renumber(self, old_id, new_id):
+        """Заметка получила другой ID (его занял другой экземпляр)"""
+        for stack in (self._undo, self._redo):
+            for change in stack:
+                if change.before is not None and change.before.id == old_id:
+                    change.before = change.before.copy(id=new_id)
+                if change.after is not None and change.after.id == old_id:
+                    change.after = change.after.copy(id=new_id)
+
+    def replace(self, old, new):
+        """Заметка изменена не пользователем (например, сработало напоминание)"""
+        for stack in (self._undo, self._redo):
+            for change in stack:
+                if change.before is old:
+                    change.before = new
+                if change.after is old:
+                    change.after = new
+
+    def clear(self):
+        """Очистка истории"""
+        self._undo.clear()
+        self._redo.clear()
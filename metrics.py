@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""Замер времени горячих путей (режим --metrics).
+
+Замеры включаются только по запросу: ``Metrics.instrument()`` подменяет
+методы конкретного объекта обертками с таймером, поэтому без режима
+--metrics код виджета работает без накладных расходов.
+"""
+import functools
+import json
+import time
+from collections import deque
+
+
+def nearest_rank(ordered, percent):
+    """Процентиль отсортированного списка методом ближайшего ранга"""
+    if not ordered:
+        return 0.0
+    rank = -(-len(ordered) * percent // 100)
+    return ordered[max(1, rank) - 1]
+
+
+class Histogram:
+    """Распределение длительностей одного пути
+
+    Счетчик, сумма и максимум учитывают все замеры, а процентили
+    считаются по последним ``max_samples`` замерам.
+    """
+
+    def __init__(self, max_samples=10000):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._samples = deque(maxlen=max_samples)
+
+    def add(self, seconds):
+        """Добавление одного замера"""
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self._samples.append(seconds)
+
+    def percentile(self, percent):
+        """Процентиль в секундах"""
+        return nearest_rank(sorted(self._samples), percent)
+
+    def summary(self):
+        """Сводка в миллисекундах"""
+        ordered = sorted(self._samples)
+        summary = {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+        }
+        for percent in (50, 95, 99):
+            summary[f"p{percent}"] = nearest_rank(ordered, percent)
+        summary["max"] = self.max
+        return {
+            key: value if key == "count" else round(value * 1000, 3)
+            for key, value in summary.items()
+        }
+
+
+class Metrics:
+    """Набор гистограмм по именам путей (используется из главного потока)"""
+
+    def __init__(self, budget_ms=100):
+        self.budget_ms = budget_ms
+        self.histograms = {}
+
+    def record(self, name, seconds):
+        """Добавление замера к гистограмме name"""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.add(seconds)
+
+    def timed(self, name, func):
+        """Обертка функции с замером времени каждого вызова"""
+        record = self.record
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - started)
+
+        return wrapper
+
+    def instrument(self, obj, methods):
+        """Замена методов объекта обертками; methods: имя метода -> имя пути"""
+        for method, name in methods.items():
+            setattr(obj, method, self.timed(name, getattr(obj, method)))
+
+    def summary(self):
+        """Сводка по всем путям в миллисекундах"""
+        return {name: self.histograms[name].summary() for name in sorted(self.histograms)}
+
+    def dump(self, path, extra=None):
+        """Запись сводки в JSON файл"""
+        data = {"timings_ms": self.summary()}
+        if extra:
+            data.update(extra)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        return path
+
+
+class MainLoopWatchdog:
+    """Обнаружение долгих обработчиков главного цикла Tk
+
+    Раз в ``interval_ms`` ставится отметка через ``root.after``; если она
+    сработала позже срока больше чем на ``budget_ms``, значит цикл был занят
+    одним или несколькими обработчиками. Опоздание пишется в гистограмму
+    ``main_loop_lag``, а ``on_block(ms)`` вызывается не чаще раза в
+    ``cooldown`` секунд.
+    """
+
+    def __init__(self, root, metrics, on_block, interval_ms=50, cooldown=5.0):
+        self.root = root
+        self.metrics = metrics
+        self.on_block = on_block
+        self.interval_ms = interval_ms
+        self.cooldown = cooldown
+        self._expected = None
+        self._last_warning = 0.0
+
+    def start(self):
+        """Запуск отметок"""
+        self._schedule()
+
+    def _schedule(self):
+        """Следующая отметка"""
+        self._expected = time.perf_counter() + self.interval_ms / 1000
+        self.root.after(self.interval_ms, self._tick)
+
+    def _tick(self):
+        """Отметка сработала: насколько она опоздала"""
+        now = time.perf_counter()
+        lag = max(0.0, now - self._expected)
+        self.metrics.record("main_loop_lag", lag)
+        lag_ms = lag * 1000
+        if lag_ms > self.metrics.budget_ms and now - self._last_warning >= self.cooldown:
+            self._last_warning = now
+            self.on_block(int(lag_ms))
+        self._schedule()
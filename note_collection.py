@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+from note_record import Note
+
+
+class NoteCollection:
+    """Коллекция заметок с индексом по ID
+
+    Порядок заметок стабилен (порядок добавления), поиск, добавление и
+    удаление по ID работают за O(1), а новые ID выдаются счетчиком и
+    никогда не повторяются.
+    """
+
+    def __init__(self, notes=()):
+        self._notes = {}
+        # Более старые заметки, подгруженные пачками (новые первыми)
+        self._older = {}
+        self._next_id = 1
+        for note in notes:
+            self.add(note)
+
+    def __len__(self):
+        return len(self._notes) + len(self._older)
+
+    def __iter__(self):
+        self._merge_older()
+        return iter(self._notes.values())
+
+    def __reversed__(self):
+        self._merge_older()
+        return reversed(list(self._notes.values()))
+
+    def __contains__(self, note_id):
+        return note_id in self._notes or note_id in self._older
+
+    def get(self, note_id, default=None):
+        """Заметка по ID"""
+        note = self._notes.get(note_id)
+        if note is None:
+            note = self._older.get(note_id, default)
+        return note
+
+    def add_older(self, notes):
+        """Добавление пачки более старых заметок (новые первыми) в начало"""
+        for note in notes:
+            note_id = note.id
+            self._older[note_id] = note
+            if note_id >= self._next_id:
+                self._next_id = note_id + 1
+
+    def _merge_older(self):
+        """Объединение подгруженных пачек с основным порядком"""
+        if self._older:
+            merged = dict(reversed(list(self._older.items())))
+            merged.update(self._notes)
+            self._notes = merged
+            self._older = {}
+
+    def reserve_ids(self, max_id):
+        """Новые ID будут больше max_id (например, ID заметок в архиве)"""
+        if max_id >= self._next_id:
+            self._next_id = max_id + 1
+
+    def new_id(self):
+        """Выдача следующего свободного ID"""
+        note_id = self._next_id
+        self._next_id += 1
+        return note_id
+
+    def add(self, note):
+        """Добавление заметки с уже назначенным ID"""
+        note_id = note.id
+        self._notes[note_id] = note
+        if note_id >= self._next_id:
+            self._next_id = note_id + 1
+        return note
+
+    def create(self, text, created=None, extra=None):
+        """Создание новой заметки со следующим ID (по умолчанию - сейчас)"""
+        return self.add(Note(self.new_id(), text, created, extra))
+
+    def insert(self, position, note):
+        """Вставка заметки на прежнее место (например, при отмене удаления)"""
+        self._merge_older()
+        if position is None or position >= len(self._notes):
+            return self.add(note)
+        items = list(self._notes.items())
+        items.insert(position, (note.id, note))
+        self._notes = dict(items)
+        if note.id >= self._next_id:
+            self._next_id = note.id + 1
+        return note
+
+    def restore(self, note):
+        """Возврат удаленной заметки на место по порядку ID (отмена удаления)
+
+        Место не запоминается при удалении - его поиск стоит O(n), и
+        платит за него только отмена, а не каждое удаление.
+        """
+        self._merge_older()
+        position = 0
+        for note_id in self._notes:
+            if note_id > note.id:
+                break
+            position += 1
+        return self.insert(position, note)
+
+    def replace(self, note):
+        """Замена заметки с тем же ID (позиция сохраняется)"""
+        if note.id in self._notes:
+            self._notes[note.id] = note
+        elif note.id in self._older:
+            self._older[note.id] = note
+        else:
+            raise KeyError(note.id)
+        return note
+
+    def remove(self, note_id):
+        """Удаление заметки по ID; возвращает удаленную заметку или None"""
+        note = self._notes.pop(note_id, None)
+        if note is None:
+            note = self._older.pop(note_id, None)
+        return note
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""Компактная запись заметки.
+
+В JSON заметка хранится как ``{"text": ..., "timestamp": "YYYY-MM-DD
+HH:MM:SS", "id": ...}``. В памяти это объект ``Note`` со ``__slots__``:
+время создания - целое число секунд, а строка для показа формируется
+только когда она нужна. Одинаковые короткие тексты хранятся один раз.
+"""
+import calendar
+import sys
+import time
+
+# Формат времени в JSON и в интерфейсе
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Тексты не длиннее этого объединяются (одинаковые хранятся один раз)
+INTERN_MAX_LENGTH = 64
+
+
+def current_timestamp():
+    """Текущее местное время в секундах"""
+    return calendar.timegm(time.localtime())
+
+
+def format_timestamp(created):
+    """Секунды -> строка 'YYYY-MM-DD HH:MM:SS'"""
+    return time.strftime(TIMESTAMP_FORMAT, time.gmtime(created))
+
+
+def parse_timestamp(text):
+    """Строка 'YYYY-MM-DD HH:MM:SS' -> секунды; None, если формат другой
+
+    Время считается местным, как в строке, без перевода в UTC, поэтому
+    обратное преобразование всегда дает исходную строку.
+    """
+    if len(text) != 19 or text[4] != '-' or text[7] != '-' or text[10] != ' ':
+        return None
+    try:
+        fields = (
+            int(text[0:4]), int(text[5:7]), int(text[8:10]),
+            int(text[11:13]), int(text[14:16]), int(text[17:19])
+        )
+    except ValueError:
+        return None
+    created = calendar.timegm(fields)
+    # Несуществующие даты (например, 30 февраля) оставляем строкой
+    if fields[2] > 28 and format_timestamp(created) != text:
+        return None
+    return created
+
+
+class Note:
+    """Заметка: ID, текст и время создания
+
+    ``created`` - секунды (или исходная строка, если время в файле записано
+    в другом формате). Остальные поля JSON попадают в словарь ``extra``;
+    они редки, поэтому хранятся только у заметок класса ``_ExtendedNote``.
+    """
+
+    __slots__ = ("id", "text", "created")
+
+    # У обычной заметки дополнительных полей нет
+    extra = None
+
+    def __new__(cls, id, text, created=None, extra=None):
+        if extra and cls is Note:
+            cls = _ExtendedNote
+        return object.__new__(cls)
+
+    def __init__(self, id, text, created=None, extra=None):
+        self.id = id
+        self.text = text
+        self.created = current_timestamp() if created is None else created
+        if extra:
+            self.extra = extra
+
+    @property
+    def timestamp(self):
+        """Время создания для показа (формируется при обращении)"""
+        if isinstance(self.created, str):
+            return self.created
+        return format_timestamp(self.created)
+
+    @classmethod
+    def from_dict(cls, data, default_id=None, intern=True):
+        """Заметка из словаря JSON (без ID берется default_id)"""
+        text = data['text']
+        if intern and len(text) <= INTERN_MAX_LENGTH:
+            text = sys.intern(text)
+        timestamp = data.get('timestamp', "")
+        created = parse_timestamp(timestamp)
+        extra = None
+        if len(data) > 1 + ('id' in data) + ('timestamp' in data):
+            extra = {
+                key: value for key, value in data.items()
+                if key not in ('id', 'text', 'timestamp')
+            }
+        return cls(
+            data.get('id', default_id),
+            text,
+            timestamp if created is None else created,
+            extra
+        )
+
+    def to_dict(self):
+        """Словарь в формате JSON"""
+        data = {"text": self.text, "timestamp": self.timestamp, "id": self.id}
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def copy(self, **changes):
+        """Копия заметки с измененными полями"""
+        fields = {"id": self.id, "text": self.text, "created": self.created, "extra": self.extra}
+        fields.update(changes)
+        return Note(**fields)
+
+    def __eq__(self, other):
+        if not isinstance(other, Note):
+            return NotImplemented
+        return (
+            self.id == other.id and self.text == other.text
+            and self.created == other.created and self.extra == other.extra
+        )
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Note(id={self.id!r}, text={self.text!r}, timestamp={self.timestamp!r})"
+
+
+class _ExtendedNote(Note):
+    """Заметка с дополнительными полями"""
+
+    __slots__ = ("extra",)
+
+
+def notes_from_json(items):
+    """Словари из JSON -> заметки (старым заметкам без ID - номер по порядку)
+
+    Одинаковые короткие тексты объединяются словарем на время загрузки, а
+    не sys.intern: уникальные тексты не остаются в таблице интернированных
+    строк (около 40 байт на заметку).
+    """
+    texts = {}
+    notes = []
+    for index, data in enumerate(items):
+        note = Note.from_dict(data, default_id=index + 1, intern=False)
+        if len(note.text) <= INTERN_MAX_LENGTH:
+            note.text = texts.setdefault(note.text, note.text)
+        notes.append(note)
+    return notes
@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+"""Импорт и экспорт заметок из командной строки (без окна и дисплея).
+
+    python notes_cli.py export --format md --output notes.md
+    python notes_cli.py export --format csv > notes.csv
+    python notes_cli.py import old_notes.jsonl
+    python notes_cli.py backup restore --at "2025-03-01 12:00:00"
+
+Заметки идут через цепочку генераторов по одной, поэтому экспорт большого
+архива или импорт миллиона заметок не требуют держать их все в памяти.
+Используются те же хранилища, что и в виджете.
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+from itertools import islice
+
+from archive import NoteArchive
+from backup import BackupStore
+from note_record import Note, current_timestamp, format_timestamp
+from storage import ENGINES, open_storage
+
+FORMATS = ("jsonl", "md", "csv")
+
+# Сколько импортированных заметок записывается в хранилище за раз
+IMPORT_BATCH_SIZE = 1000
+
+# Заголовок заметки в Markdown: "## #12 · 2024-05-01 12:00:00"
+MD_HEADING = re.compile(r"^## #(\d+) · (.*)$")
+CSV_FIELDS = ("id", "timestamp", "text", "extra")
+
+
+def write_jsonl(notes, out):
+    """Заметки -> JSON Lines (без потерь, включая дополнительные поля)"""
+    for note in notes:
+        out.write(json.dumps(note.to_dict(), ensure_ascii=False) + "\n")
+        yield note
+
+
+def write_markdown(notes, out):
+    """Заметки -> Markdown: заголовок с ID и временем, затем текст"""
+    for note in notes:
+        out.write(f"## #{note.id} · {note.timestamp}\n\n")
+        for line in note.text.split("\n"):
+            # Строки, похожие на заголовок заметки, экранируются
+            if line.lstrip("\\").startswith("## #"):
+                line = "\\" + line
+            out.write(line + "\n")
+        out.write("\n")
+        yield note
+
+
+def write_csv(notes, out):
+    """Заметки -> CSV (дополнительные поля - JSON в колонке extra)"""
+    writer = csv.writer(out)
+    writer.writerow(CSV_FIELDS)
+    for note in notes:
+        extra = json.dumps(note.extra, ensure_ascii=False) if note.extra else ""
+        writer.writerow((note.id, note.timestamp, note.text, extra))
+        yield note
+
+
+def iter_lines(stream, errors):
+    """Строки потока; на ошибке кодировки чтение останавливается (она - в errors)"""
+    try:
+        yield from stream
+    except UnicodeDecodeError as e:
+        errors.append(f"файл не в UTF-8: {e}")
+
+
+def read_jsonl(stream, errors):
+    """JSON Lines -> (номер строки, словарь заметки); ошибочные строки - в errors"""
+    for number, line in enumerate(iter_lines(stream, errors), 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            errors.append(f"строка {number}: {e}")
+            continue
+        yield number, record
+
+
+def read_markdown(stream, errors):
+    """Markdown, записанный write_markdown() -> (номер строки заголовка, словарь)"""
+    heading = None
+    lines = []
+    for number, line in enumerate(iter_lines(stream, errors), 1):
+        line = line.rstrip("\n")
+        match = MD_HEADING.match(line)
+        if match:
+            if heading is not None:
+                yield heading_number, _markdown_note(heading, lines)
+            heading, heading_number, lines = match, number, []
+            continue
+        if line.startswith("\\") and line.lstrip("\\").startswith("## #"):
+            line = line[1:]
+        lines.append(line)
+    if heading is not None:
+        yield heading_number, _markdown_note(heading, lines)
+
+
+def _markdown_note(heading, lines):
+    """Заметка из заголовка и строк текста Markdown"""
+    return {
+        "text": "\n".join(lines).strip("\n"),
+        "timestamp": heading.group(2),
+        "id": int(heading.group(1)),
+    }
+
+
+def read_csv(stream, errors):
+    """CSV с колонками text и (необязательно) timestamp, extra -> (номер строки, словарь)
+
+    Ошибочные строки пропускаются, они - в errors.
+    """
+    reader = csv.DictReader(iter_lines(stream, errors))
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            errors.append(f"строка {reader.line_num}: {e}")
+            continue
+        if row.get("text") is None:
+            errors.append(f"строка {reader.line_num}: нет колонки text")
+            continue
+        note = {"text": row["text"]}
+        if row.get("timestamp"):
+            note["timestamp"] = row["timestamp"]
+        if row.get("extra"):
+            try:
+                note.update(json.loads(row["extra"]))
+            except (ValueError, TypeError) as e:
+                errors.append(f"строка {reader.line_num}: extra - {e}")
+                continue
+        yield reader.line_num, note
+
+
+WRITERS = {"jsonl": write_jsonl, "md": write_markdown, "csv": write_csv}
+READERS = {"jsonl": read_jsonl, "md": read_markdown, "csv": read_csv}
+
+
+def iter_all_notes(storage, archive=None):
+    """Все заметки от старых к новым: сначала архив, затем хранилище"""
+    if archive is not None:
+        for segment in reversed(archive.segments()):
+            yield from reversed(archive.read_segment(segment))
+    yield from storage.iter_notes()
+
+
+def next_note_id(storage, archive=None):
+    """Следующий ID, как его выдал бы save_note(): максимальный + 1"""
+    if hasattr(storage, "max_id"):
+        max_id = storage.max_id()
+    else:
+        max_id = max((note.id for note in storage.iter_notes()), default=0)
+    if archive is not None:
+        max_id = max(max_id, archive.max_id())
+    return max_id + 1
+
+
+def to_new_notes(records, first_id, errors):
+    """(номер строки, словарь) из файла -> новые заметки с ID подряд от first_id
+
+    Записи, из которых не получается заметка, пропускаются (они - в errors).
+    """
+    note_id = first_id
+    for number, record in records:
+        if not isinstance(record, dict) or not isinstance(record.get("text"), str):
+            errors.append(f"строка {number}: нет текста заметки")
+            continue
+        record = dict(record, id=note_id)
+        if not record.get("timestamp"):
+            # Без времени заметка получает текущее, как в save_note()
+            record["timestamp"] = format_timestamp(current_timestamp())
+        try:
+            note = Note.from_dict(record)
+        except (TypeError, ValueError) as e:
+            errors.append(f"строка {number}: {e}")
+            continue
+        note_id += 1
+        yield note
+
+
+def import_notes(storage, notes, batch_size=IMPORT_BATCH_SIZE):
+    """Запись заметок в хранилище пачками; возвращает количество
+
+    ``batch_size=None`` - одна пачка на все заметки.
+    """
+    count = 0
+    while True:
+        batch = [("add", note) for note in islice(notes, batch_size)]
+        if not batch:
+            return count
+        storage.apply(batch)
+        count += len(batch)
+
+
+def export_notes(notes, out, fmt):
+    """Запись заметок в поток; возвращает количество"""
+    count = 0
+    for _ in WRITERS[fmt](notes, out):
+        count += 1
+    return count
+
+
+def detect_format(path, fmt):
+    """Формат из параметра или по расширению файла"""
+    if fmt:
+        return fmt
+    extension = os.path.splitext(path or "")[1].lower().lstrip(".")
+    fmt = {"markdown": "md", "ndjson": "jsonl"}.get(extension, extension)
+    if fmt not in FORMATS:
+        raise SystemExit("Укажите формат: --format " + "|".join(FORMATS))
+    return fmt
+
+
+def run_backup(args, storage, archive=None):
+    """Команды резервного копирования (копия включает архив)"""
+    backups = BackupStore(args.backup_dir)
+    if args.action == "list":
+        for snapshot in backups.snapshots():
+            print(f"{snapshot['name']}  {snapshot['created']}  заметок: {snapshot['notes']}")
+        print(f"Занято на диске: {backups.disk_usage() // 1024} КБ", file=sys.stderr)
+    elif args.action == "create":
+        manifest = backups.create(iter_all_notes(storage, archive))
+        backups.prune()
+        print(f"Копия: {manifest['name']}" if manifest else "Изменений нет, копия не нужна",
+              file=sys.stderr)
+    elif args.action == "verify":
+        errors = backups.verify(args.name)
+        for error in errors:
+            print(error)
+        print("Ошибок нет" if not errors else f"Ошибок: {len(errors)}", file=sys.stderr)
+        return 1 if errors else 0
+    else:
+        name = args.name or (backups.find(args.at) if args.at else None)
+        if name is None:
+            raise SystemExit("Копия не найдена: укажите --name или --at")
+        notes = backups.read(name)
+        # Текущее состояние тоже сохраняется - восстановление можно отменить
+        backups.create(iter_all_notes(storage, archive))
+        if archive is not None:
+            # Заметки, которые сейчас в архиве, остаются там: иначе после
+            # восстановления они оказались бы и в архиве, и в хранилище
+            archived = archive.restore(note.id for note in notes)
+            storage.save_all([note for note in notes if note.id not in archived])
+        else:
+            storage.save_all(notes)
+        print(f"Восстановлено из {name}: {len(notes)} заметок", file=sys.stderr)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Импорт и экспорт заметок")
+    parser.add_argument("--notes-file", default="notes.json", help="файл заметок виджета")
+    parser.add_argument("--engine", default="journal", choices=sorted(ENGINES))
+    parser.add_argument("--archive", default="notes_archive", help="папка архива ('' - без архива)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="выгрузить заметки")
+    export_parser.add_argument("--format", choices=FORMATS)
+    export_parser.add_argument("--output", help="файл (по умолчанию - stdout)")
+
+    import_parser = commands.add_parser("import", help="загрузить заметки")
+    import_parser.add_argument("input", help="файл или '-' для stdin")
+    import_parser.add_argument("--format", choices=FORMATS)
+
+    backup_parser = commands.add_parser("backup", help="резервные копии")
+    backup_parser.add_argument("action", choices=("list", "create", "verify", "restore"))
+    backup_parser.add_argument("--backup-dir", default="notes_backup")
+    backup_parser.add_argument("--name", help="имя копии (из backup list)")
+    backup_parser.add_argument("--at", help="время 'YYYY-MM-DD HH:MM:SS': последняя копия до него")
+
+    args = parser.parse_args(argv)
+    storage = open_storage(args.notes_file, engine=args.engine)
+    archive = NoteArchive(args.archive) if args.archive else None
+    try:
+        if args.command == "backup":
+            return run_backup(args, storage, archive)
+        if args.command == "export":
+            fmt = detect_format(args.output, args.format)
+            notes = iter_all_notes(storage, archive)
+            if args.output:
+                with open(args.output, 'w', encoding='utf-8', newline="") as out:
+                    count = export_notes(notes, out, fmt)
+            else:
+                sys.stdout.reconfigure(encoding='utf-8')
+                count = export_notes(notes, sys.stdout, fmt)
+            print(f"Выгружено заметок: {count}", file=sys.stderr)
+        else:
+            fmt = detect_format(None if args.input == "-" else args.input, args.format)
+            if args.input == "-":
+                sys.stdin.reconfigure(encoding='utf-8')
+                stream = sys.stdin
+            else:
+                stream = open(args.input, 'r', encoding='utf-8', newline="")
+            errors = []
+            # JSON переписывается целиком при каждой записи: пачками импорт
+            # занял бы квадратичное время, поэтому заметки пишутся разом
+            batch_size = None if args.engine == "json" else IMPORT_BATCH_SIZE
+            with stream:
+                records = READERS[fmt](stream, errors)
+                notes = to_new_notes(records, next_note_id(storage, archive), errors)
+                count = import_notes(storage, notes, batch_size)
+            # Ошибки - как у backup verify: по строке в stdout, итог в stderr
+            for error in errors:
+                print(error)
+            print(f"Загружено заметок: {count}", file=sys.stderr)
+            if errors:
+                print(f"Ошибок: {len(errors)}", file=sys.stderr)
+                return 1
+    finally:
+        storage.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1002 @@
+# -*- coding: utf-8 -*-
+"""Общая логика виджетов заметок.
+
+``NotesController`` - все, что не зависит от оформления: загрузка и
+сохранение, поиск, отмена, архив, резервные копии, напоминания,
+синхронизация и слияние изменений других окон. Виджеты наследуют его и
+только строят интерфейс: настраивают окно (``setup_window``), создают
+элементы (``create_widgets``, ``bind_events``) и строку заметки
+(``create_note_widget``). Контроллер ожидает от интерфейса список
+``notes_container``, поля ``note_entry`` и ``search_entry`` и надпись
+``stats_label``.
+
+Хранилище выбирается ключом ``--engine=json|journal|sqlite``. У базы
+SQLite при запуске читается только первая страница заметок, следующие -
+при прокрутке до конца списка, а поиск дополняется полнотекстовым
+поиском по всей базе.
+"""
+import customtkinter as ctk
+import queue
+import sys
+import threading
+import time
+from animation import Animator, ease_in_out_quad
+from archive import NoteArchive, select_cold
+from drag import WindowDragger
+from file_watch import FileWatcher
+from history import Change, UndoHistory
+from note_collection import NoteCollection
+from notifications import ToastManager
+from reminders import ReminderScheduler, note_reminder, parse_reminder, reminder_fields
+from search_index import TAG_RE, NoteSearchIndex, extract_tags, note_matches, parse_query
+from storage import ENGINES, diff_notes, open_storage
+from styles import registry as styles
+from text_layout import TextLayoutCache
+from writer import PersistenceWriter
+
+# Размер пачки при постепенной загрузке заметок
+LOAD_BATCH_SIZE = 500
+# Главный поток добавляет пачку частями: индексация 100 заметок укладывается
+# в несколько миллисекунд, и кадр не выходит за бюджет poll_loading
+ADD_BATCH_SIZE = 100
+
+# Сколько результатов полнотекстового поиска берется из базы (SQLite)
+SEARCH_LIMIT = 500
+
+# Архив: заметки старше года или дальше 5000 новых уходят в сжатые сегменты
+ARCHIVE_AFTER_DAYS = 365
+HOT_NOTES_LIMIT = 5000
+
+# Как часто проверять, нужна ли резервная копия (если были изменения)
+BACKUP_INTERVAL_MS = 15 * 60 * 1000
+
+# Состояние синхронизации с другими компьютерами (режим --sync=URL)
+SYNC_STATE_FILE = "notes_sync.json"
+
+# Сколько последних изменений можно отменить (Ctrl+Z / Ctrl+Y)
+HISTORY_LIMIT = 100
+
+# Куда записываются метрики в режиме --metrics
+METRICS_FILE = "notes_metrics.json"
+
+
+class NotesController:
+    """Общая логика виджетов заметок (интерфейс строит подкласс)"""
+
+    # Оформление, которое задает виджет
+    toast_style = "toast"
+    snap_distance = 0
+    chars_per_line = 42
+        
+    def __init__(self, profiler=None, metrics=None, sync_url=None, engine="journal"):
+        # Замер фаз запуска (режим --profile-startup)
+        self.profiler = profiler
+        self.profile_start("tk_init")
+        
+        # Настройка темы и внешнего вида
+        ctk.set_appearance_mode("dark")  # Темная тема
+        ctk.set_default_color_theme("blue")  # Синяя цветовая схема
+        
+        # Создание главного окна
+        self.root = ctk.CTk()
+        self.setup_window()
+        self.profile_stop("tk_init")
+        
+        # Анимации по кадрам главного цикла
+        self.animator = Animator(self.root, fps=60)
+        self.minimized = False
+        
+        # Уведомления (один виджет и очередь сообщений)
+        self.toasts = ToastManager(self.root, self.animator, style=self.toast_style, display_ms=2000)
+        
+        # Перетаскивание (не чаще одного перемещения окна за кадр)
+        self.dragger = WindowDragger(self.root, frame_ms=16, snap_distance=self.snap_distance)
+        
+        # Поиск по заметкам
+        self.search_index = NoteSearchIndex()
+        self.search_query = ""
+        self.search_job = None
+        
+        # Замер горячих путей (режим --metrics)
+        self.metrics = metrics
+        if self.metrics is not None:
+            self.setup_metrics()
+        
+        # Превью длинных заметок и кэш их разметки
+        self.layout_cache = TextLayoutCache(chars_per_line=self.chars_per_line, line_budget=6)
+        self.expanded_notes = set()
+        # Окно просмотра всего текста заметки (создается при первом открытии)
+        self.full_note_window = None
+        self.full_note_text = None
+        
+        # Создание интерфейса
+        self.profile_start("create_widgets")
+        self.create_widgets()
+        self.profile_stop("create_widgets")
+        
+        # Загрузка заметок
+        self.notes_file = "notes.json"
+        self.storage = open_storage(self.notes_file, engine=engine)
+        self.notes = NoteCollection()
+        # Хранилище со страницами (SQLite): ID, меньше которых читается
+        # следующая страница (None - непрочитанных страниц нет), и сколько
+        # заметок еще не прочитано
+        self.paged = hasattr(self.storage, "page")
+        self.next_page = None
+        self.unloaded_count = 0
+        # Заметки из непрочитанных страниц: с напоминаниями и найденные
+        # поиском по базе (показаны в результатах текущего поиска)
+        self.reminder_notes = {}
+        self.found_notes = {}
+        # Какие из найденных заметок лежат в архиве, а не в базе
+        self.found_archived = set()
+        self.search_results = queue.Queue()
+        # История изменений для отмены и повтора
+        self.history = UndoHistory(limit=HISTORY_LIMIT)
+        # Напоминания: куча по времени и один таймер на ближайшее
+        self.reminders = ReminderScheduler(self.root, self.on_reminder_due)
+        self.loading = False
+        self.load_queue = queue.Queue()
+        # Новые ID выдаются только после того, как из хранилища пришел
+        # наибольший сохраненный ID: иначе новая заметка займет ID еще не
+        # загруженной, и та пропадет из списка
+        self.ids_ready = False
+        
+        # Архив старых заметок (распаковывается при прокрутке до конца)
+        self.archive = NoteArchive("notes_archive")
+        # ID заархивированных заметок не выдаются повторно
+        self.notes.reserve_ids(self.archive.max_id())
+        self.archived_segments = None
+        self.archive_error = None
+        
+        # Резервные копии: пишутся только куски с изменившимися заметками
+        # (хранилище копий создается в фоновом потоке при первой копии)
+        self.backups = None
+        # Первая проверка - сразу после загрузки (без изменений копия не пишется)
+        self.backup_pending = True
+        self.backup_thread = None
+        self.backup_error = None
+        
+        # Фоновая запись изменений (объединяет частые сохранения)
+        self.writer = PersistenceWriter(self.storage, window=0.25)
+        
+        # Изменения из других запущенных экземпляров (тот же файл заметок)
+        self.external_changes = queue.Queue()
+        self.watcher = FileWatcher(self.storage.watch_paths(), self.on_storage_changed)
+        
+        # Синхронизация с другими компьютерами (обмен - в фоновом потоке)
+        self.sync = None
+        self.sync_applied = 0
+        if sync_url:
+            self.start_sync(sync_url)
+        
+        # Заметки подгружаются после появления окна
+        self.load_notes()
+        
+        # Привязка событий
+        self.bind_events()
+        
+    def setup_window(self):
+        """Заголовок, размер и свойства главного окна (задает виджет)"""
+        raise NotImplementedError
+        
+    def create_widgets(self):
+        """Создание элементов интерфейса (задает виджет)"""
+        raise NotImplementedError
+        
+    def bind_events(self):
+        """Привязка клавиш и событий окна (задает виджет)"""
+        raise NotImplementedError
+        
+    def create_note_widget(self, parent):
+        """Новая строка списка заметок - NoteRow (задает виджет)"""
+        raise NotImplementedError
+        
+    def start_drag(self, event):
+        """Начало перетаскивания"""
+        self.dragger.start(event)
+        
+    def on_drag(self, event):
+        """Перетаскивание окна"""
+        self.dragger.move(event)
+        
+    def stop_drag(self, event):
+        """Окончание перетаскивания"""
+        self.dragger.stop(event)
+        
+    def animate_height(self, width, height):
+        """Плавное изменение высоты окна"""
+        self.animator.animate(
+            "resize",
+            self.root.winfo_height(),
+            height,
+            0.2,
+            lambda value: self.root.geometry(f"{width}x{int(value)}"),
+            easing=ease_in_out_quad
+        )
+        
+    def save_note(self):
+        """Сохранение новой заметки"""
+        try:
+            note_text = self.note_entry.get("1.0", "end-1c").strip()
+            if note_text and not self.ids_ready:
+                # Текст остается в поле: сохранить можно через мгновение
+                self.show_notification("⏳ Заметки еще загружаются, попробуйте чуть позже")
+            elif note_text:
+                # Создаем новую заметку с правильным ID
+                # Следующий ID и текущее время выдает коллекция
+                # Теги (#слово) и напоминание (@18:30) сохраняются в полях заметки
+                extra = {}
+                tags = extract_tags(note_text)
+                if tags:
+                    extra["tags"] = tags
+                remind_at = parse_reminder(note_text)
+                if remind_at is not None:
+                    extra.update(reminder_fields(remind_at))
+                new_note = self.notes.create(note_text, extra=extra or None)
+                self.save_to_file(("add", new_note))
+                self.history.record(Change.added(new_note, len(self.notes) - 1))
+                
+                # Очищаем поле ввода
+                self.note_entry.delete("1.0", "end")
+                
+                # Обновляем интерфейс: добавляем одну строку сверху
+                self.search_index.add(new_note)
+                self.reminders.update(new_note)
+                if not self.search_query or self.search_index.matches(new_note.id, self.search_query):
+                    self.notes_container.insert(0, new_note)
+                self.update_stats()
+                
+                # Показываем уведомление
+                self.show_notification("✅ Заметка сохранена!", "✅ Сохранено заметок: {count}")
+                
+                # Возвращаем фокус на поле ввода
+                self.note_entry.focus_set()
+        except Exception as e:
+            self.show_notification(f"❌ Ошибка: {str(e)}")
+        
+    def update_notes_display(self):
+        """Обновление отображения заметок"""
+        # Отображаем заметки (с учетом поиска)
+        self.notes_container.set_items(self.visible_notes())
+        
+        # Обновляем статистику
+        self.update_stats()
+        
+    def visible_notes(self):
+        """Заметки для отображения: результаты поиска или все (новые сверху)"""
+        if self.search_query:
+            return self.search_index.search(self.search_query)
+        return reversed(self.notes)
+        
+    def on_search_changed(self, event=None):
+        """Отложенный поиск при вводе (не на каждое нажатие)"""
+        if self.search_job is not None:
+            self.root.after_cancel(self.search_job)
+        self.search_job = self.root.after(120, self.apply_search)
+        
+    def apply_search(self):
+        """Фильтрация списка по строке поиска"""
+        self.search_job = None
+        query = self.search_entry.get().strip()
+        if query == self.search_query:
+            return
+        self.search_query = query
+        self.found_notes = {}
+        self.found_archived = set()
+        self.update_notes_display()
+        if query and (self.next_page is not None or self.archive.count()):
+            # Индекс в памяти знает только прочитанные страницы базы и
+            # распакованные сегменты архива
+            threading.Thread(target=self.search_stored, args=(query,), daemon=True).start()
+            self.root.after(15, self.poll_search)
+        
+    def search_stored(self, query):
+        """Поиск по непрочитанным страницам базы и по архиву (фоновый поток, без Tk)"""
+        try:
+            found = self.search_storage(query) if self.next_page is not None else {}
+            archived = self.search_archive(query)
+            found.update(archived)
+            result = (found, set(archived))
+        except Exception as e:
+            result = e
+        self.search_results.put((query, result))
+        
+    def search_storage(self, query):
+        """Полнотекстовый поиск по всей базе: ID -> заметка"""
+        # Сначала в базу дописываются свои изменения из очереди записи
+        self.writer.flush(timeout=1)
+        _, any_tag, rest = parse_query(query)
+        raw_tags = TAG_RE.findall(query)
+        if any_tag and raw_tags:
+            # FTS ищет все слова сразу, поэтому теги "любой из" - по одному
+            queries = [f"{rest} {tag}" for tag in raw_tags]
+        else:
+            queries = [" ".join([rest] + raw_tags)]
+        found = {}
+        for text in queries:
+            for note in self.storage.search(text, SEARCH_LIMIT):
+                # Слова в базе ищутся как начала слов, теги - как слова:
+                # результаты проверяются так же, как в индексе
+                if note_matches(note, query):
+                    found[note.id] = note
+        return found
+        
+    def search_archive(self, query):
+        """Поиск по сегментам архива (новые первыми): ID -> заметка
+
+        Сегменты распаковываются по одному; поиск бросается, как только
+        строка поиска изменилась или найдено SEARCH_LIMIT заметок.
+        """
+        found = {}
+        for batch in self.archive.iter_newest():
+            if query != self.search_query or len(found) >= SEARCH_LIMIT:
+                break
+            for note in batch:
+                if note_matches(note, query):
+                    found[note.id] = note
+        return found
+        
+    def poll_search(self):
+        """Показ результатов поиска по базе и архиву, когда они готовы"""
+        try:
+            query, result = self.search_results.get_nowait()
+        except queue.Empty:
+            self.root.after(15, self.poll_search)
+            return
+        if isinstance(result, Exception):
+            self.show_notification(f"❌ Ошибка поиска: {result}")
+            return
+        if query != self.search_query:
+            return
+        found, archived = result
+        # Прочитанные заметки уже найдены индексом, и их версия новее
+        found = {
+            note_id: self.reminder_notes.get(note_id, note)
+            for note_id, note in found.items() if note_id not in self.notes
+        }
+        if not found:
+            return
+        self.found_notes = found
+        self.found_archived = archived
+        self.notes_container.set_items(sorted(
+            list(self.notes_container.items) + list(found.values()),
+            key=lambda note: note.id, reverse=True
+        ))
+        self.update_stats()
+        
+    def update_stats(self):
+        """Обновление статистики без перерисовки списка"""
+        text = f"📊 Всего заметок: {len(self.notes) + self.unloaded_count}"
+        if self.loading:
+            text = f"⏳ Загрузка… {len(self.notes)}"
+        if self.search_query:
+            text += f" · найдено: {len(self.notes_container.items)}"
+        self.stats_label.configure(text=text)
+        
+    def note_row_height(self, note):
+        """Оценка высоты строки заметки в пикселях (по превью из кэша)"""
+        return 88 + max(28, self.note_preview(note).lines * 17)
+        
+    def note_preview(self, note):
+        """Превью текста заметки с учетом того, развернута ли она"""
+        return self.layout_cache.preview(note, note.id in self.expanded_notes)
+        
+    def bind_note_widget(self, row, note):
+        """Заполнение строки данными заметки"""
+        row.note_id = note.id
+        row.id_label.configure(text=f"#{row.note_id}")
+        date = note.timestamp
+        if note.extra and "remind_at" in note.extra:
+            date += f" · ⏰ {note.extra['remind_at'][5:16]}"
+        row.date_label.configure(text=date)
+        
+        # В строку попадает только превью: длинный текст не раскладывается целиком
+        preview = self.note_preview(note)
+        row.text_label.configure(text=preview.text)
+        expanded = note.id in self.expanded_notes
+        if preview.truncated or expanded:
+            row.more_btn.configure(text="▴ Свернуть" if expanded else "▾ Показать еще")
+            if not row.more_btn.winfo_manager():
+                row.more_btn.pack(side="left")
+        elif row.more_btn.winfo_manager():
+            row.more_btn.pack_forget()
+        # Развернутое превью тоже ограничено: остальное - в окне просмотра
+        if expanded and preview.truncated:
+            if not row.full_btn.winfo_manager():
+                row.full_btn.pack(side="left", padx=(5, 0))
+        elif row.full_btn.winfo_manager():
+            row.full_btn.pack_forget()
+        
+    def show_full_note(self, note_id):
+        """Весь текст заметки в окне просмотра (одно окно на все заметки)
+
+        Текстовое поле Tk раскладывает только видимые строки, поэтому в нем
+        можно прокручивать и заметки на мегабайты.
+        """
+        note = self.find_note(note_id)
+        if note is None:
+            return
+        if self.full_note_window is None or not self.full_note_window.winfo_exists():
+            self.full_note_window = ctk.CTkToplevel(self.root)
+            self.full_note_window.geometry("520x600")
+            self.full_note_window.attributes('-topmost', True)
+            self.full_note_text = ctk.CTkTextbox(
+                self.full_note_window,
+                corner_radius=8,
+                font=styles.font(12),
+                wrap="word"
+            )
+            self.full_note_text.pack(fill="both", expand=True, padx=10, pady=10)
+        self.full_note_window.title(f"Заметка #{note_id}")
+        self.full_note_text.configure(state="normal")
+        self.full_note_text.delete("1.0", "end")
+        self.full_note_text.insert("1.0", note.text)
+        self.full_note_text.configure(state="disabled")
+        self.full_note_window.deiconify()
+        self.full_note_window.lift()
+        self.full_note_window.focus_set()
+        
+    def toggle_note_expanded(self, note_id):
+        """Развернуть или свернуть длинную заметку"""
+        if note_id in self.expanded_notes:
+            self.expanded_notes.discard(note_id)
+        else:
+            self.expanded_notes.add(note_id)
+        note = self.find_note(note_id)
+        if note is not None:
+            # Меняется высота одной строки, остальные не перерисовываются
+            self.notes_container.update(note)
+        
+    def delete_note(self, note_id):
+        """Удаление заметки (можно отменить по Ctrl+Z)"""
+        note = self.remove_note(note_id)
+        self.save_to_file(("delete", note_id))
+        archived = self.archive.delete(note_id)
+        if note is not None:
+            # Позиция не ищется: отмена вернет заметку на место по порядку ID
+            self.history.record(Change.deleted(note, None, archived))
+        self.reminders.cancel(note_id)
+        self.expanded_notes.discard(note_id)
+        
+        # Убираем из списка и индекса только одну заметку (список - первым:
+        # результаты поиска берут заметки из индекса)
+        self.notes_container.remove(note_id)
+        self.search_index.remove(note_id)
+        self.update_stats()
+        self.show_notification("🗑️ Заметка удалена (Ctrl+Z - отменить)", "🗑️ Удалено заметок: {count}")
+        
+    def undo(self, event=None):
+        """Отмена последнего изменения (Ctrl+Z)"""
+        self.apply_history(self.history.undo(), "↩️ Отменено", "↩️ Нечего отменять")
+        return "break"
+        
+    def redo(self, event=None):
+        """Повтор отмененного изменения (Ctrl+Y)"""
+        self.apply_history(self.history.redo(), "↪️ Повторено", "↪️ Нечего повторять")
+        return "break"
+        
+    def apply_history(self, change, done_message, empty_message):
+        """Применение изменения из истории: одна строка списка и одна запись"""
+        if change is None:
+            self.show_notification(empty_message)
+            return
+        if not change.can_apply(self.notes):
+            self.show_notification("⚠️ Заметка изменена в другом окне")
+            return
+        if change.op == "add":
+            if change.position is None:
+                note = self.notes.restore(change.after)
+            else:
+                note = self.notes.insert(change.position, change.after)
+            # Заметку из архива достаточно снять с пометки об удалении
+            if change.archived and self.archive.undelete(note.id):
+                self.track_sync(("add", note))
+            else:
+                self.save_to_file(("add", note))
+            self.merge_note(note)
+        elif change.op == "delete":
+            note_id = change.before.id
+            self.forget_note(note_id)
+            self.save_to_file(("delete", note_id))
+            self.archive.delete(note_id)
+            self.expanded_notes.discard(note_id)
+        else:
+            self.merge_note(change.after)
+            self.save_to_file(("edit", change.after))
+        self.update_stats()
+        self.show_notification(done_message)
+        
+    def show_notification(self, message, plural=None):
+        """Показ уведомления (повторы объединяются по шаблону plural)"""
+        self.toasts.show(message, plural)
+        
+    def load_notes(self):
+        """Постепенная загрузка заметок: чтение в фоне, новые пачки первыми"""
+        self.profile_start("load_notes")
+        self.load_started = time.perf_counter()
+        self.loading = True
+        self.update_stats()
+        threading.Thread(target=self.read_notes, daemon=True).start()
+        self.root.after(1, self.poll_loading)
+        
+    def read_notes(self):
+        """Чтение заметок из хранилища (фоновый поток, без обращений к Tk)"""
+        try:
+            if self.paged:
+                # База читается страницами: при запуске - только первая.
+                # Напоминания из остальных страниц берутся одним запросом.
+                # Первое обращение один раз импортирует прежнее хранилище -
+                # здесь, в фоне, пока окно уже показано
+                self.load_queue.put(("max_id", self.storage.max_id()))
+                first_page = self.storage.page(0, LOAD_BATCH_SIZE)
+                next_page = first_page[-1].id if len(first_page) == LOAD_BATCH_SIZE else None
+                self.load_queue.put((
+                    "paged", next_page, self.storage.count() - len(first_page),
+                    self.storage.find_with_field("remind_at")
+                ))
+                batches = [first_page]
+            else:
+                batches = self.storage.iter_newest(LOAD_BATCH_SIZE)
+                # Наибольший ID - до первой пачки (JSON и журнал к этому
+                # моменту уже прочитаны)
+                self.load_queue.put(("max_id", self.storage.max_id()))
+            for batch in batches:
+                for start in range(0, len(batch), ADD_BATCH_SIZE):
+                    self.load_queue.put(batch[start:start + ADD_BATCH_SIZE])
+        except Exception as e:
+            self.load_queue.put(e)
+        self.load_queue.put(None)
+        
+    def poll_loading(self):
+        """Добавление прочитанных пачек в интерфейс небольшими порциями"""
+        deadline = time.perf_counter() + 0.008
+        while time.perf_counter() < deadline:
+            try:
+                item = self.load_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Загрузка завершена
+                self.loading = False
+                self.ids_ready = True
+                self.update_stats()
+                self.profile_stop("first_render")
+                self.profile_stop("load_notes")
+                if self.metrics is not None:
+                    self.metrics.record("load_notes", time.perf_counter() - self.load_started)
+                # Следим за файлом и архивируем старое только после загрузки
+                self.start_archiving()
+                self.watcher.start()
+                self.poll_external_changes()
+                self.check_backup()
+                if self.sync is not None:
+                    self.poll_sync()
+                return
+            if isinstance(item, Exception):
+                self.show_notification(f"❌ Ошибка загрузки: {item}")
+                continue
+            if isinstance(item, tuple) and item[0] == "max_id":
+                # Теперь новые ID не совпадут с сохраненными
+                self.notes.reserve_ids(item[1])
+                self.ids_ready = True
+                continue
+            if isinstance(item, tuple):
+                # ("paged", следующая страница, непрочитано, заметки с напоминаниями)
+                _, self.next_page, self.unloaded_count, reminder_notes = item
+                reminder_notes = [note for note in reminder_notes if note.id not in self.notes]
+                self.reminder_notes.update((note.id, note) for note in reminder_notes)
+                self.reminders.update_many(reminder_notes)
+                continue
+            self.add_loaded_batch(item)
+            self.profile_stop("first_render")
+        self.root.after(15, self.poll_loading)
+        
+    def add_loaded_batch(self, batch):
+        """Добавление пачки более старых заметок в конец списка"""
+        # Заметки, сохраненные во время загрузки, уже есть в коллекции;
+        # заметки с напоминанием могли измениться после чтения из базы
+        batch = [
+            self.reminder_notes.pop(note.id, note) for note in batch if note.id not in self.notes
+        ]
+        self.notes.add_older(batch)
+        self.reminders.update_many(batch)
+        for note in batch:
+            self.search_index.add(note)
+        if self.search_query:
+            # Найденные поиском по базе уже показаны
+            batch = [
+                note for note in batch
+                if note.id not in self.found_notes
+                and self.search_index.matches(note.id, self.search_query)
+            ]
+        self.notes_container.extend(batch)
+        self.update_stats()
+        
+    def on_storage_changed(self):
+        """Файл заметок изменился (поток наблюдателя, без обращений к Tk)"""
+        changes = self.storage.read_changes()
+        if changes:
+            self.external_changes.put(changes)
+        
+    def poll_external_changes(self):
+        """Применение изменений из других экземпляров в главном потоке"""
+        while True:
+            try:
+                changes = self.external_changes.get_nowait()
+            except queue.Empty:
+                break
+            self.apply_external_changes(changes)
+        self.root.after(200, self.poll_external_changes)
+        
+    def apply_external_changes(self, changes):
+        """Слияние только измененных заметок: остальные строки не трогаем"""
+        # Архив проверяется один раз на все удаления пачки
+        archived = self.archive.find([payload for op, payload in changes if op == "delete"])
+        for op, payload in changes:
+            if op == "reset":
+                # Файл переписан целиком: сами находим отличия (у базы - только
+                # в прочитанных страницах, остальные прочитаются при прокрутке)
+                current = {note.id: note for note in self.notes}
+                self.apply_external_changes(diff_notes(current, {
+                    note.id: note for note in payload
+                    if self.next_page is None or note.id >= self.next_page or note.id in current
+                }))
+            elif op == "delete":
+                if payload in archived:
+                    # Заметка не удалена, а перенесена в архив (другим окном)
+                    # или ее нет в переписанном файле, потому что она из
+                    # архива: остается в списке и на другие компьютеры не идет
+                    continue
+                self.forget_note(payload)
+                # Удаление пользователем в другом окне - отправляем его
+                self.track_sync((op, payload))
+            elif op == "renumber":
+                # ID нашей новой заметки занял другой экземпляр
+                old_id, new_id, note = payload
+                self.history.renumber(old_id, new_id)
+                if self.sync is not None:
+                    self.sync.renumber(old_id, new_id)
+                # Старый ID не освобождаем: чужая заметка с ним уже пришла
+                # или придет следом и заменит нашу строку
+                if note is not None:
+                    self.merge_note(note)
+            else:
+                self.merge_note(payload)
+                # Изменения других окон на другие компьютеры отправляет это окно
+                self.track_sync((op, payload))
+        self.update_stats()
+        
+    def find_note(self, note_id):
+        """Заметка из памяти, непрочитанной страницы базы или архива (None, если нет)"""
+        note = self.notes.get(note_id)
+        if note is None:
+            note = self.reminder_notes.get(note_id) or self.found_notes.get(note_id)
+        return note
+        
+    def remove_note(self, note_id):
+        """Удаление заметки из памяти, в том числе из непрочитанной страницы базы или архива"""
+        note = self.notes.remove(note_id)
+        found = self.found_notes.pop(note_id, None)
+        detached = self.reminder_notes.pop(note_id, found)
+        if note is None and detached is not None:
+            if note_id not in self.found_archived:
+                # Заметка из непрочитанной страницы: там ее больше не будет
+                self.unloaded_count = max(0, self.unloaded_count - 1)
+            note = detached
+        return note
+        
+    def forget_note(self, note_id):
+        """Удаление заметки из памяти и списка (без записи в хранилище)"""
+        note = self.remove_note(note_id)
+        if note is not None:
+            # Список - до индекса: результаты поиска берут заметки из индекса
+            self.notes_container.remove(note_id)
+            self.search_index.remove(note_id)
+            self.reminders.cancel(note_id)
+        return note
+        
+    def merge_note(self, note):
+        """Добавление или замена одной заметки с обновлением ее строки"""
+        if note.id in self.notes:
+            self.notes.replace(note)
+        else:
+            self.notes.add(note)
+        self.search_index.add(note)
+        self.reminders.update(note)
+        if self.search_query and not self.search_index.matches(note.id, self.search_query):
+            self.notes_container.remove(note.id)
+        elif not self.notes_container.update(note):
+            self.notes_container.insert(self.display_position(note), note)
+        
+    def display_position(self, note):
+        """Позиция новой строки: список упорядочен от новых ID к старым (двоичный поиск)"""
+        items = self.notes_container.items
+        low, high = 0, len(items)
+        while low < high:
+            middle = (low + high) // 2
+            if items[middle].id < note.id:
+                high = middle
+            else:
+                low = middle + 1
+        return low
+        
+    def start_archiving(self):
+        """Перенос старых заметок в архив (в фоновом потоке)"""
+        # Заметки с напоминанием остаются в хранилище, пока оно не сработает
+        cold = [
+            note for note in select_cold(self.notes, ARCHIVE_AFTER_DAYS, HOT_NOTES_LIMIT)
+            if note_reminder(note) is None
+        ]
+        if cold:
+            threading.Thread(target=self.archive_notes, args=(cold,), daemon=True).start()
+        
+    def archive_notes(self, notes):
+        """Запись в архив и удаление из хранилища (фоновый поток, без Tk)"""
+        try:
+            # Заметки, удаленные пока их отбирали, в сегмент не пишутся
+            archived = self.archive.add(notes, keep=lambda note: note.id in self.notes)
+            for note_id in archived:
+                if note_id not in self.notes:
+                    # Удалена, пока писался сегмент: отмечаем удаленной и в архиве
+                    self.archive.delete(note_id)
+            self.writer.submit(*[("delete", note_id) for note_id in archived])
+        except Exception as e:
+            self.archive_error = e
+        
+    def load_more(self):
+        """Следующая страница базы или сегмент архива (список прокручен до конца)"""
+        if self.loading:
+            return
+        if self.next_page is not None:
+            try:
+                batch = self.storage.page(0, LOAD_BATCH_SIZE, before_id=self.next_page)
+            except Exception as e:
+                self.show_notification(f"❌ Ошибка загрузки: {e}")
+                return
+            if len(batch) == LOAD_BATCH_SIZE:
+                self.next_page = batch[-1].id
+                self.unloaded_count = max(0, self.unloaded_count - len(batch))
+            else:
+                self.next_page = None
+                self.unloaded_count = 0
+            if batch:
+                self.add_loaded_batch(batch)
+                return
+        # Страницы базы кончились - дальше идет архив
+        if self.archived_segments is None:
+            self.archived_segments = self.archive.iter_newest()
+        try:
+            batch = next(self.archived_segments, None)
+        except (OSError, ValueError) as e:
+            self.show_notification(f"❌ Ошибка архива: {e}")
+            return
+        if batch is not None:
+            # Заметки, которые еще в памяти, add_loaded_batch пропустит
+            self.add_loaded_batch(batch)
+        
+    def save_to_file(self, *ops, track=True):
+        """Сохранение изменений в хранилище (в фоновом потоке)"""
+        self.writer.submit(*ops)
+        self.backup_pending = True
+        if track:
+            self.track_sync(*ops)
+        
+    def check_backup(self):
+        """Резервная копия, если с прошлой проверки были изменения"""
+        running = self.backup_thread is not None and self.backup_thread.is_alive()
+        if self.backup_pending and not running:
+            self.backup_pending = False
+            self.backup_thread = threading.Thread(target=self.make_backup, daemon=True)
+            self.backup_thread.start()
+        self.root.after(BACKUP_INTERVAL_MS, self.check_backup)
+        
+    def make_backup(self):
+        """Копия заметок вместе с архивом и прореживание старых (фоновый поток, без Tk)"""
+        try:
+            # Сначала в хранилище дописывается все, что стоит в очереди
+            self.writer.flush(timeout=5)
+            if self.backups is None:
+                from backup import BackupStore
+                self.backups = BackupStore("notes_backup")
+            self.backups.create(self.iter_stored_notes())
+            self.backups.prune()
+        except Exception as e:
+            self.backup_error = e
+        
+    def check_writer(self):
+        """Проверка ошибок фоновой записи"""
+        error = self.writer.last_error or self.archive_error or self.backup_error
+        if error is not None:
+            self.writer.last_error = self.archive_error = self.backup_error = None
+            self.show_notification(f"❌ Ошибка записи: {error}")
+        if self.sync is not None and self.sync.last_error is not None:
+            error, self.sync.last_error = self.sync.last_error, None
+            self.show_notification(f"⚠️ Нет связи с сервером синхронизации: {error}")
+        self.root.after(1000, self.check_writer)
+        
+    def on_reminder_due(self, note_id):
+        """Напоминание сработало: уведомление и снятие отметки с заметки"""
+        old = self.find_note(note_id)
+        if old is None or not old.extra:
+            return
+        extra = {key: value for key, value in old.extra.items() if key != "remind_at"}
+        note = old.copy(extra=extra or None)
+        self.history.replace(old, note)
+        if note_id in self.notes:
+            self.merge_note(note)
+        else:
+            # Страница с заметкой еще не прочитана: при чтении возьмется эта версия
+            self.reminder_notes[note_id] = note
+            if note_id in self.found_notes:
+                self.found_notes[note_id] = note
+            self.notes_container.update(note)
+        self.save_to_file(("edit", note))
+        self.root.bell()
+        self.show_notification("⏰ " + note.text.split("\n", 1)[0][:60])
+        
+    def start_sync(self, url):
+        """Запуск синхронизации (ее ведет только одно окно)"""
+        from sync import SyncClient
+        client = SyncClient(url, SYNC_STATE_FILE, local_notes=self.iter_stored_notes)
+        try:
+            started = client.start()
+        except (OSError, ValueError, KeyError) as e:
+            self.show_notification(f"❌ Ошибка синхронизации: {e}")
+            return
+        if not started:
+            self.show_notification("🔄 Синхронизацию ведет другое окно")
+            return
+        self.sync = client
+        
+    def iter_stored_notes(self):
+        """Все сохраненные заметки вместе с архивом (фоновый поток, без Tk)"""
+        yield from self.storage.iter_notes()
+        for batch in self.archive.iter_newest():
+            yield from batch
+        
+    def track_sync(self, *ops):
+        """Свои изменения - в очередь отправки на другие компьютеры"""
+        if self.sync is not None:
+            self.sync.track(*ops)
+        
+    def poll_sync(self):
+        """Применение изменений с других компьютеров небольшими порциями"""
+        deadline = time.perf_counter() + 0.008
+        while time.perf_counter() < deadline:
+            try:
+                item = self.sync.incoming.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, int):
+                # Страница изменений применена целиком
+                self.sync.applied(item)
+            elif self.apply_remote_change(item):
+                self.sync_applied += 1
+        if not self.sync.incoming.empty():
+            self.root.after(15, self.poll_sync)
+            return
+        if self.sync_applied:
+            self.update_stats()
+            self.show_notification(f"🔄 Изменений с других компьютеров: {self.sync_applied}")
+            self.sync_applied = 0
+        self.root.after(200, self.poll_sync)
+        
+    def apply_remote_change(self, change):
+        """Изменение с другого компьютера: одна строка списка и одна запись"""
+        note_id, note = self.sync.resolve(change, self.notes.new_id)
+        if note_id is None:
+            return False
+        if note is None:
+            self.forget_note(note_id)
+            self.archive.delete(note_id)
+            self.expanded_notes.discard(note_id)
+            self.save_to_file(("delete", note_id), track=False)
+            return True
+        op = "edit" if note_id in self.notes else "add"
+        if op == "add" and note_id <= self.archive.max_id():
+            # Заметка из архива, измененная на другом компьютере, возвращается в хранилище
+            self.archive.delete(note_id)
+        self.merge_note(note)
+        self.save_to_file((op, note), track=False)
+        return True
+        
+    def close(self):
+        """Закрытие виджета с записью несохраненных изменений"""
+        self.watcher.stop(timeout=0.2)
+        self.reminders.stop()
+        if self.sync is not None:
+            self.sync.close(timeout=0.5)
+        self.writer.close()
+        self.storage.close()
+        if self.metrics is not None:
+            self.dump_metrics(notify=False)
+        self.root.quit()
+        
+    def setup_metrics(self):
+        """Подключение замеров к горячим путям и к главному циклу"""
+        from metrics import MainLoopWatchdog
+        
+        self.metrics.instrument(self, {
+            "save_note": "save_note",
+            "save_to_file": "save_to_file",
+            "update_notes_display": "update_notes_display",
+            "create_note_widget": "create_note_widget",
+            "bind_note_widget": "bind_note_widget",
+            "add_loaded_batch": "load_batch",
+            "apply_search": "search",
+            "on_drag": "drag",
+        })
+        self.metrics.instrument(self.dragger, {"_apply": "drag_frame"})
+        self.watchdog = MainLoopWatchdog(self.root, self.metrics, self.on_main_loop_blocked)
+        self.watchdog.start()
+        
+    def on_main_loop_blocked(self, lag_ms):
+        """Предупреждение о долгом обработчике главного цикла"""
+        self.show_notification(f"⚠️ Интерфейс не отвечал {lag_ms} мс")
+        
+    def dump_metrics(self, event=None, notify=True):
+        """Запись метрик в JSON файл"""
+        path = self.metrics.dump(METRICS_FILE, extra={
+            "writer": self.writer.stats(),
+            "styles": styles.stats(),
+        })
+        if notify:
+            self.show_notification(f"📈 Метрики сохранены: {path}")
+        
+    def profile_start(self, phase):
+        """Начало фазы запуска (только в режиме --profile-startup)"""
+        if self.profiler is not None:
+            self.profiler.start(phase)
+        
+    def profile_stop(self, phase):
+        """Конец фазы запуска; когда замерены все фазы, печатается отчет"""
+        if self.profiler is not None:
+            self.profiler.stop(phase)
+            if self.profiler.finished():
+                self.profiler.report()
+                self.profiler = None
+                self.root.after_idle(self.close)
+        
+    def run(self):
+        """Запуск приложения"""
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+        self.check_writer()
+        self.profile_start("first_render")
+        self.profile_start("first_idle")
+        self.root.after_idle(lambda: self.profile_stop("first_idle"))
+        self.root.mainloop()
+
+
+def main(widget_class, import_started):
+    """Запуск виджета с ключами командной строки
+
+    ``--profile-startup``, ``--metrics``, ``--metrics-budget=МС``,
+    ``--sync=URL`` и ``--engine=json|journal|sqlite``; import_started - время
+    начала импорта модуля виджета.
+    """
+    profiler = None
+    if "--profile-startup" in sys.argv:
+        from startup_profile import StartupProfiler
+        profiler = StartupProfiler(import_started)
+        profiler.start("import", at=import_started)
+        profiler.stop("import")
+    metrics = None
+    if "--metrics" in sys.argv:
+        from metrics import Metrics
+        budget_ms = 100
+        for arg in sys.argv[1:]:
+            if arg.startswith("--metrics-budget="):
+                budget_ms = int(arg.split("=", 1)[1])
+        metrics = Metrics(budget_ms=budget_ms)
+    sync_url = None
+    engine = "journal"
+    for arg in sys.argv[1:]:
+        if arg.startswith("--sync="):
+            sync_url = arg.split("=", 1)[1]
+        elif arg.startswith("--engine="):
+            engine = arg.split("=", 1)[1]
+    if engine not in ENGINES:
+        raise SystemExit(f"Неизвестное хранилище: {engine} (есть: {', '.join(sorted(ENGINES))})")
+    widget = widget_class(profiler=profiler, metrics=metrics, sync_url=sync_url, engine=engine)
+    widget.run()
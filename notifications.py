@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+from collections import deque
+
+import customtkinter as ctk
+
+from styles import registry as styles
+
+# Положение уведомления: спрятано над окном и показано
+HIDDEN_RELY = -0.05
+SHOWN_RELY = 0.1
+
+
+class _Toast:
+    """Сообщение в очереди уведомлений"""
+
+    def __init__(self, message, plural):
+        self.message = message
+        self.plural = plural
+        self.count = 1
+
+    def text(self):
+        """Текст с учетом повторов"""
+        if self.count == 1:
+            return self.message
+        if self.plural:
+            return self.plural.format(count=self.count)
+        return f"{self.message} ×{self.count}"
+
+
+class ToastManager:
+    """Уведомления с одним переиспользуемым виджетом и очередью
+
+    Одинаковые сообщения, пришедшие подряд, объединяются в одно
+    ("🗑️ Удалено заметок: 3"), очередь ограничена ``max_queue``
+    сообщениями (самые старые отбрасываются).
+    """
+
+    def __init__(self, root, animator, style="toast", display_ms=2000, max_queue=5):
+        self.root = root
+        self.animator = animator
+        self.style = style
+        self.display_ms = display_ms
+        self._queue = deque(maxlen=max_queue)
+        self._current = None
+        self._hide_job = None
+        self._label = None
+
+    def _get_label(self):
+        """Единственный виджет уведомления (создается при первом показе)"""
+        if self._label is None:
+            self._label = ctk.CTkLabel(
+                self.root,
+                text="",
+                font=styles.font(12, "bold", role="toast"),
+                **styles.style(self.style)
+            )
+        return self._label
+
+    def show(self, message, plural=None):
+        """Показ сообщения; plural - шаблон для повторов с полем {count}"""
+        # Повтор текущего сообщения: увеличиваем счетчик и продлеваем показ
+        showing = self._current is not None and self._hide_job is not None
+        if showing and self._current.message == message:
+            self._current.count += 1
+            self._get_label().configure(text=self._current.text())
+            self._schedule_hide()
+            return
+        for toast in self._queue:
+            if toast.message == message:
+                toast.count += 1
+                return
+        self._queue.append(_Toast(message, plural))
+        if self._current is None:
+            self._show_next()
+
+    def _move(self, rely):
+        """Положение уведомления по вертикали"""
+        self._get_label().place(rely=rely)
+
+    def _show_next(self):
+        """Показ следующего сообщения из очереди"""
+        if not self._queue:
+            self._current = None
+            return
+        self._current = self._queue.popleft()
+        label = self._get_label()
+        label.configure(text=self._current.text())
+        label.place(relx=0.5, rely=HIDDEN_RELY, anchor="center")
+        label.lift()
+        self.animator.animate("toast", HIDDEN_RELY, SHOWN_RELY, 0.25, self._move)
+        self._schedule_hide()
+
+    def _schedule_hide(self):
+        """Перезапуск таймера скрытия"""
+        if self._hide_job is not None:
+            self.root.after_cancel(self._hide_job)
+        self._hide_job = self.root.after(self.display_ms, self._hide)
+
+    def _hide(self):
+        """Скрытие текущего сообщения и переход к следующему"""
+        self._hide_job = None
+        self.animator.animate(
+            "toast", SHOWN_RELY, HIDDEN_RELY, 0.25, self._move,
+            on_done=self._hidden
+        )
+
+    def _hidden(self):
+        """Сообщение уехало: убираем виджет или показываем следующее"""
+        if self._queue:
+            self._show_next()
+        else:
+            self._current = None
+            if self._label is not None:
+                self._label.place_forget()
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""Напоминания о заметках.
+
+Время напоминания пишется в поле ``"remind_at"`` заметки в том же формате,
+что и время создания. В тексте заметки его задают так: ``@18:30`` (сегодня
+или завтра, если время уже прошло), ``@2025-03-01 09:00`` или ``@+15м``
+(через 15 минут; единицы м/ч/д или m/h/d).
+
+Планировщик держит напоминания в куче по времени и взводит ровно один
+таймер ``after()`` - на ближайшее. Коллекция заметок при этом не
+перебирается ни по таймеру, ни при срабатывании.
+"""
+import heapq
+import re
+
+from note_record import current_timestamp, format_timestamp, parse_timestamp
+
+# "@18:30" или "@2025-03-01 18:30"
+ABSOLUTE_RE = re.compile(r"(?<![\w@])@(?:(\d{4}-\d{2}-\d{2})\s+)?(\d{1,2}):(\d{2})(?!\d)")
+# "@+15м", "@+2h"
+RELATIVE_RE = re.compile(r"(?<![\w@])@\+(\d+)\s*([мчдmhd])(?!\w)")
+UNITS = {"м": 60, "m": 60, "ч": 3600, "h": 3600, "д": 86400, "d": 86400}
+
+# Таймер взводится не дальше чем на минуту вперед: так переход часов или
+# сон компьютера не сдвигают напоминание надолго
+MAX_DELAY_MS = 60_000
+
+
+def parse_reminder(text, now=None):
+    """Время напоминания из текста заметки (секунды) или None"""
+    if now is None:
+        now = current_timestamp()
+    match = RELATIVE_RE.search(text)
+    if match:
+        return now + int(match.group(1)) * UNITS[match.group(2)]
+    match = ABSOLUTE_RE.search(text)
+    if not match:
+        return None
+    date, hours, minutes = match.groups()
+    if int(hours) > 23 or int(minutes) > 59:
+        return None
+    if date:
+        return parse_timestamp(f"{date} {int(hours):02d}:{minutes}:00")
+    # Только время: сегодня, а если оно уже прошло - завтра
+    remind_at = now - now % 86400 + int(hours) * 3600 + int(minutes) * 60
+    return remind_at if remind_at > now else remind_at + 86400
+
+
+def note_reminder(note):
+    """Время напоминания заметки (секунды) или None"""
+    if not note.extra or "remind_at" not in note.extra:
+        return None
+    return parse_timestamp(note.extra["remind_at"])
+
+
+def reminder_fields(remind_at):
+    """Поля заметки для напоминания"""
+    return {"remind_at": format_timestamp(remind_at)}
+
+
+class ReminderScheduler:
+    """Куча напоминаний и один таймер на ближайшее
+
+    ``on_due(note_id)`` вызывается в главном потоке, когда подошло время.
+    Отмененные и перенесенные напоминания не ищутся в куче: их записи
+    пропускаются при извлечении (а когда их становится больше половины,
+    куча пересобирается).
+    """
+
+    def __init__(self, root, on_due):
+        self.root = root
+        self.on_due = on_due
+        # Куча (время, ID) и актуальное время напоминания для каждого ID
+        self._heap = []
+        self._due = {}
+        self._job = None
+        self._armed_for = None
+
+    def __len__(self):
+        return len(self._due)
+
+    def due_at(self, note_id):
+        """Время напоминания заметки (None, если его нет)"""
+        return self._due.get(note_id)
+
+    def update(self, note):
+        """Учет напоминания заметки после ее добавления или изменения"""
+        self._set(note.id, note_reminder(note))
+        self._arm()
+
+    def update_many(self, notes):
+        """Учет напоминаний пачки заметок (например, при загрузке)"""
+        for note in notes:
+            remind_at = note_reminder(note)
+            if remind_at is not None or note.id in self._due:
+                self._set(note.id, remind_at)
+        self._arm()
+
+    def cancel(self, note_id):
+        """Отмена напоминания (заметка удалена)"""
+        if self._due.pop(note_id, None) is not None:
+            self._arm()
+
+    def _set(self, note_id, remind_at):
+        """Новое время напоминания без перевзвода таймера"""
+        if remind_at is None:
+            self._due.pop(note_id, None)
+            return
+        if self._due.get(note_id) == remind_at:
+            return
+        self._due[note_id] = remind_at
+        heapq.heappush(self._heap, (remind_at, note_id))
+        if len(self._heap) > 2 * len(self._due) + 64:
+            self._heap = [(at, note_id) for note_id, at in self._due.items()]
+            heapq.heapify(self._heap)
+
+    def _peek(self):
+        """Ближайшее актуальное напоминание (устаревшие записи отбрасываются)"""
+        heap = self._heap
+        while heap:
+            remind_at, note_id = heap[0]
+            if self._due.get(note_id) == remind_at:
+                return remind_at
+            heapq.heappop(heap)
+        return None
+
+    def _arm(self):
+        """Взвод таймера на ближайшее напоминание (если оно изменилось)"""
+        remind_at = self._peek()
+        if remind_at == self._armed_for and self._job is not None:
+            return
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+        self._armed_for = remind_at
+        if remind_at is None:
+            return
+        delay = (remind_at - current_timestamp()) * 1000
+        self._job = self.root.after(max(0, min(delay, MAX_DELAY_MS)), self._fire)
+
+    def _fire(self):
+        """Срабатывание таймера: все подошедшие напоминания"""
+        self._job = None
+        self._armed_for = None
+        now = current_timestamp()
+        while True:
+            remind_at = self._peek()
+            if remind_at is None or remind_at > now:
+                break
+            _, note_id = heapq.heappop(self._heap)
+            del self._due[note_id]
+            self.on_due(note_id)
+        self._arm()
+
+    def stop(self):
+        """Остановка таймера"""
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
@@ -0,0 +1,346 @@
+# -*- coding: utf-8 -*-
+import re
+from bisect import bisect_left, insort
+from collections import defaultdict
+from collections.abc import Sequence
+from itertools import filterfalse
+
+# Слово - последовательность букв/цифр любого алфавита (кириллица, латиница...)
+_WORD_RE = re.compile(r"\w+")
+
+
+def normalize(text):
+    """Приведение текста к виду для поиска (регистр, ё -> е)"""
+    return text.casefold().replace("ё", "е")
+
+
+def tokenize(text):
+    """Разбиение нормализованного текста на слова"""
+    return _WORD_RE.findall(text)
+
+
+def trigrams(word):
+    """Триграммы слова"""
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+def prefixes(word):
+    """Начала слова, по которым ищут короткие запросы (1 и 2 символа)"""
+    return {word[:1], word[:2]}
+
+
+# Теги - слова с решеткой в тексте (#работа). При сохранении они пишутся в
+# поле "tags" заметки; у старых заметок без этого поля берутся из текста.
+# Тег: решетка и слово сразу после нее (не внутри слова, как в "C#")
+TAG_RE = re.compile(r"(?<![\w#])#(\w+)")
+
+
+def extract_tags(text):
+    """Теги из текста (нормализованные, без повторов, по алфавиту)"""
+    return sorted({normalize(tag) for tag in TAG_RE.findall(text)})
+
+
+def note_tags(note):
+    """Теги заметки: поле "tags" или, у старых заметок, теги из текста"""
+    if note.extra and "tags" in note.extra:
+        return [normalize(tag) for tag in note.extra["tags"]]
+    return extract_tags(note.text)
+
+
+def parse_query(query):
+    """Строка поиска -> (теги, достаточно ли любого тега, остальной текст)"""
+    tags = [normalize(tag) for tag in TAG_RE.findall(query)]
+    rest = TAG_RE.sub(" ", query)
+    any_tag = "|" in rest
+    return tags, any_tag, rest.replace("|", " ").strip()
+
+
+def note_matches(note, query):
+    """Подходит ли заметка под запрос (ее может и не быть в индексе)"""
+    tags, any_tag, query = parse_query(query)
+    if tags:
+        note_tag_set = set(note_tags(note))
+        check = any if any_tag else all
+        if not check(tag in note_tag_set for tag in tags):
+            return False
+    note_words = set(tokenize(normalize(note.text)))
+    for word in tokenize(normalize(query)):
+        if len(word) >= 3:
+            if not any(word in note_word for note_word in note_words):
+                return False
+        elif not any(note_word.startswith(word) for note_word in note_words):
+            return False
+    return True
+
+
+class TagIndex:
+    """Индекс тегов: тег -> отсортированный список ID заметок
+
+    Рядом со списком хранится множество тех же ID для проверки за O(1).
+    Новые заметки получают большие ID, поэтому добавление - обычно
+    дописывание в конец списка. Результаты фильтра идут по возрастанию
+    ID и не требуют сортировки.
+
+    Последний результат фильтра запоминается до изменения индекса: при
+    живом поиске тот же фильтр повторяется на каждое нажатие клавиши.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._sets = {}
+        self._note_tags = {}
+        # (теги, любой ли тег) -> ID последнего фильтра
+        self._last = None
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, note_id, tags):
+        """Добавление (или замена) тегов заметки"""
+        if note_id in self._note_tags:
+            self.remove(note_id)
+        if not tags:
+            return
+        tags = tuple(tags)
+        self._last = None
+        self._note_tags[note_id] = tags
+        for tag in tags:
+            ids = self._ids.get(tag)
+            if ids is None:
+                ids = self._ids[tag] = []
+                self._sets[tag] = set()
+            if not ids or ids[-1] < note_id:
+                ids.append(note_id)
+            else:
+                insort(ids, note_id)
+            self._sets[tag].add(note_id)
+
+    def remove(self, note_id):
+        """Удаление заметки из индекса"""
+        for tag in self._note_tags.pop(note_id, ()):
+            self._last = None
+            ids = self._ids[tag]
+            del ids[bisect_left(ids, note_id)]
+            self._sets[tag].discard(note_id)
+            if not ids:
+                del self._ids[tag]
+                del self._sets[tag]
+
+    def counts(self):
+        """Теги и число заметок с ними, частые первыми"""
+        return sorted(
+            ((tag, len(ids)) for tag, ids in self._ids.items()),
+            key=lambda item: (-item[1], item[0])
+        )
+
+    def filter(self, tags, any_tag=False):
+        """ID заметок со всеми тегами (или с любым) по возрастанию
+
+        Список может быть общим с индексом: изменять его нельзя.
+        """
+        key = (frozenset(tags), any_tag)
+        if self._last is None or self._last[0] != key:
+            self._last = (key, self._filter(list(dict.fromkeys(tags)), any_tag))
+        return self._last[1]
+
+    def _filter(self, tags, any_tag):
+        """Вычисление фильтра без запомненного результата"""
+        if not tags:
+            return []
+        if any_tag:
+            tags = sorted((tag for tag in tags if tag in self._ids),
+                          key=lambda tag: len(self._ids[tag]), reverse=True)
+            if not tags:
+                return []
+            # К самому длинному списку дописываем ID остальных, которых нет
+            # в предыдущих (проверки идут в filterfalse, без цикла на Python);
+            # сортировка сливает отсортированные куски за O(n)
+            result = list(self._ids[tags[0]])
+            for position in range(1, len(tags)):
+                new_ids = self._ids[tags[position]]
+                for previous in tags[:position]:
+                    new_ids = filterfalse(self._sets[previous].__contains__, new_ids)
+                result.extend(new_ids)
+            if len(tags) > 1:
+                result.sort()
+            return result
+        if any(tag not in self._ids for tag in tags):
+            return []
+        # Начинаем с самого короткого списка и сужаем его множествами остальных
+        tags.sort(key=lambda tag: len(self._ids[tag]))
+        result = self._ids[tags[0]]
+        for tag in tags[1:]:
+            result = filter(self._sets[tag].__contains__, result)
+        return list(result)
+
+    def matches(self, note_id, tags, any_tag=False):
+        """Подходит ли одна заметка под фильтр тегов"""
+        note_tags = self._note_tags.get(note_id, ())
+        check = any if any_tag else all
+        return check(tag in note_tags for tag in tags)
+
+
+class NotesView(Sequence):
+    """Заметки по отсортированному списку ID, новые первыми
+
+    Заметка берется из индекса только при обращении: результат фильтра на
+    десятки тысяч заметок передается списку на экране без копирования,
+    а список читает только видимые строки. Представление действительно,
+    пока заметки из него не удалены из индекса.
+    """
+
+    def __init__(self, ids, notes):
+        self._ids = ids
+        self._notes = notes
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __getitem__(self, index):
+        count = len(self._ids)
+        if isinstance(index, slice):
+            start, stop, step = index.indices(count)
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            ids = self._ids[count - stop:count - start] if start < stop else []
+            return list(map(self._notes.__getitem__, reversed(ids)))
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError(index)
+        return self._notes[self._ids[count - 1 - index]]
+
+    def __iter__(self):
+        return map(self._notes.__getitem__, reversed(self._ids))
+
+
+class NoteSearchIndex:
+    """Инвертированный индекс заметок по словам и триграммам
+
+    Слова указывают на множества ID заметок, а триграммы и начала слов
+    (первые одна и две буквы) - на слова словаря, поэтому добавление
+    заметки стоит O(слов в ней), а триграммы считаются только для новых
+    слов. Короткие запросы (1-2 символа) ищутся как начала слов, длинные -
+    как подстроки слов через пересечение триграмм. Сортированного словаря
+    нет: ни вставка слова, ни первый поиск после загрузки не стоят O(словаря).
+
+    Теги в запросе (``#работа #срочно`` - все теги, ``#работа | #дом`` -
+    любой) отбираются по индексу тегов ``tags``.
+    """
+
+    def __init__(self):
+        self._notes = {}
+        self._words = {}
+        self._trigrams = defaultdict(set)
+        self._prefixes = defaultdict(set)
+        self.tags = TagIndex()
+
+    def __len__(self):
+        return len(self._notes)
+
+    def build(self, notes):
+        """Построение индекса с нуля"""
+        self.__init__()
+        for note in notes:
+            self.add(note)
+
+    @staticmethod
+    def _note_words(note):
+        """Уникальные слова заметки"""
+        return set(tokenize(normalize(note.text)))
+
+    def add(self, note):
+        """Добавление заметки в индекс"""
+        note_id = note.id
+        if note_id in self._notes:
+            self.remove(note_id)
+        self._notes[note_id] = note
+        self.tags.add(note_id, note_tags(note))
+        for word in self._note_words(note):
+            ids = self._words.get(word)
+            if ids is None:
+                # Новое слово: добавляем в словарь, индекс триграмм и начал
+                ids = self._words[word] = set()
+                for trigram in trigrams(word):
+                    self._trigrams[trigram].add(word)
+                for prefix in prefixes(word):
+                    self._prefixes[prefix].add(word)
+            ids.add(note_id)
+
+    def remove(self, note_id):
+        """Удаление заметки из индекса"""
+        note = self._notes.pop(note_id, None)
+        if note is None:
+            return
+        self.tags.remove(note_id)
+        for word in self._note_words(note):
+            ids = self._words.get(word)
+            if ids is None:
+                continue
+            ids.discard(note_id)
+            if not ids:
+                del self._words[word]
+                for index, keys in ((self._trigrams, trigrams(word)),
+                                    (self._prefixes, prefixes(word))):
+                    for key in keys:
+                        words = index.get(key)
+                        if words is not None:
+                            words.discard(word)
+                            if not words:
+                                del index[key]
+
+    def _prefix_ids(self, prefix):
+        """ID заметок со словами, начинающимися с prefix (1-2 символа)"""
+        words = self._words
+        return set().union(*[words[word] for word in self._prefixes.get(prefix, ())])
+
+    def _substring_ids(self, query_word):
+        """ID заметок со словами, содержащими query_word как подстроку"""
+        sets = []
+        for trigram in trigrams(query_word):
+            words = self._trigrams.get(trigram)
+            if not words:
+                return set()
+            sets.append(words)
+        sets.sort(key=len)
+        candidates = sets[0].intersection(*sets[1:])
+        result = set()
+        for word in candidates:
+            if query_word in word:
+                result |= self._words[word]
+        return result
+
+    def search_ids(self, query):
+        """ID заметок, содержащих все слова запроса"""
+        words = tokenize(normalize(query))
+        if not words:
+            return None
+        # Сначала длинные слова: их множества обычно меньше
+        words.sort(key=len, reverse=True)
+        result = None
+        for word in words:
+            ids = self._substring_ids(word) if len(word) >= 3 else self._prefix_ids(word)
+            result = ids if result is None else result & ids
+            if not result:
+                return set()
+        return result
+
+    def search(self, query):
+        """Заметки, подходящие под запрос (новые первыми) - NotesView"""
+        tags, any_tag, query = parse_query(query)
+        ids = self.search_ids(query)
+        if tags:
+            # Список по тегам уже отсортирован, слова запроса только сужают его
+            ordered = self.tags.filter(tags, any_tag)
+            if ids is not None:
+                ordered = list(filter(ids.__contains__, ordered))
+        elif ids is None:
+            ordered = []
+        else:
+            ordered = sorted(ids)
+        return NotesView(ordered, self._notes)
+
+    def matches(self, note_id, query):
+        """Подходит ли одна заметка индекса под запрос"""
+        note = self._notes.get(note_id)
+        return note is not None and note_matches(note, query)
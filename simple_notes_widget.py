@@ -1,17 +1,20 @@
 # -*- coding: utf-8 -*-
+import time
+_IMPORT_STARTED = time.perf_counter()  # Начало импорта (для --profile-startup)
+
 import customtkinter as ctk
-import json
-import os
-from datetime import datetime
+from notes_controller import NotesController, main
+from styles import registry as styles
+from virtual_list import NoteRow, VirtualNotesList
 
-class SimpleNotesWidget:
-    def __init__(self):
-        # Настройка темы
-        ctk.set_appearance_mode("dark")
-        ctk.set_default_color_theme("blue")
-        
-        # Создание главного окна
-        self.root = ctk.CTk()
+class SimpleNotesWidget(NotesController):
+    # Оформление: стиль уведомлений, прилипание к краям, символов в строке превью
+    toast_style = "toast_plain"
+    snap_distance = 0
+    chars_per_line = 50
+        
+    def setup_window(self):
+        """Заголовок, размер и свойства главного окна"""
         self.root.title("Простой виджет заметок")
         self.root.geometry("400x800")  # Увеличили высоту на 300 пикселей
         
@@ -19,21 +22,6 @@ class SimpleNotesWidget:
         self.root.attributes('-topmost', True)
         self.root.attributes('-alpha', 0.95)
         
-        # Переменные для перетаскивания
-        self.drag_x = 0
-        self.drag_y = 0
-        self.is_dragging = False
-        
-        # Создание интерфейса
-        self.create_widgets()
-        
-        # Загрузка заметок
-        self.notes_file = "notes.json"
-        self.load_notes()
-        
-        # Привязка событий
-        self.bind_events()
-        
     def create_widgets(self):
         """Создание всех элементов интерфейса"""
         
@@ -45,7 +33,7 @@ class SimpleNotesWidget:
         self.title_label = ctk.CTkLabel(
             self.main_frame, 
             text="📝 Мои Заметки", 
-            font=ctk.CTkFont(size=20, weight="bold")
+            font=styles.font(20, "bold")
         )
         self.title_label.pack(pady=10)
         
@@ -66,16 +54,30 @@ class SimpleNotesWidget:
         self.close_btn = ctk.CTkButton(
             self.control_frame,
             text="Закрыть",
-            command=self.root.quit,
+            command=self.close,
             width=80,
             fg_color="red",
             hover_color="darkred"
         )
         self.close_btn.pack(side="right", padx=5)
         
-        # Контейнер для заметок
-        self.notes_container = ctk.CTkScrollableFrame(
+        # Поле поиска
+        self.search_entry = ctk.CTkEntry(
             self.main_frame,
+            placeholder_text="🔍 Поиск по заметкам и #тегам...",
+            height=30,
+            corner_radius=8
+        )
+        self.search_entry.pack(fill="x", padx=10, pady=(10, 0))
+        self.search_entry.bind("<KeyRelease>", self.on_search_changed)
+        
+        # Контейнер для заметок (виртуализированный список)
+        self.notes_container = VirtualNotesList(
+            self.main_frame,
+            create_row=self.create_note_widget,
+            bind_row=self.bind_note_widget,
+            row_height=self.note_row_height,
+            on_end_reached=self.load_more,
             corner_radius=10,
             height=200
         )
@@ -85,7 +87,7 @@ class SimpleNotesWidget:
         self.input_label = ctk.CTkLabel(
             self.main_frame,
             text="✏️ Новая заметка:",
-            font=ctk.CTkFont(size=14, weight="bold")
+            font=styles.font(14, "bold")
         )
         self.input_label.pack(anchor="w", padx=15, pady=(10, 5))
         
@@ -94,7 +96,7 @@ class SimpleNotesWidget:
             self.main_frame,
             height=100,
             corner_radius=8,
-            font=ctk.CTkFont(size=12),
+            font=styles.font(12),
             wrap="word"
         )
         self.note_entry.pack(fill="x", padx=15, pady=(0, 10))
@@ -105,7 +107,7 @@ class SimpleNotesWidget:
             text="💾 Сохранить заметку",
             command=self.save_note,
             height=40,
-            font=ctk.CTkFont(size=14, weight="bold")
+            font=styles.font(14, "bold")
         )
         self.save_btn.pack(padx=15, pady=(0, 15))
         
@@ -113,7 +115,7 @@ class SimpleNotesWidget:
         self.stats_label = ctk.CTkLabel(
             self.main_frame,
             text="📊 Всего заметок: 0",
-            font=ctk.CTkFont(size=12)
+            font=styles.font(12)
         )
         self.stats_label.pack(pady=(0, 10))
         
@@ -126,28 +128,23 @@ class SimpleNotesWidget:
         self.title_label.bind("<B1-Motion>", self.on_drag)
         self.title_label.bind("<ButtonRelease-1>", self.stop_drag)
         
-    def start_drag(self, event):
-        """Начало перетаскивания"""
-        self.is_dragging = True
-        self.drag_x = event.x
-        self.drag_y = event.y
+        # Отмена и повтор (в том числе в русской раскладке)
+        for sequence in ("<Control-z>", "<Control-Z>", "<Control-Cyrillic_ya>", "<Control-Cyrillic_YA>"):
+            self.root.bind(sequence, self.undo)
+        for sequence in ("<Control-y>", "<Control-Y>", "<Control-Cyrillic_en>", "<Control-Cyrillic_EN>"):
+            self.root.bind(sequence, self.redo)
         
-    def on_drag(self, event):
-        """Перетаскивание окна"""
-        if self.is_dragging:
-            x = self.root.winfo_x() + (event.x - self.drag_x)
-            y = self.root.winfo_y() + (event.y - self.drag_y)
-            self.root.geometry(f"+{x}+{y}")
-            
-    def stop_drag(self, event):
-        """Окончание перетаскивания"""
-        self.is_dragging = False
+        # Сохранение метрик по горячей клавише
+        if self.metrics is not None:
+            self.root.bind("<F12>", self.dump_metrics)
         
     def toggle_minimize(self):
         """Сворачивание/разворачивание окна"""
-        if self.root.winfo_height() > 200:
+        if not self.minimized:
             # Сворачиваем
-            self.root.geometry(f"{self.root.winfo_width()}x150")
+            self.minimized = True
+            self.animate_height(self.root.winfo_width(), 150)
+            self.search_entry.pack_forget()
             self.notes_container.pack_forget()
             self.input_label.pack_forget()
             self.note_entry.pack_forget()
@@ -156,158 +153,93 @@ class SimpleNotesWidget:
             self.minimize_btn.configure(text="Развернуть")
         else:
             # Разворачиваем
-            self.root.geometry("400x800")  # Увеличили высоту на 300 пикселей
+            self.minimized = False
+            self.animate_height(400, 800)  # Увеличили высоту на 300 пикселей
+            self.search_entry.pack(fill="x", padx=10, pady=(10, 0))
             self.notes_container.pack(fill="both", expand=True, padx=10, pady=10)
             self.input_label.pack(anchor="w", padx=15, pady=(10, 5))
             self.note_entry.pack(fill="x", padx=15, pady=(0, 10))
             self.save_btn.pack(padx=15, pady=(0, 15))
             self.stats_label.pack(pady=(0, 10))
             self.minimize_btn.configure(text="Свернуть")
-            
-    def save_note(self):
-        """Сохранение новой заметки"""
-        try:
-            note_text = self.note_entry.get("1.0", "end-1c").strip()
-            if note_text:
-                # Создаем новую заметку
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                max_id = max([note.get('id', 0) for note in self.notes]) if self.notes else 0
-                new_note = {
-                    "text": note_text,
-                    "timestamp": timestamp,
-                    "id": max_id + 1
-                }
-                
-                self.notes.append(new_note)
-                self.save_to_file()
-                
-                # Очищаем поле ввода
-                self.note_entry.delete("1.0", "end")
-                
-                # Обновляем интерфейс
-                self.update_notes_display()
-                
-                # Показываем уведомление
-                self.show_notification("✅ Заметка сохранена!")
-                
-                # Возвращаем фокус
-                self.note_entry.focus_set()
-        except Exception as e:
-            self.show_notification(f"❌ Ошибка: {str(e)}")
-            
-    def update_notes_display(self):
-        """Обновление отображения заметок"""
-        # Очищаем контейнер
-        for widget in self.notes_container.winfo_children():
-            widget.destroy()
-            
-        # Обновляем статистику
-        self.stats_label.configure(text=f"📊 Всего заметок: {len(self.notes)}")
         
-        # Отображаем заметки
-        for note in reversed(self.notes):
-            self.create_note_widget(note)
-            
-    def create_note_widget(self, note):
-        """Создание виджета для одной заметки"""
+    def create_note_widget(self, parent):
+        """Создание переиспользуемого виджета строки заметки"""
         # Фрейм для заметки
         note_frame = ctk.CTkFrame(
-            self.notes_container,
+            parent,
             corner_radius=10
         )
-        note_frame.pack(fill="x", padx=5, pady=3)
         
         # Заголовок
         header_frame = ctk.CTkFrame(note_frame, fg_color="transparent")
         header_frame.pack(fill="x", padx=10, pady=(10, 5))
         
         # Номер заметки
-        note_id = note.get('id', '?')
         note_id_label = ctk.CTkLabel(
             header_frame,
-            text=f"#{note_id}",
-            font=ctk.CTkFont(size=12, weight="bold")
+            text="",
+            font=styles.font(12, "bold", role="note_id")
         )
         note_id_label.pack(side="left")
         
         # Дата
         date_label = ctk.CTkLabel(
             header_frame,
-            text=note['timestamp'],
-            font=ctk.CTkFont(size=10)
+            text="",
+            font=styles.font(10, role="note_date")
         )
         date_label.pack(side="right")
         
         # Текст заметки
         text_label = ctk.CTkLabel(
             note_frame,
-            text=note['text'],
-            font=ctk.CTkFont(size=12),
+            text="",
+            font=styles.font(12, role="note_text"),
             wraplength=350,
             justify="left"
         )
         text_label.pack(fill="x", padx=10, pady=(0, 10))
         
+        # Нижняя строка: "показать еще" слева, удаление справа
+        footer_frame = ctk.CTkFrame(note_frame, fg_color="transparent")
+        footer_frame.pack(fill="x", padx=10, pady=(0, 10))
+        
+        more_btn = ctk.CTkButton(
+            footer_frame,
+            text="",
+            width=30,
+            height=25,
+            font=styles.font(10, role="more"),
+            **styles.style("more_button")
+        )
+        
+        # Весь текст - в отдельном окне (когда не влезает и в развернутое превью)
+        full_btn = ctk.CTkButton(
+            footer_frame,
+            text="📄 Весь текст",
+            width=30,
+            height=25,
+            font=styles.font(10, role="more"),
+            **styles.style("more_button")
+        )
+        
         # Кнопка удаления
         delete_btn = ctk.CTkButton(
-            note_frame,
+            footer_frame,
             text="🗑️ Удалить",
             width=80,
             height=25,
-            command=lambda: self.delete_note(note_id),
-            fg_color="red",
-            hover_color="darkred",
-            font=ctk.CTkFont(size=10)
+            font=styles.font(10, role="delete"),
+            **styles.style("delete_button")
         )
-        delete_btn.pack(anchor="e", padx=10, pady=(0, 10))
+        delete_btn.pack(side="right")
         
-    def delete_note(self, note_id):
-        """Удаление заметки"""
-        self.notes = [note for note in self.notes if note.get('id') != note_id]
-        self.save_to_file()
-        self.update_notes_display()
-        self.show_notification("🗑️ Заметка удалена!")
-        
-    def show_notification(self, message):
-        """Показ уведомления"""
-        notification = ctk.CTkLabel(
-            self.root,
-            text=message,
-            font=ctk.CTkFont(size=12, weight="bold"),
-            fg_color="green",
-            text_color="white",
-            corner_radius=8
-        )
-        notification.place(relx=0.5, rely=0.1, anchor="center")
-        
-        # Удаляем через 2 секунды
-        self.root.after(2000, notification.destroy)
-        
-    def load_notes(self):
-        """Загрузка заметок из файла"""
-        if os.path.exists(self.notes_file):
-            try:
-                with open(self.notes_file, 'r', encoding='utf-8') as f:
-                    self.notes = json.load(f)
-                # Добавляем ID для старых заметок
-                for i, note in enumerate(self.notes):
-                    if 'id' not in note:
-                        note['id'] = i + 1
-            except:
-                self.notes = []
-        else:
-            self.notes = []
-            
-    def save_to_file(self):
-        """Сохранение заметок в файл"""
-        with open(self.notes_file, 'w', encoding='utf-8') as f:
-            json.dump(self.notes, f, ensure_ascii=False, indent=2)
-            
-    def run(self):
-        """Запуск приложения"""
-        self.update_notes_display()
-        self.root.mainloop()
+        row = NoteRow(note_frame, note_id_label, date_label, text_label, delete_btn, more_btn, full_btn)
+        delete_btn.configure(command=lambda: self.delete_note(row.note_id))
+        more_btn.configure(command=lambda: self.toggle_note_expanded(row.note_id))
+        full_btn.configure(command=lambda: self.show_full_note(row.note_id))
+        return row
 
 if __name__ == "__main__":
-    widget = SimpleNotesWidget()
-    widget.run() 
\ No newline at end of file
+    main(SimpleNotesWidget, _IMPORT_STARTED)
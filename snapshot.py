@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""Бинарный снимок заметок для быстрого запуска.
+
+На больших коллекциях запуск почти целиком уходит на разбор JSON. Снимок -
+производная копия заметок рядом с исходным файлом (``notes.json.snap``):
+столбцы ID, текстов, времени и дополнительных полей в формате ``marshal``.
+Снимок принимается, только если совпадают версия формата, его собственная
+контрольная сумма и подпись исходного файла (размер, время изменения и
+CRC32 последних байт); иначе заметки читаются из исходного файла как
+обычно. Снимок можно удалить в любой момент - он будет создан заново.
+
+Для журнала снимок описывает его начало: если журнал после этого только
+дописывался, проигрываются лишь новые строки.
+"""
+import gc
+import marshal
+import os
+import struct
+import zlib
+
+from note_record import Note
+
+MAGIC = b"NSNP"
+# Версия формата снимка: при изменении формата старые снимки игнорируются
+SCHEMA_VERSION = 1
+# Сколько последних байт исходного файла входит в его контрольную сумму
+SIGNATURE_BYTES = 4096
+
+# Заголовок: метка, версия, размер и время изменения исходного файла,
+# CRC32 конца исходного файла и CRC32 данных снимка
+HEADER = struct.Struct("<4sHQqII")
+
+
+def source_crc(f, size):
+    """CRC32 последних SIGNATURE_BYTES байт до позиции size"""
+    start = max(0, size - SIGNATURE_BYTES)
+    f.seek(start)
+    return zlib.crc32(f.read(size - start))
+
+
+class NoteSnapshot:
+    """Снимок заметок, привязанный к исходному файлу"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def read(self, f, append_only=False):
+        """Заметки и метаданные снимка для открытого (в режиме 'rb') файла f
+
+        Возвращает ``(notes, meta)`` или None, если снимка нет или он не
+        соответствует файлу. В ``meta["size"]`` - сколько байт файла
+        покрывает снимок. При ``append_only`` файл может быть длиннее (в
+        него дописывали), время изменения тогда не сравнивается.
+        """
+        try:
+            with open(self.path, 'rb') as snap:
+                header = snap.read(HEADER.size)
+                payload = snap.read()
+        except OSError:
+            return None
+        if len(header) != HEADER.size:
+            return None
+        magic, version, size, mtime_ns, crc, payload_crc = HEADER.unpack(header)
+        if magic != MAGIC or version != SCHEMA_VERSION:
+            return None
+        stat = os.fstat(f.fileno())
+        if append_only:
+            if stat.st_size < size:
+                return None
+        elif (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+            return None
+        if source_crc(f, size) != crc or zlib.crc32(payload) != payload_crc:
+            return None
+        # Миллион новых объектов подряд заставляет сборщик мусора много раз
+        # обходить их без толку: на время разбора он приостанавливается
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            meta, ids, texts, created, extras = marshal.loads(payload)
+            notes = list(map(Note, ids, texts, created))
+            for index, extra in extras:
+                notes[index] = Note(ids[index], texts[index], created[index], extra)
+        except (EOFError, ValueError, TypeError):
+            return None
+        finally:
+            if gc_enabled:
+                gc.enable()
+        meta["size"] = size
+        return notes, meta
+
+    def write(self, f, notes, meta=None, size=None):
+        """Запись снимка заметок, соответствующих первым size байтам файла f
+
+        Снимок - только ускорение, поэтому ошибки записи не мешают работе.
+        """
+        stat = os.fstat(f.fileno())
+        if size is None:
+            size = stat.st_size
+        ids = []
+        texts = []
+        created = []
+        extras = []
+        for index, note in enumerate(notes):
+            ids.append(note.id)
+            texts.append(note.text)
+            created.append(note.created)
+            if note.extra:
+                extras.append((index, note.extra))
+        try:
+            payload = marshal.dumps((meta or {}, ids, texts, created, extras))
+        except ValueError:
+            # В дополнительных полях значения, которые marshal не записывает
+            return False
+        header = HEADER.pack(
+            MAGIC, SCHEMA_VERSION, size, stat.st_mtime_ns,
+            source_crc(f, size), zlib.crc32(payload)
+        )
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as snap:
+                snap.write(header)
+                snap.write(payload)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return False
+        return True
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import sys
+import time
+
+# Фазы запуска в порядке вывода
+PHASES = ("import", "tk_init", "create_widgets", "load_notes", "first_render", "first_idle")
+
+
+class StartupProfiler:
+    """Замер фаз запуска виджета (режим --profile-startup)
+
+    Каждая фаза хранит время начала и конца относительно ``origin`` -
+    момента, когда модуль виджета начал импортироваться. Фазы могут
+    пересекаться: заметки грузятся, пока главный цикл уже рисует окно.
+    """
+
+    def __init__(self, origin):
+        self.origin = origin
+        self.phases = {}
+
+    def start(self, phase, at=None):
+        """Начало фазы"""
+        self.phases[phase] = [time.perf_counter() if at is None else at, None]
+
+    def stop(self, phase):
+        """Конец фазы (повторный вызов ничего не меняет)"""
+        span = self.phases.get(phase)
+        if span is not None and span[1] is None:
+            span[1] = time.perf_counter()
+
+    def finished(self):
+        """Все ли фазы завершены"""
+        return all(
+            phase in self.phases and self.phases[phase][1] is not None
+            for phase in PHASES
+        )
+
+    def report(self, stream=None):
+        """Печать таблицы фаз: начало и длительность в миллисекундах"""
+        stream = stream or sys.stdout
+        stream.write(f"{'фаза':<16}{'начало, мс':>12}{'длит., мс':>12}\n")
+        end = self.origin
+        for phase in PHASES:
+            span = self.phases.get(phase)
+            if span is None or span[1] is None:
+                stream.write(f"{phase:<16}{'-':>12}{'-':>12}\n")
+                continue
+            start = (span[0] - self.origin) * 1000
+            duration = (span[1] - span[0]) * 1000
+            stream.write(f"{phase:<16}{start:>12.1f}{duration:>12.1f}\n")
+            end = max(end, span[1])
+        stream.write(f"{'итого':<16}{'':>12}{(end - self.origin) * 1000:>12.1f}\n")
+        stream.flush()
@@ -0,0 +1,978 @@
+# -*- coding: utf-8 -*-
+"""Хранилища заметок.
+
+Виджеты работают с хранилищем через одинаковый набор методов:
+``load()`` возвращает список заметок (``note_record.Note``), ``apply(ops)`` сохраняет список
+операций вида ``("add", note)``, ``("edit", note)``, ``("delete", note_id)``.
+Метод ``iter_newest(batch_size)`` отдает заметки пачками, начиная с новых,
+для постепенной загрузки при старте, а ``iter_notes()`` - по одной от старых
+к новым, не держа в памяти больше, чем требует формат хранилища.
+
+Несколько экземпляров виджета могут работать с одним файлом: запись идет
+под межпроцессной блокировкой, а ``read_changes()`` возвращает операции,
+сделанные другими экземплярами с момента прошлого чтения. Кроме обычных
+операций там бывают ``("renumber", (old_id, new_id, note))`` - ID новой
+заметки оказался занят и она сохранена под другим ID (``note`` - ее
+записанная версия или None, если она удалена в той же пачке), - и
+``("reset", notes)``, когда файл был полностью переписан и изменения не
+удается выделить. Переименования идут раньше чужих операций: чужая заметка
+со старым ID приходит после них (или уже пришла).
+``watch_paths()`` - файлы, за которыми нужно следить.
+
+JSON и журнал держат рядом бинарный снимок (``snapshot.NoteSnapshot``),
+из которого заметки загружаются без разбора JSON, пока он соответствует
+файлу.
+"""
+import json
+import os
+import threading
+from operator import attrgetter
+
+from file_watch import FileLock
+from note_record import Note, notes_from_json, parse_timestamp
+from snapshot import NoteSnapshot
+
+# Ключ сортировки заметок по ID
+_note_id = attrgetter("id")
+
+# Суффикс файла снимка рядом с файлом заметок
+SNAPSHOT_SUFFIX = ".snap"
+
+
+def read_json_notes(path):
+    """Чтение заметок из JSON файла старого формата"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return notes_from_json(json.load(f))
+    except (OSError, ValueError):
+        return []
+
+
+def sorted_by_id(notes):
+    """Заметки по порядку ID, как их отдает SQLite (ORDER BY id)
+
+    В файле заметки идут в порядке записи: заметка, возвращенная отменой
+    удаления, дописывается в конец, но после перезапуска должна оказаться
+    на своем месте. Файл почти всегда уже упорядочен, и сортировка такого
+    списка - один проход.
+    """
+    return sorted(notes, key=_note_id)
+
+
+def iter_newest(notes, batch_size):
+    """Пачки заметок из списка, начиная с новых"""
+    for end in range(len(notes), 0, -batch_size):
+        yield notes[max(0, end - batch_size):end][::-1]
+
+
+def apply_op(notes_by_id, op, payload):
+    """Применение одной операции к словарю заметок (ID -> заметка)"""
+    if op == "add":
+        notes_by_id[payload.id] = payload
+    elif op == "edit":
+        if payload.id in notes_by_id:
+            notes_by_id[payload.id] = payload
+    elif op == "delete":
+        notes_by_id.pop(payload, None)
+    else:
+        raise ValueError(f"Неизвестная операция: {op}")
+
+
+def diff_notes(old_by_id, new_by_id):
+    """Операции, превращающие один словарь заметок в другой"""
+    ops = [("delete", note_id) for note_id in old_by_id if note_id not in new_by_id]
+    for note_id, note in new_by_id.items():
+        old = old_by_id.get(note_id)
+        if old is None:
+            ops.append(("add", note))
+        elif old != note:
+            ops.append(("edit", note))
+    return ops
+
+
+def renumber_conflicts(ops, is_taken, max_id):
+    """Новые ID, если ID новой заметки уже занят другим экземпляром
+
+    Возвращает операции для записи и список троек (старый ID, новый ID,
+    последняя записанная версия заметки или None, если она удалена).
+    Ссылки на переименованную заметку внутри той же пачки тоже меняются.
+    """
+    result = []
+    renumbered = {}
+    max_id = max([max_id] + [payload.id for op, payload in ops if op == "add"])
+    for op, payload in ops:
+        if op == "add" and is_taken(payload):
+            max_id += 1
+            renumbered[payload.id] = max_id
+            payload = payload.copy(id=max_id)
+        elif op == "edit" and payload.id in renumbered:
+            payload = payload.copy(id=renumbered[payload.id])
+        elif op == "delete" and payload in renumbered:
+            payload = renumbered[payload]
+        result.append((op, payload))
+    written = []
+    for old_id, new_id in renumbered.items():
+        note = None
+        for op, payload in reversed(result):
+            if op == "delete" and payload == new_id:
+                break
+            if op != "delete" and payload.id == new_id:
+                note = payload
+                break
+        written.append((old_id, new_id, note))
+    return result, written
+
+
+class JsonStorage:
+    """Все заметки в одном JSON файле (перезаписывается целиком)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(path)
+        self._snapshot = NoteSnapshot(path + SNAPSHOT_SUFFIX)
+        # None - файл еще не прочитан (запись дождется загрузки)
+        self._notes = None
+        self._stat = None
+        self._pending = []
+
+    def _file_stat(self):
+        """Размер, время изменения и inode файла (None, если файла нет)"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+    def _read(self):
+        """Чтение файла (или его снимка) в словарь ID -> заметка"""
+        try:
+            with open(self.path, 'rb') as f:
+                cached = self._snapshot.read(f)
+                if cached is not None:
+                    notes = cached[0]
+                else:
+                    notes = read_json_notes(self.path)
+                    self._snapshot.write(f, notes)
+        except FileNotFoundError:
+            notes = []
+        self._notes = {note.id: note for note in notes}
+        self._stat = self._file_stat()
+        return notes
+
+    def _sync(self):
+        """Перечитывание файла, если его изменил другой экземпляр"""
+        if self._notes is None:
+            self._read()
+        elif self._file_stat() != self._stat:
+            old = self._notes
+            self._read()
+            self._pending.extend(diff_notes(old, self._notes))
+
+    def load(self):
+        """Загрузка заметок из файла (по порядку ID)"""
+        with self._lock, self._file_lock:
+            return sorted_by_id(self._read())
+
+    def iter_newest(self, batch_size):
+        """Заметки пачками, новые первыми (JSON разбирается целиком)"""
+        return iter_newest(self.load(), batch_size)
+
+    def max_id(self):
+        """Максимальный ID заметки (файл читается, если еще не прочитан)"""
+        with self._lock, self._file_lock:
+            self._sync()
+            return max(self._notes, default=0)
+
+    def iter_notes(self):
+        """Заметки от старых к новым (JSON разбирается целиком)
+
+        Состояние хранилища не меняется, поэтому метод можно вызывать из
+        другого потока (например, для резервной копии).
+        """
+        with self._lock, self._file_lock:
+            notes = read_json_notes(self.path)
+        return iter(notes)
+
+    def apply(self, ops):
+        """Применение операций и перезапись файла"""
+        with self._lock, self._file_lock:
+            self._sync()
+            notes = self._notes
+            ops, renumbered = renumber_conflicts(
+                ops,
+                lambda note: notes.get(note.id, note) != note,
+                max(notes, default=0)
+            )
+            for op, payload in ops:
+                apply_op(notes, op, payload)
+            self._write(list(notes.values()))
+            # Переименования - раньше уже прочитанных чужих операций
+            self._pending[:0] = [("renumber", item) for item in renumbered]
+
+    def save_all(self, notes):
+        """Сохранение всех заметок в файл"""
+        with self._lock, self._file_lock:
+            self._notes = {note.id: note for note in notes}
+            self._write(notes)
+
+    def _write(self, notes):
+        """Перезапись файла"""
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump([note.to_dict() for note in notes], f, ensure_ascii=False, indent=2)
+        with open(self.path, 'rb') as f:
+            self._snapshot.write(f, notes)
+        self._stat = self._file_stat()
+
+    def read_changes(self):
+        """Изменения других экземпляров с прошлого чтения"""
+        with self._lock:
+            if self._notes is None:
+                return []
+            with self._file_lock:
+                self._sync()
+            changes, self._pending = self._pending, []
+        return changes
+
+    def watch_paths(self):
+        """Файлы, изменения которых нужно отслеживать"""
+        return [self.path]
+
+    def close(self):
+        """Закрытие хранилища"""
+
+
+class JournalStorage:
+    """Журнал операций в формате JSON Lines (только дозапись)
+
+    Каждая строка файла - одна операция. При загрузке журнал проигрывается,
+    а когда в нем накапливается много лишних записей, он сжимается в фоне.
+    Экземпляр помнит, до какого места журнал уже прочитан, поэтому чужие
+    изменения - это просто строки, дописанные после этого места. Первая
+    строка переписанного журнала - заголовок со случайным номером
+    поколения: если он сменился, файл был переписан другим экземпляром.
+    Снимок описывает начало журнала текущего поколения; после загрузки
+    из снимка проигрываются только строки, дописанные позже.
+    """
+
+    def __init__(self, path, legacy_path=None, compact_threshold=1000,
+                 snapshot_threshold=1000):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.compact_threshold = compact_threshold
+        # Сколько строк после снимка можно проигрывать, не обновляя его
+        self.snapshot_threshold = snapshot_threshold
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(path)
+        self._snapshot = NoteSnapshot(path + SNAPSHOT_SUFFIX)
+        self._records = 0
+        self._live_ids = set()
+        # Сколько байт журнала уже прочитано (None - журнал еще не загружен)
+        self._offset = None
+        self._generation = None
+        self._pending = []
+        self._compactor = None
+
+    @staticmethod
+    def _encode(op, payload):
+        """Кодирование операции в строку журнала"""
+        if op == "delete":
+            record = {"op": op, "id": payload}
+        else:
+            record = {"op": op, "note": payload.to_dict()}
+        return json.dumps(record, ensure_ascii=False) + "\n"
+
+    @staticmethod
+    def _header():
+        """Заголовок нового поколения журнала"""
+        generation = os.urandom(8).hex()
+        return generation, json.dumps({"op": "header", "generation": generation}) + "\n"
+
+    @staticmethod
+    def _decode(line):
+        """Строка журнала -> (операция, данные) или None для оборванной записи"""
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return None
+        op = record.get("op")
+        if op == "header":
+            return op, record.get("generation")
+        if op == "delete":
+            return op, record["id"]
+        return op, Note.from_dict(record["note"])
+
+    @classmethod
+    def _replay(cls, lines, notes_by_id=None):
+        """Проигрывание строк журнала"""
+        if notes_by_id is None:
+            notes_by_id = {}
+        records = 0
+        for line in lines:
+            decoded = cls._decode(line)
+            if decoded is None or decoded[0] == "header":
+                # Оборванная запись (например, после сбоя) пропускается
+                continue
+            records += 1
+            apply_op(notes_by_id, *decoded)
+        return notes_by_id, records
+
+    def _track(self, op, payload):
+        """Учет записи в счетчиках журнала"""
+        self._records += 1
+        if op == "add":
+            self._live_ids.add(payload.id)
+        elif op == "delete":
+            self._live_ids.discard(payload)
+
+    @classmethod
+    def _read_generation(cls, f):
+        """Номер поколения из первой строки журнала (None для старых журналов)"""
+        f.seek(0)
+        decoded = cls._decode(f.readline())
+        if decoded is not None and decoded[0] == "header":
+            return decoded[1]
+        return None
+
+    def _load_file(self):
+        """Проигрывание журнала от снимка или с начала (под блокировками)"""
+        with open(self.path, 'rb') as f:
+            self._generation = self._read_generation(f)
+            cached = self._snapshot.read(f, append_only=True)
+            if cached is not None and cached[1].get("generation") != self._generation:
+                cached = None
+            if cached is None:
+                f.seek(0)
+                notes_by_id, self._records = self._replay(f)
+                replayed = self._records
+            else:
+                notes, meta = cached
+                f.seek(meta["size"])
+                notes_by_id, replayed = self._replay(f, {note.id: note for note in notes})
+                self._records = meta["records"] + replayed
+            self._offset = f.tell()
+            if cached is None or replayed > self.snapshot_threshold:
+                self._write_snapshot(f, notes_by_id.values())
+        self._live_ids = set(notes_by_id)
+        return notes_by_id
+
+    def _write_snapshot(self, f, notes):
+        """Снимок заметок на текущую позицию журнала (под блокировками)"""
+        self._snapshot.write(
+            f, notes,
+            {"generation": self._generation, "records": self._records},
+            self._offset
+        )
+
+    def _create(self):
+        """Создание журнала с импортом notes.json (под блокировками)
+
+        Возвращает импортированные заметки или None, если журнал уже есть.
+        Вызывается перед любым первым обращением к журналу, поэтому старые
+        заметки не теряются, даже если сначала была запись, а не загрузка.
+        """
+        if os.path.exists(self.path):
+            return None
+        notes = []
+        if self.legacy_path and os.path.exists(self.legacy_path):
+            notes = read_json_notes(self.legacy_path)
+        self._write_all(notes)
+        return notes
+
+    def load(self):
+        """Загрузка заметок по порядку ID: проигрывание журнала или импорт notes.json"""
+        with self._lock, self._file_lock:
+            notes = self._create()
+            if notes is None:
+                notes = self._load_file().values()
+            return sorted_by_id(notes)
+
+    def iter_newest(self, batch_size):
+        """Заметки пачками, новые первыми (журнал проигрывается целиком)"""
+        return iter_newest(self.load(), batch_size)
+
+    def max_id(self):
+        """Максимальный ID заметки (журнал проигрывается, если еще не загружен)"""
+        with self._lock, self._file_lock:
+            if self._offset is None and self._create() is None:
+                self._load_file()
+            return max(self._live_ids, default=0)
+
+    def iter_notes(self):
+        """Заметки в порядке load() без загрузки всех текстов в память
+
+        Первый проход запоминает только смещение последней версии каждой
+        заметки (место заметки в словаре остается местом ее добавления),
+        второй читает и отдает эти версии по одной. Оба прохода идут по
+        одному открытому файлу, поэтому сжатие журнала между ними ничего
+        не сломает.
+        """
+        with self._lock, self._file_lock:
+            self._create()
+        with open(self.path, 'rb') as f:
+            latest = {}
+            offset = 0
+            for line in f:
+                decoded = self._decode(line)
+                if decoded is not None:
+                    op, payload = decoded
+                    if op == "add" or (op == "edit" and payload.id in latest):
+                        latest[payload.id] = offset
+                    elif op == "delete":
+                        latest.pop(payload, None)
+                offset += len(line)
+            for offset in latest.values():
+                f.seek(offset)
+                yield self._decode(f.readline())[1]
+
+    def _read_foreign(self):
+        """Записи, дописанные другими экземплярами (под блокировками)"""
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return []
+        with f:
+            if self._read_generation(f) != self._generation:
+                # Журнал переписан целиком (сжат другим экземпляром)
+                return [("reset", list(self._load_file().values()))]
+            f.seek(self._offset)
+            data = f.read()
+        self._offset += len(data)
+        ops = []
+        for line in data.splitlines():
+            decoded = self._decode(line)
+            if decoded is not None:
+                self._track(*decoded)
+                ops.append(decoded)
+        return ops
+
+    def apply(self, ops):
+        """Дозапись операций в журнал"""
+        with self._lock, self._file_lock:
+            if self._offset is None:
+                # Запись раньше загрузки: сначала узнаем, какие ID заняты
+                if self._create() is None:
+                    self._load_file()
+            else:
+                self._pending.extend(self._read_foreign())
+            ops, renumbered = renumber_conflicts(
+                ops,
+                lambda note: note.id in self._live_ids,
+                max(self._live_ids, default=0)
+            )
+            data = "".join(self._encode(op, payload) for op, payload in ops).encode('utf-8')
+            with open(self.path, 'ab') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+                self._offset = f.tell()
+            for op, payload in ops:
+                self._track(op, payload)
+            # Переименования - раньше уже прочитанных чужих операций
+            self._pending[:0] = [("renumber", item) for item in renumbered]
+        self._maybe_compact()
+
+    def save_all(self, notes):
+        """Запись журнала, содержащего только текущие заметки"""
+        with self._lock, self._file_lock:
+            self._write_all(notes)
+
+    def _write_all(self, notes):
+        """Запись нового журнала через временный файл (под блокировками)"""
+        tmp_path = self.path + ".tmp"
+        generation, header = self._header()
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(header)
+            for note in notes:
+                f.write(self._encode("add", note))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._offset = os.path.getsize(self.path)
+        self._generation = generation
+        self._records = len(notes)
+        self._live_ids = {note.id for note in notes}
+        with open(self.path, 'rb') as f:
+            self._write_snapshot(f, notes)
+
+    def read_changes(self):
+        """Изменения других экземпляров с прошлого чтения"""
+        with self._lock:
+            if self._offset is None:
+                return []
+            with self._file_lock:
+                self._pending.extend(self._read_foreign())
+            changes, self._pending = self._pending, []
+        return changes
+
+    def watch_paths(self):
+        """Файлы, изменения которых нужно отслеживать"""
+        return [self.path]
+
+    def _maybe_compact(self):
+        """Запуск фонового сжатия, если журнал разросся"""
+        garbage = self._records - len(self._live_ids)
+        if garbage < self.compact_threshold or garbage < len(self._live_ids):
+            return
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self.compact, daemon=True)
+        self._compactor.start()
+
+    def compact(self):
+        """Сжатие журнала без блокировки дозаписи"""
+        # Фиксируем границу: все, что до нее, сжимается без блокировки
+        with self._lock, self._file_lock:
+            with open(self.path, 'rb') as f:
+                old_generation = self._read_generation(f)
+                boundary = os.fstat(f.fileno()).st_size
+        with open(self.path, 'rb') as f:
+            head = f.read(boundary).decode('utf-8').splitlines()
+        notes_by_id, _ = self._replay(head)
+
+        tmp_path = self.path + ".compact"
+        generation, header = self._header()
+        with open(tmp_path, 'w', encoding='utf-8') as out:
+            out.write(header)
+            for note in notes_by_id.values():
+                out.write(self._encode("add", note))
+        live = len(notes_by_id)
+
+        # Переносим записи, добавленные во время сжатия, и подменяем файл
+        with self._lock, self._file_lock:
+            with open(self.path, 'rb') as f:
+                if self._read_generation(f) != old_generation:
+                    # Журнал уже сжал другой экземпляр
+                    os.remove(tmp_path)
+                    return
+            # Чужие записи должны попасть в изменения до подмены файла
+            self._pending.extend(self._read_foreign())
+            with open(self.path, 'rb') as f:
+                f.seek(boundary)
+                tail = f.read().decode('utf-8')
+            with open(tmp_path, 'a', encoding='utf-8') as out:
+                out.write(tail)
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(tmp_path, self.path)
+            self._offset = os.path.getsize(self.path)
+            self._generation = generation
+            _, tail_records = self._replay(tail.splitlines(), notes_by_id)
+            self._records = live + tail_records
+            self._live_ids = set(notes_by_id)
+            with open(self.path, 'rb') as f:
+                self._write_snapshot(f, notes_by_id.values())
+
+    def close(self):
+        """Ожидание завершения фонового сжатия"""
+        if self._compactor is not None:
+            self._compactor.join()
+
+
+class SqliteStorage:
+    """Заметки в базе SQLite с полнотекстовым индексом FTS5
+
+    Позволяет считать, листать страницами и искать заметки, не загружая
+    всю коллекцию в память. Заметки прежнего хранилища (журнала
+    ``notes.jsonl`` или ``notes.json``) один раз импортируются при первом
+    обращении к данным, а не в конструкторе: виджет открывает базу в
+    главном потоке, а читает в фоновом.
+
+    Триггеры записывают каждое изменение в таблицу ``note_log``; экземпляр
+    помнит последний прочитанный номер и по нему находит чужие изменения.
+    """
+
+    # Сколько последних записей журнала изменений хранить
+    LOG_KEEP = 10000
+
+    def __init__(self, path, legacy_path=None):
+        import sqlite3
+
+        self.path = path
+        self.legacy_path = legacy_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+        # Импорт прежнего хранилища проверяется при первом обращении
+        self._migrated = not legacy_path
+        self._pending = []
+        self._seq = self._last_seq()
+
+    def _create_schema(self):
+        """Создание таблиц, индекса FTS5 и триггеров синхронизации"""
+        import sqlite3
+
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS notes ("
+                "id INTEGER PRIMARY KEY, text TEXT NOT NULL, "
+                "timestamp TEXT NOT NULL, extra TEXT)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS note_log (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT, op TEXT NOT NULL, id INTEGER NOT NULL);
+                CREATE TRIGGER IF NOT EXISTS note_log_ad AFTER DELETE ON notes BEGIN
+                    INSERT INTO note_log(op, id) VALUES ('delete', old.id);
+                END;
+                CREATE TRIGGER IF NOT EXISTS note_log_au AFTER UPDATE ON notes BEGIN
+                    INSERT INTO note_log(op, id) VALUES ('edit', new.id);
+                END;
+            """)
+            try:
+                self._conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5("
+                    "text, content='notes', content_rowid='id', tokenize='unicode61')"
+                )
+            except sqlite3.OperationalError:
+                # SQLite собран без FTS5: поиск работает через LIKE
+                self.has_fts = False
+                self._create_insert_triggers()
+                return
+            self.has_fts = True
+            self._create_insert_triggers()
+            self._conn.executescript("""
+                CREATE TRIGGER IF NOT EXISTS notes_ad AFTER DELETE ON notes BEGIN
+                    INSERT INTO notes_fts(notes_fts, rowid, text) VALUES ('delete', old.id, old.text);
+                END;
+                CREATE TRIGGER IF NOT EXISTS notes_au AFTER UPDATE ON notes BEGIN
+                    INSERT INTO notes_fts(notes_fts, rowid, text) VALUES ('delete', old.id, old.text);
+                    INSERT INTO notes_fts(rowid, text) VALUES (new.id, new.text);
+                END;
+            """)
+
+    def _create_insert_triggers(self):
+        """Триггеры вставки: журнал изменений и индекс FTS (импорт их снимает)"""
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS note_log_ai AFTER INSERT ON notes BEGIN "
+            "INSERT INTO note_log(op, id) VALUES ('add', new.id); END"
+        )
+        if self.has_fts:
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS notes_ai AFTER INSERT ON notes BEGIN "
+                "INSERT INTO notes_fts(rowid, text) VALUES (new.id, new.text); END"
+            )
+
+    @staticmethod
+    def _to_row(note):
+        """Заметка -> строка таблицы (дополнительные поля - JSON в колонке extra)"""
+        return (
+            note.id,
+            note.text,
+            note.timestamp,
+            json.dumps(note.extra, ensure_ascii=False) if note.extra else None
+        )
+
+    @staticmethod
+    def _from_row(row):
+        """Строка таблицы -> заметка"""
+        created = parse_timestamp(row[2])
+        return Note(
+            row[0],
+            row[1],
+            row[2] if created is None else created,
+            json.loads(row[3]) if row[3] else None
+        )
+
+    def migrate(self):
+        """Однократный импорт заметок прежнего хранилища (журнал или notes.json)
+
+        Вызывается перед любым обращением к данным. Возвращает число
+        импортированных заметок (0, если база уже заполнялась).
+        """
+        if self._migrated:
+            return 0
+        with self._lock:
+            if self._migrated:
+                return 0
+            count = 0
+            if os.path.exists(self.legacy_path):
+                count = self._migrate_from(self.legacy_path)
+            # Импорт - не чужие изменения: журнал изменений читается после него
+            self._seq = self._last_seq()
+            self._migrated = True
+        return count
+
+    def _migrate_from(self, path):
+        """Импорт из журнала или JSON файла в одной транзакции (под блокировкой)"""
+        # IMMEDIATE: два окна, открывшие новую базу, не импортируют дважды
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            migrated = self._conn.execute(
+                "SELECT value FROM meta WHERE key = 'migrated_from'"
+            ).fetchone()
+            if migrated:
+                self._conn.rollback()
+                return 0
+            if path.endswith(".jsonl"):
+                journal = JournalStorage(path)
+                notes = journal.load()
+                journal.close()
+            else:
+                notes = read_json_notes(path)
+            # Построчные триггеры в несколько раз медленнее вставки: на время
+            # импорта они снимаются, а индекс FTS строится одним проходом.
+            # Журнал изменений импорту не нужен - его никто еще не читал
+            self._conn.execute("DROP TRIGGER IF EXISTS note_log_ai")
+            self._conn.execute("DROP TRIGGER IF EXISTS notes_ai")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO notes VALUES (?, ?, ?, ?)",
+                (self._to_row(note) for note in notes)
+            )
+            if self.has_fts:
+                self._conn.execute("INSERT INTO notes_fts(notes_fts) VALUES ('rebuild')")
+            self._create_insert_triggers()
+            self._conn.execute(
+                "INSERT INTO meta VALUES ('migrated_from', ?)",
+                (os.path.abspath(path),)
+            )
+            self._conn.commit()
+        except BaseException:
+            self._conn.rollback()
+            raise
+        return len(notes)
+
+    def load(self):
+        """Загрузка всех заметок (для совместимости с остальными хранилищами)"""
+        self.migrate()
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM notes ORDER BY id").fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def count(self):
+        """Количество заметок"""
+        self.migrate()
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM notes").fetchone()[0]
+
+    def max_id(self):
+        """Максимальный ID заметки"""
+        self.migrate()
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM notes").fetchone()[0]
+
+    def page(self, offset, limit, newest_first=True, before_id=None):
+        """Страница заметок (по умолчанию новые первыми)
+
+        С ``before_id`` берутся только заметки с меньшими ID: следующая
+        страница не сдвигается, если заметки добавили или удалили после
+        чтения предыдущей.
+        """
+        self.migrate()
+        order = "DESC" if newest_first else "ASC"
+        where, params = "", (limit, offset)
+        if before_id is not None:
+            where, params = "WHERE id < ? ", (before_id, limit, offset)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM notes {where}ORDER BY id {order} LIMIT ? OFFSET ?",
+                params
+            ).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def find_with_field(self, field):
+        """Заметки с дополнительным полем field (например, напоминания), новые первыми"""
+        self.migrate()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM notes WHERE extra LIKE ? ORDER BY id DESC",
+                (f'%"{field}"%',)
+            ).fetchall()
+        notes = [self._from_row(row) for row in rows]
+        return [note for note in notes if note.extra and field in note.extra]
+
+    def iter_newest(self, batch_size):
+        """Заметки пачками прямо из базы, новые первыми"""
+        self.migrate()
+        last_id = None
+        while True:
+            with self._lock:
+                if last_id is None:
+                    rows = self._conn.execute(
+                        "SELECT * FROM notes ORDER BY id DESC LIMIT ?", (batch_size,)
+                    ).fetchall()
+                else:
+                    rows = self._conn.execute(
+                        "SELECT * FROM notes WHERE id < ? ORDER BY id DESC LIMIT ?",
+                        (last_id, batch_size)
+                    ).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield [self._from_row(row) for row in rows]
+
+    def iter_notes(self, batch_size=1000):
+        """Заметки от старых к новым страницами по ID"""
+        self.migrate()
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT * FROM notes WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            for row in rows:
+                yield self._from_row(row)
+
+    def search(self, query, limit=100):
+        """Полнотекстовый поиск (слова запроса ищутся как префиксы)"""
+        self.migrate()
+        words = query.split()
+        if not words:
+            return []
+        with self._lock:
+            if self.has_fts:
+                match = " ".join('"' + word.replace('"', '""') + '"*' for word in words)
+                rows = self._conn.execute(
+                    "SELECT notes.* FROM notes_fts JOIN notes ON notes.id = notes_fts.rowid "
+                    "WHERE notes_fts MATCH ? ORDER BY notes.id DESC LIMIT ?",
+                    (match, limit)
+                ).fetchall()
+            else:
+                conditions = " AND ".join("text LIKE ?" for _ in words)
+                rows = self._conn.execute(
+                    f"SELECT * FROM notes WHERE {conditions} ORDER BY id DESC LIMIT ?",
+                    [f"%{word}%" for word in words] + [limit]
+                ).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def _last_seq(self):
+        """Номер последней записи журнала изменений"""
+        return self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM note_log").fetchone()[0]
+
+    def _read_log(self):
+        """Изменения после последнего прочитанного номера (под блокировкой)"""
+        first, last = self._conn.execute(
+            "SELECT MIN(seq), MAX(seq) FROM note_log WHERE seq > ?", (self._seq,)
+        ).fetchone()
+        if last is None:
+            return []
+        if first > self._seq + 1:
+            # Нужные записи уже удалены из журнала изменений
+            self._seq = last
+            rows = self._conn.execute("SELECT * FROM notes ORDER BY id").fetchall()
+            return [("reset", [self._from_row(row) for row in rows])]
+        # Для каждой заметки важна только последняя операция
+        latest = {}
+        for op, note_id in self._conn.execute(
+            "SELECT op, id FROM note_log WHERE seq > ? AND seq <= ? ORDER BY seq",
+            (self._seq, last)
+        ):
+            latest.pop(note_id, None)
+            latest[note_id] = op
+        self._seq = last
+        ops = []
+        for note_id, op in latest.items():
+            row = self._conn.execute("SELECT * FROM notes WHERE id = ?", (note_id,)).fetchone()
+            if row is None:
+                ops.append(("delete", note_id))
+            else:
+                ops.append(("edit" if op == "edit" else "add", self._from_row(row)))
+        return ops
+
+    def apply(self, ops):
+        """Применение операций в одной транзакции"""
+        self.migrate()
+        with self._lock:
+            # IMMEDIATE: другие экземпляры не пишут, пока мы читаем их изменения
+            self._conn.execute("BEGIN IMMEDIATE")
+            seq = self._seq
+            try:
+                foreign = self._read_log()
+                ops, renumbered = renumber_conflicts(
+                    ops,
+                    lambda note: self._conn.execute(
+                        "SELECT 1 FROM notes WHERE id = ?", (note.id,)
+                    ).fetchone() is not None,
+                    self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM notes").fetchone()[0]
+                )
+                for op, payload in ops:
+                    if op == "add":
+                        self._conn.execute(
+                            "INSERT OR REPLACE INTO notes VALUES (?, ?, ?, ?)",
+                            self._to_row(payload)
+                        )
+                    elif op == "edit":
+                        row = self._to_row(payload)
+                        self._conn.execute(
+                            "UPDATE notes SET text = ?, timestamp = ?, extra = ? WHERE id = ?",
+                            row[1:] + row[:1]
+                        )
+                    elif op == "delete":
+                        self._conn.execute("DELETE FROM notes WHERE id = ?", (payload,))
+                    else:
+                        raise ValueError(f"Неизвестная операция: {op}")
+                self._seq = self._last_seq()
+                self._conn.execute(
+                    "DELETE FROM note_log WHERE seq <= ?", (self._seq - self.LOG_KEEP,)
+                )
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                self._seq = seq
+                raise
+            self._pending.extend(foreign)
+            # Переименования - раньше уже прочитанных чужих операций
+            self._pending[:0] = [("renumber", item) for item in renumbered]
+
+    def save_all(self, notes):
+        """Замена всех заметок"""
+        self.migrate()
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM notes")
+            self._conn.executemany(
+                "INSERT INTO notes VALUES (?, ?, ?, ?)",
+                (self._to_row(note) for note in notes)
+            )
+            self._seq = self._last_seq()
+
+    def read_changes(self):
+        """Изменения других экземпляров с прошлого чтения"""
+        self.migrate()
+        with self._lock:
+            self._pending.extend(self._read_log())
+            changes, self._pending = self._pending, []
+        return changes
+
+    def watch_paths(self):
+        """Файлы, изменения которых нужно отслеживать (база и ее WAL)"""
+        return [self.path, self.path + "-wal"]
+
+    def close(self):
+        """Закрытие соединения с базой"""
+        with self._lock:
+            self._conn.close()
+
+
+def legacy_notes_path(notes_file):
+    """Откуда база импортирует заметки: журнал по умолчанию, если он есть, иначе notes.json"""
+    journal_path = os.path.splitext(notes_file)[0] + ".jsonl"
+    return journal_path if os.path.exists(journal_path) else notes_file
+
+
+ENGINES = {
+    "json": lambda notes_file: JsonStorage(notes_file),
+    "journal": lambda notes_file: JournalStorage(
+        os.path.splitext(notes_file)[0] + ".jsonl",
+        legacy_path=notes_file
+    ),
+    "sqlite": lambda notes_file: SqliteStorage(
+        os.path.splitext(notes_file)[0] + ".db",
+        legacy_path=legacy_notes_path(notes_file)
+    ),
+}
+
+
+def open_storage(notes_file, engine="journal"):
+    """Создание хранилища заметок по имени движка"""
+    try:
+        return ENGINES[engine](notes_file)
+    except KeyError:
+        raise ValueError(f"Неизвестное хранилище: {engine}") from None
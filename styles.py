@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+import customtkinter as ctk
+
+# Цветовые стили элементов (общие для обоих виджетов)
+STYLES = {
+    "note_card": {"fg_color": ("gray90", "gray20")},
+    "note_id": {"text_color": ("blue", "lightblue")},
+    "note_date": {"text_color": ("gray50", "gray60")},
+    "delete_icon": {"fg_color": "transparent", "hover_color": ("red", "darkred")},
+    "delete_button": {"fg_color": "red", "hover_color": "darkred"},
+    "more_button": {"fg_color": "transparent", "hover_color": ("gray80", "gray30"), "text_color": ("gray30", "gray70")},
+    "toast": {"fg_color": ("green", "darkgreen"), "text_color": "white", "corner_radius": 8},
+    "toast_plain": {"fg_color": "green", "text_color": "white", "corner_radius": 8},
+}
+
+
+class StyleRegistry:
+    """Общий на весь процесс реестр шрифтов и цветовых стилей
+
+    Шрифт с одинаковыми (размер, насыщенность, роль) создается один раз и
+    используется всеми строками, поэтому число объектов шрифтов Tk не растет
+    вместе с числом заметок. Изменение шрифта роли (например, ``note_text``)
+    сразу применяется ко всем элементам, которые его используют.
+    """
+
+    def __init__(self, styles=STYLES):
+        self._styles = styles
+        self._fonts = {}
+        self.font_requests = 0
+
+    def font(self, size, weight="normal", role=None):
+        """Общий объект шрифта"""
+        self.font_requests += 1
+        key = (size, weight, role)
+        font = self._fonts.get(key)
+        if font is None:
+            font = self._fonts[key] = ctk.CTkFont(size=size, weight=weight)
+        return font
+
+    def style(self, role):
+        """Общий набор цветов для элемента"""
+        return self._styles[role]
+
+    def stats(self):
+        """Счетчики: сколько шрифтов создано и сколько раз они запрошены"""
+        return {
+            "live_fonts": len(self._fonts),
+            "font_requests": self.font_requests,
+            "reused": self.font_requests - len(self._fonts),
+        }
+
+
+# Реестр, общий для всех окон процесса
+registry = StyleRegistry()
@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+"""Синхронизация заметок между компьютерами.
+
+Протокол (эталонный сервер - ``sync_server.py``):
+
+    POST /changes                  {"device": ..., "changes": [...]}
+    GET  /changes?since=N&limit=M  {"changes": [...], "seq": ..., "more": ...}
+
+Тела запросов и ответов - JSON, сжатый zlib (``Content-Encoding: deflate``).
+Изменение - ``{"gid", "version", "note"}``: глобальный ID заметки
+``"устройство:локальный ID"``, версия ``[часы, устройство]`` и заметка без
+ID (None - заметка удалена). Часы - счетчик Лэмпорта: он больше всех
+версий, которые устройство уже видело, поэтому правка, сделанная после
+получения чужой, всегда ее перекрывает. Конфликт одновременных правок
+решается одинаково везде: побеждает большая версия, при равных часах -
+большее имя устройства.
+
+Сервер нумерует принятые изменения по порядку, поэтому клиент забирает
+только изменения после последнего полученного номера, а отправляет только
+свои изменения с прошлой отправки - пачками по ``batch_size``. Сеть
+работает в фоновом потоке; чужие изменения по одному попадают в очередь
+``incoming``, а применяет их главный поток.
+"""
+import json
+import os
+import queue
+import threading
+import urllib.request
+import uuid
+import zlib
+from itertools import islice
+
+from file_watch import FileLock
+from note_record import Note
+
+
+def encode_body(payload):
+    """JSON, сжатый zlib"""
+    return zlib.compress(json.dumps(payload, ensure_ascii=False).encode('utf-8'))
+
+
+def decode_body(data):
+    """Разбор тела запроса или ответа"""
+    try:
+        return json.loads(zlib.decompress(data).decode('utf-8'))
+    except zlib.error as e:
+        raise ValueError(f"Тело не сжато zlib: {e}") from None
+
+
+def is_newer(version, other):
+    """Перекрывает ли версия другую (часы, затем имя устройства)"""
+    return tuple(version) > tuple(other)
+
+
+def note_payload(note):
+    """Заметка для передачи (без локального ID)"""
+    data = note.to_dict()
+    del data["id"]
+    return data
+
+
+class SyncClient:
+    """Клиент синхронизации с фоновым потоком
+
+    Состояние (имя устройства, номер последнего примененного изменения,
+    часы, соответствие чужих заметок локальным ID и еще не отправленные
+    изменения) хранится в ``state_path``. Синхронизирует только одно окно:
+    пока оно работает, файл состояния заблокирован. При первом запуске
+    отправляются все заметки из ``local_notes()``.
+    """
+
+    def __init__(self, url, state_path, local_notes=None, interval=30.0,
+                 debounce=2.0, batch_size=500, timeout=10.0):
+        self.url = url.rstrip("/")
+        self.state_path = state_path
+        self.local_notes = local_notes
+        self.interval = interval
+        self.debounce = debounce
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.last_error = None
+
+        # Чужие изменения для главного потока; после каждой страницы -
+        # номер, до которого ее можно считать примененной
+        self.incoming = queue.Queue()
+
+        # Статистика обмена
+        self.pushed = 0
+        self.pulled = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+        self.device = None
+        self._seq = 0
+        self._applied_seq = 0
+        self._clock = 0
+        self._seeded = False
+        # Локальные ID чужих заметок и обратно
+        self._gids = {}
+        self._local_ids = {}
+        # Неотправленные изменения по глобальному ID (только последнее)
+        self._pending = {}
+        self._dirty = False
+        self._failing = False
+
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._file_lock = FileLock(state_path)
+        self._running = False
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="notes-sync", daemon=True)
+
+    def start(self, background=True):
+        """Загрузка состояния и запуск потока; False, если синхронизирует другое окно
+
+        Без ``background`` поток не запускается, обмен - вызовом sync_once().
+        """
+        if not self._file_lock.acquire(blocking=False):
+            return False
+        try:
+            self._load_state()
+        except BaseException:
+            self._file_lock.release()
+            raise
+        self._running = True
+        if background:
+            self._thread.start()
+        return True
+
+    def close(self, timeout=None):
+        """Остановка потока и сохранение неотправленных изменений"""
+        if not self._running:
+            return
+        self._running = False
+        self._stop.set()
+        self._wake.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+        self._save_state()
+        self._file_lock.release()
+
+    def _load_state(self):
+        """Чтение состояния (новое устройство, если файла еще нет)"""
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            self.device = uuid.uuid4().hex[:12]
+            self._dirty = True
+            return
+        self.device = state["device"]
+        self._seq = self._applied_seq = state["seq"]
+        self._clock = state["clock"]
+        self._seeded = state["seeded"]
+        self._gids = {note_id: gid for note_id, gid in state["gids"]}
+        self._local_ids = {gid: note_id for note_id, gid in state["gids"]}
+        self._pending = {change["gid"]: change for change in state["pending"]}
+
+    def _save_state(self):
+        """Атомарная запись состояния, если оно изменилось"""
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                self._dirty = False
+                state = {
+                    "device": self.device,
+                    "seq": self._applied_seq,
+                    "clock": self._clock,
+                    "seeded": self._seeded,
+                    "gids": list(self._gids.items()),
+                    "pending": list(self._pending.values()),
+                }
+            tmp_path = self.state_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.state_path)
+
+    def _gid(self, note_id):
+        """Глобальный ID локальной заметки"""
+        return self._gids.get(note_id) or f"{self.device}:{note_id}"
+
+    def _local_id(self, gid):
+        """Локальный ID по глобальному (None, если заметки здесь не было)"""
+        note_id = self._local_ids.get(gid)
+        if note_id is None:
+            device, _, local = gid.rpartition(":")
+            if device == self.device and local.isdigit():
+                note_id = int(local)
+        return note_id
+
+    def _change(self, gid, note):
+        """Изменение со следующей версией (вызывается под self._lock)"""
+        self._clock += 1
+        return {
+            "gid": gid,
+            "version": [self._clock, self.device],
+            "note": None if note is None else note_payload(note),
+        }
+
+    def track(self, *ops):
+        """Учет своих изменений - те же операции, что и для записи в хранилище"""
+        with self._lock:
+            for op, payload in ops:
+                if op == "delete":
+                    gid = self._gid(payload)
+                    self._pending[gid] = self._change(gid, None)
+                else:
+                    gid = self._gid(payload.id)
+                    self._pending[gid] = self._change(gid, payload)
+            self._dirty = True
+        self._wake.set()
+
+    def renumber(self, old_id, new_id):
+        """Заметка получила другой ID (его занял другой экземпляр)"""
+        with self._lock:
+            gid = self._gids.pop(old_id, None)
+            if gid is not None:
+                self._gids[new_id] = gid
+                self._local_ids[gid] = new_id
+            else:
+                old_gid, new_gid = self._gid(old_id), self._gid(new_id)
+                change = self._pending.pop(old_gid, None)
+                if change is not None:
+                    self._pending[new_gid] = dict(change, gid=new_gid)
+            self._dirty = True
+
+    def resolve(self, change, new_id):
+        """Локальный ID и заметка для чужого изменения (в главном потоке)
+
+        Для удаления заметка - None. ``(None, None)``, если изменение уже
+        перекрыто своим или удалена неизвестная здесь заметка. Новые
+        заметки получают ID от ``new_id()``.
+        """
+        gid = change["gid"]
+        with self._lock:
+            pending = self._pending.get(gid)
+            if pending is not None and not is_newer(change["version"], pending["version"]):
+                return None, None
+            note_id = self._local_id(gid)
+            if change["note"] is None:
+                if note_id is not None and self._gids.pop(note_id, None) is not None:
+                    del self._local_ids[gid]
+                    self._dirty = True
+                return note_id, None
+            if note_id is None:
+                note_id = new_id()
+                self._gids[note_id] = gid
+                self._local_ids[gid] = note_id
+                self._dirty = True
+        return note_id, Note.from_dict(dict(change["note"], id=note_id))
+
+    def applied(self, seq):
+        """Главный поток применил все изменения до номера seq"""
+        with self._lock:
+            if seq > self._applied_seq:
+                self._applied_seq = seq
+                self._dirty = True
+
+    def _run(self):
+        """Основной цикл: обмен раз в interval или вскоре после своих изменений"""
+        while not self._stop.is_set():
+            try:
+                self.sync_once()
+            except Exception as e:
+                # Об ошибке сообщаем один раз, а не на каждой попытке
+                if not self._failing:
+                    self.last_error = e
+                self._failing = True
+            else:
+                self._failing = False
+            try:
+                self._save_state()
+            except OSError as e:
+                self.last_error = e
+            if self._wake.wait(self.interval) and not self._stop.is_set():
+                # Серию быстрых правок отправляем одной пачкой
+                self._stop.wait(self.debounce)
+            self._wake.clear()
+
+    def sync_once(self):
+        """Один обмен: первичная отправка, получение чужих и отправка своих"""
+        if not self._seeded:
+            self._seed()
+        self._pull()
+        self._push()
+
+    def _seed(self):
+        """Все сохраненные заметки в очередь отправки (первая синхронизация)
+
+        Заметки, измененные после запуска, уже стоят в очереди - их более
+        новые версии не перезаписываются.
+        """
+        notes = self.local_notes() if self.local_notes is not None else ()
+        seed = {}
+        with self._lock:
+            self._clock += 1
+            version = [self._clock, self.device]
+        for note in notes:
+            with self._lock:
+                gid = self._gid(note.id)
+            seed.setdefault(gid, {"gid": gid, "version": version, "note": note_payload(note)})
+        with self._lock:
+            for gid, change in seed.items():
+                self._pending.setdefault(gid, change)
+            self._seeded = True
+            self._dirty = True
+
+    def _request(self, method, path, payload=None):
+        """HTTP-запрос со сжатым JSON"""
+        data = None if payload is None else encode_body(payload)
+        request = urllib.request.Request(
+            self.url + path, data=data, method=method,
+            headers={"Content-Type": "application/json", "Content-Encoding": "deflate"}
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            body = response.read()
+        self.bytes_sent += len(data or b"")
+        self.bytes_received += len(body)
+        return decode_body(body)
+
+    def _pull(self):
+        """Получение чужих изменений страницами после последнего номера"""
+        while not self._stop.is_set():
+            since = self._seq
+            response = self._request("GET", f"/changes?since={since}&limit={self.batch_size}")
+            if response["seq"] < since:
+                # Сервер начал историю заново: отправляем ему все свое
+                with self._lock:
+                    self._seq = self._applied_seq = 0
+                    self._seeded = False
+                    self._dirty = True
+                return
+            count = 0
+            with self._lock:
+                for change in response["changes"]:
+                    self._clock = max(self._clock, change["version"][0])
+                    if change["version"][1] == self.device:
+                        # Свое изменение вернулось с сервера
+                        continue
+                    pending = self._pending.get(change["gid"])
+                    if pending is not None:
+                        if is_newer(pending["version"], change["version"]):
+                            continue
+                        del self._pending[change["gid"]]
+                    self.incoming.put(change)
+                    count += 1
+                self._seq = response["seq"]
+                self._dirty = True
+            self.incoming.put(response["seq"])
+            self.pulled += count
+            if not response["more"]:
+                return
+
+    def _push(self):
+        """Отправка своих изменений пачками"""
+        while not self._stop.is_set():
+            with self._lock:
+                batch = list(islice(self._pending.values(), self.batch_size))
+            if not batch:
+                return
+            response = self._request("POST", "/changes", {"device": self.device, "changes": batch})
+            with self._lock:
+                for change in batch:
+                    # Заметку могли снова изменить, пока шел запрос
+                    if self._pending.get(change["gid"]) is change:
+                        del self._pending[change["gid"]]
+                if response["since"] == self._seq:
+                    # Между получением и отправкой никто ничего не прислал:
+                    # свои же изменения с сервера забирать незачем
+                    self._seq = response["seq"]
+                    self.incoming.put(response["seq"])
+                self._dirty = True
+            self.pushed += len(batch)
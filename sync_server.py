@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""Эталонный сервер синхронизации заметок (только стандартная библиотека).
+
+Запуск:
+    python sync_server.py --port 8765 --data notes_sync_server.jsonl
+    python beautiful_notes_widget.py --sync=http://127.0.0.1:8765
+
+Сервер хранит последнюю версию каждой заметки и нумерует принятые
+изменения по порядку (протокол описан в ``sync.py``). Из двух версий одной
+заметки остается большая, поэтому порядок, в котором клиенты присылают
+изменения, на результат не влияет. Принятые изменения дописываются в файл
+``--data`` и проигрываются при запуске. Авторизации и шифрования нет:
+сервер предназначен для тестов и доверенной локальной сети.
+"""
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from sync import decode_body, encode_body, is_newer
+
+# Наибольший размер страницы в ответе на GET /changes
+MAX_LIMIT = 5000
+
+
+def check_change(change):
+    """Проверка формата изменения от клиента"""
+    try:
+        clock, device = change["version"]
+        valid = (
+            isinstance(change["gid"], str) and isinstance(clock, int)
+            and isinstance(device, str)
+            and (change["note"] is None or isinstance(change["note"].get("text"), str))
+        )
+    except (KeyError, TypeError, ValueError, AttributeError):
+        valid = False
+    if not valid:
+        raise ValueError(f"Неверное изменение: {change!r:.200}")
+
+
+class SyncStore:
+    """Последние версии заметок и журнал номеров изменений
+
+    Номер изменения - его место в журнале, поэтому изменения после номера N
+    - это просто конец журнала (записи, перекрытые более новой версией той
+    же заметки, пропускаются).
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        # Глобальный ID -> последнее изменение (с номером "seq")
+        self._changes = {}
+        # Глобальные ID в порядке номеров: self._log[seq - 1]
+        self._log = []
+        self._file = None
+        if path is not None:
+            self._replay()
+            self._file = open(path, 'a', encoding='utf-8')
+
+    @property
+    def seq(self):
+        """Номер последнего принятого изменения"""
+        return len(self._log)
+
+    def _replay(self):
+        """Восстановление из файла принятых изменений"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        self._accept(json.loads(line))
+        except FileNotFoundError:
+            pass
+
+    def _accept(self, change):
+        """Применение изменения, если оно новее известного (под self._lock)"""
+        current = self._changes.get(change["gid"])
+        if current is not None and not is_newer(change["version"], current["version"]):
+            return False
+        self._log.append(change["gid"])
+        self._changes[change["gid"]] = dict(change, seq=len(self._log))
+        return True
+
+    def push(self, changes):
+        """Прием пачки изменений; перекрытые более новыми версиями отклоняются"""
+        for change in changes:
+            check_change(change)
+        with self._lock:
+            since = self.seq
+            accepted = []
+            rejected = []
+            for change in changes:
+                change = {"gid": change["gid"], "version": change["version"], "note": change["note"]}
+                if self._accept(change):
+                    accepted.append(change)
+                else:
+                    rejected.append(change["gid"])
+            if self._file is not None and accepted:
+                self._file.write("".join(
+                    json.dumps(change, ensure_ascii=False) + "\n" for change in accepted
+                ))
+                self._file.flush()
+            # Номера since+1..seq получили только изменения этой пачки
+            return {"accepted": len(accepted), "rejected": rejected, "since": since, "seq": self.seq}
+
+    def changes_since(self, since, limit):
+        """Актуальные изменения с номерами больше since (не больше limit)"""
+        with self._lock:
+            if since >= self.seq:
+                # since > seq: сервер начал историю заново, клиент это увидит
+                return {"changes": [], "seq": self.seq, "more": False}
+            changes = []
+            seq = since
+            for seq in range(since + 1, self.seq + 1):
+                change = self._changes[self._log[seq - 1]]
+                if change["seq"] == seq:
+                    changes.append(change)
+                    if len(changes) >= limit:
+                        break
+            return {"changes": changes, "seq": seq, "more": seq < self.seq}
+
+    def close(self):
+        """Закрытие файла изменений"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class SyncHandler(BaseHTTPRequestHandler):
+    """Обработчик запросов GET и POST /changes"""
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path != "/changes":
+            self.send_error(404)
+            return
+        query = parse_qs(url.query)
+        try:
+            since = int(query.get("since", ["0"])[0])
+            limit = min(int(query.get("limit", ["500"])[0]), MAX_LIMIT)
+        except ValueError:
+            self.send_error(400, "since и limit - целые числа")
+            return
+        self._reply(self.server.store.changes_since(max(since, 0), max(limit, 1)))
+
+    def do_POST(self):
+        if urlsplit(self.path).path != "/changes":
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = decode_body(self.rfile.read(length))
+            result = self.server.store.push(body["changes"])
+        except (ValueError, KeyError, TypeError) as e:
+            self.send_error(400, str(e))
+            return
+        self._reply(result)
+
+    def _reply(self, payload):
+        """Ответ сжатым JSON"""
+        data = encode_body(payload)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Encoding", "deflate")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def make_server(host="127.0.0.1", port=8765, data_path=None, verbose=False):
+    """HTTP-сервер синхронизации (запуск - serve_forever())"""
+    server = ThreadingHTTPServer((host, port), SyncHandler)
+    server.store = SyncStore(data_path)
+    server.verbose = verbose
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сервер синхронизации заметок")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--data", help="файл принятых изменений (без него - только в памяти)")
+    parser.add_argument("--verbose", action="store_true", help="печатать каждый запрос")
+    args = parser.parse_args(argv)
+    server = make_server(args.host, args.port, args.data, args.verbose)
+    print(f"Сервер синхронизации: http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.store.close()
+
+
+if __name__ == "__main__":
+    main()
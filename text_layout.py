@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""Превью длинных заметок и кэш их разметки.
+
+В строку списка попадает не весь текст заметки, а превью из не более чем
+``line_budget`` строк после переноса: Tk не приходится раскладывать
+мегабайты текста при каждой перерисовке. Превью и число строк считаются
+один раз и кэшируются по (ID, хэш текста) - при изменении текста запись
+просто перестает совпадать.
+
+Развернутое превью тоже ограничено (``expanded_budget`` строк); если
+текст не влез и в него, виджет показывает его целиком в окне просмотра.
+"""
+from collections import OrderedDict
+
+# Знак обрезанного текста
+ELLIPSIS = "…"
+
+
+class Preview:
+    """Текст для показа, число строк в нем и признак обрезки"""
+
+    __slots__ = ("text", "lines", "truncated")
+
+    def __init__(self, text, lines, truncated):
+        self.text = text
+        self.lines = lines
+        self.truncated = truncated
+
+
+def measure_preview(text, chars_per_line, line_budget):
+    """Превью не длиннее line_budget строк
+
+    Текст просматривается абзацами только до исчерпания бюджета, поэтому
+    время не зависит от полной длины заметки.
+    """
+    lines = 0
+    start = 0
+    length = len(text)
+    while True:
+        end = text.find("\n", start)
+        if end < 0:
+            end = length
+        paragraph_lines = max(1, -(-(end - start) // chars_per_line))
+        if lines + paragraph_lines > line_budget:
+            cut = start + (line_budget - lines) * chars_per_line
+            return Preview(text[:cut].rstrip() + ELLIPSIS, line_budget, True)
+        lines += paragraph_lines
+        if end == length:
+            return Preview(text, lines, False)
+        start = end + 1
+
+
+class TextLayoutCache:
+    """Кэш превью заметок по (ID, хэш текста)
+
+    Короткие заметки измеряются сразу (это дешевле поиска в кэше и не
+    тратит память), длинные - один раз, дальше берутся из кэша. Кэш
+    ограничен ``max_entries`` записями, давно не нужные вытесняются.
+    """
+
+    def __init__(self, chars_per_line, line_budget=6, expanded_budget=200,
+                 short_length=500, max_entries=5000):
+        self.chars_per_line = chars_per_line
+        self.line_budget = line_budget
+        self.expanded_budget = expanded_budget
+        self.short_length = short_length
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def preview(self, note, expanded=False):
+        """Превью заметки (развернутое - с большим бюджетом строк)"""
+        budget = self.expanded_budget if expanded else self.line_budget
+        text = note.text
+        if len(text) <= self.short_length:
+            return measure_preview(text, self.chars_per_line, budget)
+        key = (note.id, hash(text), budget)
+        preview = self._cache.get(key)
+        if preview is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return preview
+        self.misses += 1
+        preview = self._cache[key] = measure_preview(text, self.chars_per_line, budget)
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return preview
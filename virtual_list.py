@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+import tkinter as tk
+from bisect import bisect_right
+from collections.abc import Sequence
+from itertools import accumulate
+
+import customtkinter as ctk
+
+
+class NoteRow:
+    """Переиспользуемая строка списка заметок"""
+
+    def __init__(self, frame, id_label, date_label, text_label, delete_btn, more_btn=None,
+                 full_btn=None):
+        self.frame = frame
+        self.id_label = id_label
+        self.date_label = date_label
+        self.text_label = text_label
+        self.delete_btn = delete_btn
+        # Кнопка "показать еще" для длинных заметок
+        self.more_btn = more_btn
+        # Кнопка "весь текст" для заметок длиннее развернутого превью
+        self.full_btn = full_btn
+        # ID заметки, которая сейчас отображается в строке
+        self.note_id = None
+
+
+class _Slot:
+    """Строка из пула вместе с окном на холсте"""
+
+    def __init__(self, row, window):
+        self.row = row
+        self.window = window
+
+
+class VirtualNotesList(ctk.CTkFrame):
+    """Виртуализированный список: виджеты создаются только для видимых строк
+
+    Высоты строк измеряются только для просмотренного начала списка: замена
+    элементов (например, результатом фильтра на десятки тысяч заметок) не
+    вызывает row_height для каждого. Остальные строки считаются средней
+    высоты измеренных, пока до них не прокрутят.
+    """
+
+    def __init__(self, master, create_row, bind_row, row_height,
+                 key=lambda item: item.id, spacing=6, overscan=2,
+                 on_end_reached=None, **kwargs):
+        super().__init__(master, **kwargs)
+
+        # Функции построения и заполнения строки
+        self.create_row = create_row
+        self.bind_row = bind_row
+        self.row_height = row_height
+        self.key = key
+        self.spacing = spacing
+        self.overscan = overscan
+        # Вызывается, когда видна последняя строка (подгрузка следующей порции)
+        self.on_end_reached = on_end_reached
+        self._end_job = None
+
+        # Данные и разметка: высоты и смещения измеренного начала списка
+        self.items = []
+        self._heights = []
+        self._offsets = [0]
+        self._offsets_dirty = False
+        self._top = 0
+        # Ключ -> позиция элемента; номер в списке - позиция минус _base
+        self._positions = None
+        self._base = 0
+
+        # Пул строк: видимые (ключ -> слот) и свободные
+        self._visible = {}
+        self._free = []
+
+        # Холст, на котором размещаются строки
+        self.canvas = tk.Canvas(self, highlightthickness=0, bd=0)
+        self.canvas.configure(bg=self._apply_appearance_mode(self._fg_color))
+        self.scrollbar = ctk.CTkScrollbar(self, command=self.yview)
+        self.scrollbar.pack(side="right", fill="y", padx=(0, 3), pady=6)
+        self.canvas.pack(side="left", fill="both", expand=True, padx=(6, 0), pady=6)
+
+        # Перерисовка при изменении размеров и прокрутка колесом мыши
+        self.canvas.bind("<Configure>", lambda event: self.render())
+        self.bind_all("<MouseWheel>", self._on_mousewheel, add="+")
+        self.bind_all("<Button-4>", self._on_mousewheel, add="+")
+        self.bind_all("<Button-5>", self._on_mousewheel, add="+")
+
+    def _set_appearance_mode(self, mode_string):
+        """Синхронизация цвета холста с темой"""
+        super()._set_appearance_mode(mode_string)
+        self.canvas.configure(bg=self._apply_appearance_mode(self._fg_color))
+
+    def set_items(self, items):
+        """Замена всех элементов списка (высоты измеряются при показе)
+
+        Последовательность, которая не список (например, результаты поиска),
+        не копируется: строки читаются из нее при показе, а копия делается
+        только при первом изменении списка.
+        """
+        if isinstance(items, Sequence) and not isinstance(items, list):
+            self.items = items
+        else:
+            self.items = list(items)
+        self._heights = []
+        self._offsets = [0]
+        self._offsets_dirty = False
+        self._positions = None
+        self.render()
+
+    def _editable_items(self):
+        """Элементы как изменяемый список (последовательность копируется один раз)"""
+        if not isinstance(self.items, list):
+            self.items = list(self.items)
+        return self.items
+
+    def _get_positions(self):
+        """Ключ -> позиция элемента (строится при первом поиске по ключу)"""
+        if self._positions is None:
+            self._base = 0
+            self._positions = {self.key(item): index for index, item in enumerate(self.items)}
+        return self._positions
+
+    def index_of(self, item_key):
+        """Позиция элемента по ключу (-1, если его нет)"""
+        position = self._get_positions().get(item_key)
+        return -1 if position is None else position - self._base
+
+    def _shift_positions(self, items, delta):
+        """Сдвиг позиций части элементов при вставке или удалении"""
+        positions = self._positions
+        key = self.key
+        for item in items:
+            positions[key(item)] += delta
+
+    def insert(self, index, item):
+        """Вставка одного элемента: заполняется только его строка"""
+        items = self._editable_items()
+        if self._positions is not None:
+            # Позиция - это номер плюс общий сдвиг _base: сдвигается только
+            # меньшая часть списка, а вставка в начало или конец - O(1)
+            if index < len(items) - index:
+                self._shift_positions(items[:index], -1)
+                self._base -= 1
+            else:
+                self._shift_positions(items[index:], 1)
+            self._positions[self.key(item)] = self._base + index
+        items.insert(index, item)
+        if index < len(self._heights):
+            self._heights.insert(index, self.row_height(item) + self.spacing)
+            self._offsets_dirty = True
+        self.render()
+
+    def extend(self, new_items):
+        """Добавление элементов в конец списка (высоты измеряются при показе)"""
+        items = self._editable_items()
+        if self._positions is not None:
+            start = self._base + len(items)
+            for offset, item in enumerate(new_items, start):
+                self._positions[self.key(item)] = offset
+        items.extend(new_items)
+        self.render()
+
+    def remove(self, item_key):
+        """Удаление одного элемента по ключу"""
+        index = self.index_of(item_key)
+        if index < 0:
+            return False
+        items = self._editable_items()
+        del self._positions[item_key]
+        if index < len(items) - 1 - index:
+            self._shift_positions(items[:index], 1)
+            self._base += 1
+        else:
+            self._shift_positions(items[index + 1:], -1)
+        del items[index]
+        if index < len(self._heights):
+            del self._heights[index]
+            self._offsets_dirty = True
+        slot = self._visible.pop(item_key, None)
+        if slot is not None:
+            self._release_slot(slot)
+        self.render()
+        return True
+
+    def update(self, item):
+        """Обновление элемента на месте"""
+        item_key = self.key(item)
+        index = self.index_of(item_key)
+        if index < 0:
+            return False
+        self._editable_items()[index] = item
+        if index < len(self._heights):
+            height = self.row_height(item) + self.spacing
+            if height != self._heights[index]:
+                self._heights[index] = height
+                self._offsets_dirty = True
+        slot = self._visible.get(item_key)
+        if slot is not None:
+            self.bind_row(slot.row, item)
+        self.render()
+        return True
+
+    def _layout(self):
+        """Пересчет смещений измеренных строк, если данные изменились"""
+        if self._offsets_dirty:
+            self._offsets = [0]
+            self._offsets.extend(accumulate(self._heights))
+            self._offsets_dirty = False
+        return self._offsets
+
+    def _measure(self, end):
+        """Измерение высот строк до end (дописываются к измеренному началу)"""
+        start = len(self._heights)
+        if end <= start:
+            return
+        heights = [self.row_height(item) + self.spacing for item in self.items[start:end]]
+        self._heights.extend(heights)
+        if not self._offsets_dirty:
+            # Смещения дописываются в конец без полного пересчета
+            total = self._offsets[-1]
+            self._offsets.extend(total + offset for offset in accumulate(heights))
+
+    def _estimate(self):
+        """Высота еще не измеренной строки: средняя из измеренных"""
+        if not self._heights and self.items:
+            self._measure(1)
+        measured = len(self._heights)
+        return max(1, self._layout()[-1] // measured) if measured else 1
+
+    def _index_at(self, y):
+        """Номер строки, в которую попадает координата y"""
+        offsets = self._layout()
+        if y < offsets[-1]:
+            return bisect_right(offsets, y) - 1
+        return len(self._heights) + int((y - offsets[-1]) // self._estimate())
+
+    def total_height(self):
+        """Полная высота содержимого в пикселях (с оценкой неизмеренных строк)"""
+        unmeasured = len(self.items) - len(self._heights)
+        total = self._layout()[-1]
+        return total + unmeasured * self._estimate() if unmeasured else total
+
+    def _view_height(self):
+        """Высота видимой области"""
+        return max(1, self.canvas.winfo_height())
+
+    def _clamp_top(self):
+        """Ограничение позиции прокрутки"""
+        max_top = max(0, self.total_height() - self._view_height())
+        self._top = min(max(0, self._top), max_top)
+
+    def _acquire_slot(self):
+        """Получение строки из пула или создание новой"""
+        if self._free:
+            return self._free.pop()
+        row = self.create_row(self.canvas)
+        window = self.canvas.create_window(0, 0, window=row.frame, anchor="nw", state="hidden")
+        return _Slot(row, window)
+
+    def _release_slot(self, slot):
+        """Возврат строки в пул"""
+        self.canvas.itemconfigure(slot.window, state="hidden")
+        self._free.append(slot)
+
+    def render(self):
+        """Размещение видимых строк и переиспользование остальных"""
+        self._clamp_top()
+        view_height = self._view_height()
+        width = max(1, self.canvas.winfo_width() - 10)
+
+        # Диапазон видимых строк с небольшим запасом. Строки до конца
+        # диапазона измеряются; их смещения уточняются, поэтому диапазон
+        # пересчитывается, пока все строки в нем не измерены
+        while True:
+            last = min(len(self.items), self._index_at(self._top + view_height) + 1 + self.overscan)
+            if last <= len(self._heights):
+                break
+            self._measure(last)
+            self._clamp_top()
+        offsets = self._layout()
+        first = max(0, self._index_at(self._top) - self.overscan)
+        wanted = {}
+        for index in range(first, last):
+            wanted[self.key(self.items[index])] = index
+
+        # Освобождаем строки, ушедшие из видимой области
+        for item_key in [k for k in self._visible if k not in wanted]:
+            self._release_slot(self._visible.pop(item_key))
+
+        # Заполняем и размещаем видимые строки
+        for item_key, index in wanted.items():
+            slot = self._visible.get(item_key)
+            if slot is None:
+                slot = self._acquire_slot()
+                self.bind_row(slot.row, self.items[index])
+                self._visible[item_key] = slot
+            y = offsets[index] - self._top + self.spacing // 2
+            self.canvas.coords(slot.window, 5, y)
+            self.canvas.itemconfigure(
+                slot.window,
+                width=width,
+                height=self._heights[index] - self.spacing,
+                state="normal"
+            )
+
+        self._update_scrollbar()
+
+        if self.on_end_reached is not None and last >= len(self.items) and self._end_job is None:
+            self._end_job = self.after_idle(self._end_reached)
+
+    def _end_reached(self):
+        """Список прокручен до конца"""
+        self._end_job = None
+        self.on_end_reached()
+
+    def _update_scrollbar(self):
+        """Обновление положения полосы прокрутки"""
+        total = self.total_height()
+        if total <= 0:
+            self.scrollbar.set(0.0, 1.0)
+            return
+        view_height = self._view_height()
+        self.scrollbar.set(self._top / total, min(1.0, (self._top + view_height) / total))
+
+    def yview(self, *args):
+        """Обработка команд полосы прокрутки"""
+        if not args:
+            return
+        if args[0] == "moveto":
+            self._top = int(float(args[1]) * self.total_height())
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            if args[2] == "pages":
+                self._top += amount * self._view_height()
+            else:
+                self._top += amount * 20
+        self.render()
+
+    def _on_mousewheel(self, event):
+        """Прокрутка колесом мыши над списком"""
+        if not str(event.widget).startswith(str(self.canvas)):
+            return
+        if event.num == 4:
+            steps = -3
+        elif event.num == 5:
+            steps = 3
+        else:
+            steps = -int(event.delta / 40) if abs(event.delta) >= 40 else -event.delta
+        self.yview("scroll", steps, "units")
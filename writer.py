@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+import queue
+import threading
+import time
+
+# Маркер остановки потока записи
+_STOP = object()
+
+
+class PersistenceWriter:
+    """Фоновый поток записи в хранилище
+
+    Операции из ``submit()`` копятся в очереди; все, что пришло в течение
+    окна ``window`` (в секундах), записывается в хранилище одним вызовом
+    ``storage.apply()``. Главный поток Tk на диске никогда не блокируется.
+    """
+
+    def __init__(self, storage, window=0.25):
+        self.storage = storage
+        self.window = window
+        self.last_error = None
+
+        # Статистика записи
+        self.writes = 0
+        self.ops_written = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self.total_latency = 0.0
+        self._batch_size = 0
+
+        # Пачка, которую не удалось записать: повторяется со следующей
+        self._failed = []
+
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="notes-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, *ops):
+        """Постановка операций в очередь записи (возвращается сразу)"""
+        if self._closed:
+            raise RuntimeError("Запись в хранилище уже остановлена")
+        self._queue.put(ops)
+
+    def flush(self, timeout=None):
+        """Ожидание записи всего, что уже стоит в очереди"""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=None):
+        """Запись оставшихся операций и остановка потока"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def queue_depth(self):
+        """Количество операций, ожидающих записи"""
+        return self._queue.qsize() + self._batch_size
+
+    def stats(self):
+        """Статистика записи: задержка в миллисекундах и глубина очереди"""
+        average = self.total_latency / self.writes if self.writes else 0.0
+        return {
+            "writes": self.writes,
+            "ops": self.ops_written,
+            "last_latency_ms": round(self.last_latency * 1000, 2),
+            "avg_latency_ms": round(average * 1000, 2),
+            "max_latency_ms": round(self.max_latency * 1000, 2),
+            "queue_depth": self.queue_depth(),
+        }
+
+    def _run(self):
+        """Основной цикл потока: сбор пачки операций и запись"""
+        running = True
+        while running:
+            item = self._queue.get()
+            batch, self._failed = self._failed, []
+            waiters = []
+            deadline = time.monotonic() + self.window
+            while True:
+                if item is _STOP:
+                    running = False
+                    break
+                if isinstance(item, threading.Event):
+                    # flush(): пишем немедленно, не дожидаясь окна
+                    waiters.append(item)
+                    break
+                batch.extend(item)
+                self._batch_size = len(batch)
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+            self._write(batch)
+            for waiter in waiters:
+                waiter.set()
+
+    def _write(self, batch):
+        """Запись одной пачки операций с замером задержки"""
+        self._batch_size = 0
+        if not batch:
+            return
+        started = time.perf_counter()
+        try:
+            self.storage.apply(batch)
+        except Exception as e:
+            self.last_error = e
+            self._failed = batch
+            return
+        latency = time.perf_counter() - started
+        self.writes += 1
+        self.ops_written += len(batch)
+        self.last_latency = latency
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)